@@ -22,6 +22,9 @@ import json
 import re
 import sys
 
+# With --async, generates the coroutine wrappers of dxpy.aio.api instead of dxpy.api
+use_async = '--async' in sys.argv[1:]
+
 preamble = '''# Do not modify this file by hand.
 #
 # It is automatically generated by src/api_wrappers/generatePythonAPIWrappers.py.
@@ -35,6 +38,17 @@ from dxpy import DXHTTPRequest
 from dxpy.utils import Nonce
 '''
 
+async_preamble = '''# Do not modify this file by hand.
+#
+# It is automatically generated by src/api_wrappers/generatePythonAPIWrappers.py --async.
+# (Run make api_wrappers to update it.)
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+from dxpy.aio import DXHTTPRequest
+from dxpy.utils import Nonce
+'''
+
 class_method_template = '''def {wrapper_method_name}(input_params={{}}, always_retry={retry}, **kwargs):
     """
     Invokes the {route} API method.{wiki_ref}
@@ -58,6 +72,13 @@ globalexec_object_method_template = '''def {wrapper_method_name}({name_or_id}, a
 '''
 
 
+if use_async:
+    preamble = async_preamble
+    class_method_template, object_method_template, globalexec_object_method_template = [
+        template.replace('def ', 'async def ', 1).replace('return DXHTTPRequest', 'return await DXHTTPRequest')
+        for template in (class_method_template, object_method_template, globalexec_object_method_template)]
+
+
 def make_nonce_code(accept_nonce):
     return ("\n    input_params_cp = Nonce.update_nonce(input_params)" if accept_nonce else "")
 
@@ -129,19 +129,20 @@ import logging
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
-import os, sys, json, time, platform, ssl, traceback
+import os, re, sys, json, time, platform, ssl, traceback
+import importlib
 import errno
 import math
 import socket
 import threading
-import certifi
 from collections import namedtuple
 
 from . import exceptions
 from .compat import BadStatusLine, StringIO, bytes, Repr
 from .utils.printing import BOLD, BLUE, YELLOW, GREEN, RED, WHITE
+from .utils import rate_limiter
 
-from random import randint
+from random import randint, uniform
 import urllib3
 from threading import Lock
 from urllib.parse import urlsplit
@@ -185,13 +186,23 @@ DEFAULT_TIMEOUT = 905
 _DEBUG = 0  # debug verbosity level
 _UPGRADE_NOTIFY = True
 
+# Deprecated: range reads are no longer split into subchunks after an
+# incomplete read. Kept for compatibility only.
 INCOMPLETE_READS_NUM_SUBCHUNKS = 8
 
+# Largest read issued against the socket by streaming range reads
+STREAMING_READ_SIZE = 1024*1024
+
+# Number of requests retried after a throttling (503/429) or server error
+# response, or a network error, in each thread (so that callers, such as
+# adaptive concurrency limits, can tell whether their own requests were
+# retried)
+_thread_request_retries = threading.local()
+
 USER_AGENT = "{name}/{version} ({platform}) Python/{python_version}".format(name=__name__,
                                                     version=TOOLKIT_VERSION,
                                                     platform=platform.platform(),
                                                     python_version=platform.python_version())
-_default_certs = certifi.where()
 _default_headers = {
             "User-Agent": USER_AGENT,
             "Accept-Encoding": "gzip, deflate",
@@ -199,6 +210,7 @@ _default_headers = {
             "Connection": "keep-alive",
         }
 _default_timeout = urllib3.util.timeout.Timeout(connect=DEFAULT_TIMEOUT, read=DEFAULT_TIMEOUT)
+_default_certs = None
 _RequestForAuth = namedtuple('_RequestForAuth', 'method url headers')
 _expected_exceptions = (exceptions.network_exceptions, exceptions.DXAPIError, BadStatusLine, exceptions.BadJSONInReply,
                         exceptions.UrllibInternalError)
@@ -208,6 +220,70 @@ _expected_exceptions = (exceptions.network_exceptions, exceptions.DXAPIError, Ba
 _pool_mutex = Lock()
 _pool_manager = None
 
+# Maximum number of connections kept open to the API server, and to each
+# other (storage) host that files are uploaded to or downloaded from
+API_SERVER_POOL_SIZE = int(os.environ.get('DX_API_SERVER_POOL_SIZE', 32))
+STORAGE_POOL_SIZE = int(os.environ.get('DX_STORAGE_POOL_SIZE', 32))
+
+_pool_stats_mutex = Lock()
+_pool_stats = {}
+
+def _record_pool_event(host, event):
+    with _pool_stats_mutex:
+        host_stats = _pool_stats.setdefault(host, dict(connections_opened=0, connections_reused=0, tls_handshakes=0))
+        host_stats[event] += 1
+
+def get_connection_pool_stats():
+    '''
+    :returns: for each host that requests have been made to, the number of
+        connections opened, the number of requests that reused an open
+        connection, and the number of TLS handshakes performed
+    :rtype: dict of dicts, e.g. {"api.dnanexus.com": {"connections_opened": 4, "connections_reused": 120,
+        "tls_handshakes": 4}}
+    '''
+    with _pool_stats_mutex:
+        return {host: dict(host_stats) for host, host_stats in _pool_stats.items()}
+
+# Time at which the response headers of the latest request of each thread
+# were received, used to report the time to first byte to request listeners
+_response_times = threading.local()
+
+class _DXHTTPConnection(urllib3.connection.HTTPConnection):
+    def connect(self):
+        super(_DXHTTPConnection, self).connect()
+        _record_pool_event(self.host, 'connections_opened')
+
+    def getresponse(self, *args, **kwargs):
+        response = super(_DXHTTPConnection, self).getresponse(*args, **kwargs)
+        _response_times.headers_received = time.time()
+        return response
+
+class _DXHTTPSConnection(urllib3.connection.HTTPSConnection):
+    def connect(self):
+        super(_DXHTTPSConnection, self).connect()
+        _record_pool_event(self.host, 'connections_opened')
+        _record_pool_event(self.host, 'tls_handshakes')
+
+    def getresponse(self, *args, **kwargs):
+        response = super(_DXHTTPSConnection, self).getresponse(*args, **kwargs)
+        _response_times.headers_received = time.time()
+        return response
+
+class _DXHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _DXHTTPConnection
+
+    def _get_conn(self, timeout=None):
+        conn = super(_DXHTTPConnectionPool, self)._get_conn(timeout=timeout)
+        if getattr(conn, 'sock', None) is not None:
+            _record_pool_event(self.host, 'connections_reused')
+        return conn
+
+class _DXHTTPSConnectionPool(_DXHTTPConnectionPool, urllib3.HTTPSConnectionPool):
+    scheme = 'https'
+    ConnectionCls = _DXHTTPSConnection
+
+_pool_classes_by_scheme = {'http': _DXHTTPConnectionPool, 'https': _DXHTTPSConnectionPool}
+
 def _get_proxy_info(url):
     proxy_info = {}
 
@@ -241,17 +317,42 @@ def _get_env_var_proxy(print_proxy=False):
           file=sys.stderr)
   return proxy
 
+def _get_default_certs():
+    # certifi.where() is slow (it may extract the bundle to a temporary
+    # file), so the bundle is only located when the first connection is made
+    global _default_certs
+    if _default_certs is None:
+        import certifi
+        _default_certs = certifi.where()
+    return _default_certs
+
+def _new_pool_manager(pool_manager_cls, **pool_args):
+    pool_manager = pool_manager_cls(**pool_args)
+    pool_manager.pool_classes_by_scheme = _pool_classes_by_scheme
+    connection_from_host = pool_manager.connection_from_host
+
+    def connection_from_destination(host, port=None, scheme='http', pool_kwargs=None):
+        # Pools are sized for the host requests are sent to, which, for
+        # plain HTTP requests through a proxy, is not the host of the pool
+        # (the proxy). The size is part of the pool key, so that API and
+        # storage requests through a proxy get pools of their own.
+        maxsize = API_SERVER_POOL_SIZE if host == APISERVER_HOST else STORAGE_POOL_SIZE
+        return connection_from_host(host, port=port, scheme=scheme,
+                                    pool_kwargs=dict(pool_kwargs or {}, maxsize=maxsize))
+
+    pool_manager.connection_from_host = connection_from_destination
+    return pool_manager
+
 def _get_pool_manager(verify, cert_file, key_file, ssl_context=None):
     global _pool_manager
-    default_pool_args = dict(maxsize=32,
-                             cert_reqs=ssl.CERT_REQUIRED,
+    default_pool_args = dict(cert_reqs=ssl.CERT_REQUIRED,
                              headers=_default_headers,
                              timeout=_default_timeout)
     # Don't use the default CA bundle if the user has set the env variable
     # DX_USE_OS_CA_BUNDLE. Enabling that var will make us attempt to load
     # the default CA certs provided by the OS; see DEVEX-875.
     if 'DX_USE_OS_CA_BUNDLE' not in os.environ:
-        default_pool_args.update(ca_certs=_default_certs)
+        default_pool_args.update(ca_certs=_get_default_certs())
 
     if cert_file is None and verify is None and 'DX_CA_CERT' not in os.environ:
         with _pool_mutex:
@@ -259,9 +360,9 @@ def _get_pool_manager(verify, cert_file, key_file, ssl_context=None):
                 if _get_env_var_proxy():
                     proxy_params = _get_proxy_info(_get_env_var_proxy(print_proxy=True))
                     default_pool_args.update(proxy_params)
-                    _pool_manager = urllib3.ProxyManager(**default_pool_args)
+                    _pool_manager = _new_pool_manager(urllib3.ProxyManager, **default_pool_args)
                 else:
-                    _pool_manager = urllib3.PoolManager(**default_pool_args)
+                    _pool_manager = _new_pool_manager(urllib3.PoolManager, **default_pool_args)
             return _pool_manager
     else:
         # This is the uncommon case, normally, we want to cache the pool
@@ -270,16 +371,16 @@ def _get_pool_manager(verify, cert_file, key_file, ssl_context=None):
                          cert_file=cert_file,
                          key_file=key_file,
                          ssl_context=ssl_context,
-                         ca_certs=verify or os.environ.get('DX_CA_CERT') or certifi.where())
+                         ca_certs=verify or os.environ.get('DX_CA_CERT') or _get_default_certs())
         if verify is False or os.environ.get('DX_CA_CERT') == 'NOVERIFY':
             pool_args.update(cert_reqs=ssl.CERT_NONE, ca_certs=None)
             urllib3.disable_warnings()
         if _get_env_var_proxy():
             proxy_params = _get_proxy_info(_get_env_var_proxy(print_proxy=True))
             pool_args.update(proxy_params)
-            return urllib3.ProxyManager(**pool_args)
+            return _new_pool_manager(urllib3.ProxyManager, **pool_args)
         else:
-            return urllib3.PoolManager(**pool_args)
+            return _new_pool_manager(urllib3.PoolManager, **pool_args)
 
 
 def _process_method_url_headers(method, url, headers):
@@ -343,14 +444,8 @@ def _extract_msg_from_last_exception():
         return traceback.format_exception_only(last_exc_type, last_error)[-1].strip()
 
 
-def _calculate_retry_delay(response, num_attempts):
-    '''
-    Returns the time in seconds that we should wait.
-
-    :param num_attempts: number of attempts that have been made to the
-        resource, including the most recent failed one
-    :type num_attempts: int
-    '''
+def _get_retry_after(response):
+    # Returns the number of seconds after which a 503 response asks to be retried, or None
     if response is not None and response.status == 503 and 'retry-after' in response.headers:
         try:
             return int(response.headers['retry-after'])
@@ -359,6 +454,58 @@ def _calculate_retry_delay(response, num_attempts):
             # instead of seconds to wait. We don't bother to parse that,
             # but the apiserver doesn't generate such responses anyway.
             pass
+    return None
+
+
+def _count_request_retry():
+    _thread_request_retries.count = _get_thread_request_retries() + 1
+
+
+def _get_thread_request_retries():
+    return getattr(_thread_request_retries, 'count', 0)
+
+
+def _url_host(url):
+    return url.split('://', 1)[-1].split('/', 1)[0]
+
+
+def _get_request_limits(prepend_srv):
+    # Returns the limits of a new request, after counting it in their retry budget
+    limits = rate_limiter.get_rate_limits('api' if prepend_srv else 'storage')
+    limits.retry_budget.deposit()
+    return limits
+
+
+def _withdraw_retry(limits, method, url, exception_msg):
+    # Returns whether the retry budget allows a failed request to be retried
+    if limits.retry_budget.withdraw():
+        return True
+    logger.warning("[%s] %s %s: %s. Not retrying: the retry budget is exhausted", time.ctime(), method, url,
+                   exception_msg)
+    return False
+
+
+def _pause_host_for_retry(response, url):
+    # Holds back the other requests to the same host too, if the server
+    # asked to be retried later. The delay of the retried request includes
+    # its jitter, which is not added again by the pause.
+    retry_after = _get_retry_after(response)
+    if retry_after is not None:
+        rate_limiter.get_host_pauses().pause(_url_host(url), retry_after)
+
+
+def _calculate_retry_delay(response, num_attempts):
+    '''
+    Returns the time in seconds that we should wait.
+
+    :param num_attempts: number of attempts that have been made to the
+        resource, including the most recent failed one
+    :type num_attempts: int
+    '''
+    retry_after = _get_retry_after(response)
+    if retry_after is not None:
+        # Spread the retries of requests throttled at the same time
+        return retry_after + uniform(0, retry_after * rate_limiter.PAUSE_JITTER)
     if num_attempts <= 1:
         return 1
     num_attempts = min(num_attempts, 7)
@@ -456,6 +603,224 @@ def _debug_print_response(debug_level, seq_num, time_started, req_id, response_s
               content_to_print,
               file=sys.stderr)
 
+RequestEvent = namedtuple('RequestEvent', 'type seq_num method route status bytes_sent bytes_received '
+                                          'time_to_first_byte latency retries backoff error')
+RequestEvent.__doc__ = '''
+Event passed to the listeners added with :func:`add_request_listener`.
+
+*type* is "start" (before the first attempt of a request), "retry"
+(after a failed attempt, before sleeping *backoff* seconds), or "end"
+(after the request succeeded or failed for good). *route* is the API
+route with object IDs replaced by "xxxx" (e.g. "/file-xxxx/describe"),
+or, for requests to other servers (such as file data transfers), the
+scheme and host of the URL. *bytes_sent* and *bytes_received* count
+request and response bodies (None if unknown). *time_to_first_byte* is
+the time from the start of the latest attempt to the reception of its
+response headers, and *latency* the time since the start of the first
+attempt, in seconds. *backoff* is the time about to be slept, in
+"retry" events, and the total time slept before retries otherwise.
+*error* is the message of the exception of a failed attempt, or None.
+
+The "end" event of a request made with ``preload_content=False`` (such
+as a file data transfer) is sent when its response is released or
+closed: its *latency* includes the time taken to read the body, and
+*bytes_received* counts the bytes read from it.
+'''
+
+_request_listeners = []
+_ROUTE_ID_PATTERN = re.compile(r'(?<=/)([a-z]+)-[0-9A-Za-z]{24}(?=/|$)')
+
+def add_request_listener(listener):
+    '''
+    :param listener: called with a :class:`RequestEvent` when each request made by :func:`DXHTTPRequest` starts, is retried, and ends
+    :type listener: callable
+
+    Listeners are called synchronously, from the thread making the
+    request, and should return quickly. Exceptions raised by listeners
+    are logged and otherwise ignored.
+    '''
+    global _request_listeners
+    _request_listeners = _request_listeners + [listener]
+
+def remove_request_listener(listener):
+    '''
+    Removes a listener added with :func:`add_request_listener`.
+    '''
+    global _request_listeners
+    _request_listeners = [l for l in _request_listeners if l != listener]
+
+def _new_request_recorder(seq_num, method, body):
+    # Returns a recorder of the events of a new request, or None if there are no listeners
+    if not _request_listeners:
+        return None
+    return _RequestEventRecorder(_request_listeners, seq_num, method, body)
+
+class _RequestEventRecorder(object):
+    '''
+    Collects the statistics of one call to DXHTTPRequest, and sends the
+    corresponding events to the request listeners.
+    '''
+    def __init__(self, listeners, seq_num, method, body):
+        self.listeners, self.seq_num, self.method = listeners, seq_num, method
+        self.route, self.status, self.bytes_received, self.time_to_first_byte, self.error = None, None, None, None, None
+        self.bytes_sent = len(body) if isinstance(body, (bytes, str, bytearray, memoryview)) else None
+        self.time_started = time.time()
+        self.retries, self.backoff = 0, 0
+
+    def attempt(self, url, prepend_srv):
+        if self.route is None:
+            if prepend_srv:
+                self.route = _ROUTE_ID_PATTERN.sub(r'\1-xxxx', urlsplit(url).path)
+            else:
+                parts = urlsplit(url)
+                self.route = parts.scheme + '://' + parts.netloc
+            self._send('start')
+        _response_times.headers_received = None
+
+    def response_received(self, response, attempt_started, headers_received=None):
+        self.status = response.status
+        if headers_received is None:
+            headers_received = _response_times.headers_received
+        if headers_received is not None:
+            self.time_to_first_byte = headers_received - attempt_started
+
+    def retry(self, error, delay):
+        self.error = error
+        self._send('retry', backoff=delay)
+        self.retries += 1
+        self.backoff += delay
+
+    def end(self, error):
+        self.error = error
+        self._send('end')
+
+    def end_on_release(self, response):
+        # The body of a streamed response is read after DXHTTPRequest
+        # returns: the request ends when the response is released or
+        # closed, having received the bytes read from it by then
+        read, release_conn, close = response.read, response.release_conn, response.close
+        state = {'reading': False, 'released': False, 'ended': False}
+
+        def end():
+            if not state['ended']:
+                state['ended'] = True
+                self.bytes_received = response.tell()
+                unread = response.length_remaining
+                self.end("Released with %d bytes of the body unread" % (unread,) if unread else None)
+
+        def read_and_count(*args, **kwargs):
+            # urllib3 releases the connection within the read that
+            # exhausts the body, before counting the bytes it read
+            state['reading'] = True
+            try:
+                return read(*args, **kwargs)
+            finally:
+                state['reading'] = False
+                if state['released']:
+                    end()
+
+        def release_conn_and_end():
+            try:
+                release_conn()
+            finally:
+                state['released'] = True
+                if not state['reading']:
+                    end()
+
+        def close_and_end():
+            try:
+                close()
+            finally:
+                state['released'] = True
+                if not state['reading']:
+                    end()
+
+        response.read, response.release_conn, response.close = read_and_count, release_conn_and_end, close_and_end
+
+    def _send(self, event_type, backoff=None):
+        event = RequestEvent(event_type, self.seq_num, self.method, self.route, self.status, self.bytes_sent,
+                             self.bytes_received, self.time_to_first_byte, time.time() - self.time_started,
+                             self.retries, self.backoff if backoff is None else backoff, self.error)
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Request listener %r failed", listener)
+
+def _raise_error_for_response(response, time_started, req_id):
+    '''
+    Raises the appropriate exception for a response whose HTTP status code
+    is not in the 200 series. If the content is JSON, it is parsed to find
+    the error class.
+    '''
+    # response.headers key lookup is case-insensitive
+    if response.headers.get('content-type', '').startswith('application/json'):
+        try:
+            content = response.data.decode('utf-8')
+        except AttributeError:
+            raise exceptions.UrllibInternalError("Content is none", response.status)
+        try:
+            content = json.loads(content)
+        except ValueError:
+            # The JSON is not parsable, but we should be able to retry.
+            raise exceptions.BadJSONInReply("Invalid JSON received from server", response.status)
+        try:
+            error_class = getattr(exceptions, content["error"]["type"], exceptions.DXAPIError)
+        except (KeyError, AttributeError, TypeError):
+            raise exceptions.HTTPErrorWithContent("Appropriate error class not found. [HTTPCode=%s]" % response.status, content)
+        raise error_class(content, response.status, time_started, req_id)
+    else:
+        try:
+            content = response.data.decode('utf-8')
+        except AttributeError:
+            raise exceptions.UrllibInternalError("Content is none", response.status)
+        raise exceptions.HTTPErrorWithContent("{} {} [Time={} RequestID={}]".format(response.status,
+                                                                             response.reason,
+                                                                             time_started,
+                                                                             req_id), content.strip())
+
+
+def _ok_to_retry(e, response, method, always_retry, try_index, max_retries, exception_msg, time_started, req_id):
+    '''
+    Returns True if a request that failed with the exception *e* (one of
+    the expected exceptions) should be retried. *response* is None if no
+    response was received, and *try_index* is the number of tries that
+    have failed so far, minus one.
+    '''
+    # Total number of allowed tries is the initial try PLUS
+    # up to (max_retries) subsequent retries.
+    total_allowed_tries = max_retries + 1
+    ok_to_retry = False
+    is_retryable = always_retry or (method == 'GET') or _is_retryable_exception(e)
+    if try_index + 1 < total_allowed_tries:
+        # BadStatusLine ---  server did not return anything
+        # BadJSONInReply --- server returned JSON that didn't parse properly
+        if (response is None
+           or isinstance(e, _RETRYABLE_WITH_RESPONSE)):
+            ok_to_retry = is_retryable
+        else:
+            ok_to_retry = 500 <= response.status < 600
+
+        # The server has closed the connection prematurely
+        if (response is not None
+           and response.status == 400 and is_retryable and method == 'PUT'
+           and isinstance(e, urllib3.exceptions.HTTPError)):
+            request_timeout_str = '<Code>RequestTimeout</Code>'
+            if (request_timeout_str in exception_msg
+                or (isinstance(e, exceptions.HTTPErrorWithContent) and request_timeout_str in e.content)):
+                logger.info("Retrying 400 HTTP error, due to slow data transfer. " +
+                            "Request Time=%f Request ID=%s", time_started, req_id)
+            else:
+                logger.info("400 HTTP error, of unknown origin, exception_msg=[%s]. " +
+                            "Request Time=%f Request ID=%s", exception_msg, time_started, req_id)
+            ok_to_retry = True
+
+        # Unprocessable entity, request has semantical errors
+        if response is not None and response.status == 422:
+            ok_to_retry = False
+    return ok_to_retry
+
+
 def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
                   timeout=DEFAULT_TIMEOUT,
                   use_compression=None, jsonify_data=True, want_full_response=False,
@@ -551,6 +916,9 @@ def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
     if hasattr(data, 'seek') and hasattr(data, 'tell'):
         rewind_input_buffer_offset = data.tell()
 
+    recorder = _new_request_recorder(seq_num, method, serialized_data)
+    limits = _get_request_limits(prepend_srv)
+
     # Maintain two separate counters for the number of tries...
 
     try_index = 0  # excluding 503 errors. The number of tries as given here
@@ -565,9 +933,15 @@ def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
         success, time_started = True, None
         response = None
         req_id = None
+        retrying, error_msg = False, None
         try:
-            time_started = time.time()
+            limits.bucket.acquire()
+            # The URL of a callable resource is known only once it is called
             _method, _url, _headers = _process_method_url_headers(method, url, headers)
+            rate_limiter.get_host_pauses().wait(_url_host(_url))
+            time_started = time.time()
+            if recorder is not None:
+                recorder.attempt(_url, prepend_srv)
 
             _debug_print_request(_DEBUG, seq_num, time_started, _method, _url, _headers, jsonify_data, data)
 
@@ -615,6 +989,8 @@ def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
                 # started, will throw ClosedPoolError
                 raise exceptions.UrllibInternalError("ClosedPoolError")
 
+            if recorder is not None:
+                recorder.response_received(response, time_started)
             _raise_error_for_testing(try_index, method)
             req_id = response.headers.get("x-request-id", "unavailable")
 
@@ -639,33 +1015,16 @@ def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
             # If an HTTP code that is not in the 200 series is received and the content is JSON, parse it and throw the
             # appropriate error.  Otherwise, raise the usual exception.
             if response.status // 100 != 2:
-                # response.headers key lookup is case-insensitive
-                if response.headers.get('content-type', '').startswith('application/json'):
-                    try:
-                        content = response.data.decode('utf-8')
-                    except AttributeError:
-                        raise exceptions.UrllibInternalError("Content is none", response.status)
-                    try:
-                        content = json.loads(content)
-                    except ValueError:
-                        # The JSON is not parsable, but we should be able to retry.
-                        raise exceptions.BadJSONInReply("Invalid JSON received from server", response.status)
-                    try:
-                        error_class = getattr(exceptions, content["error"]["type"], exceptions.DXAPIError)
-                    except (KeyError, AttributeError, TypeError):
-                        raise exceptions.HTTPErrorWithContent("Appropriate error class not found. [HTTPCode=%s]" % response.status, content)
-                    raise error_class(content, response.status, time_started, req_id)
-                else:
-                    try:
-                        content = response.data.decode('utf-8')
-                    except AttributeError:
-                        raise exceptions.UrllibInternalError("Content is none", response.status)
-                    raise exceptions.HTTPErrorWithContent("{} {} [Time={} RequestID={}]".format(response.status,
-                                                                                         response.reason,
-                                                                                         time_started,
-                                                                                         req_id), content.strip())
+                _raise_error_for_response(response, time_started, req_id)
 
             if want_full_response:
+                if recorder is not None:
+                    if not kwargs.get('preload_content', True):
+                        # The end event is sent when the body has been read
+                        recorder.end_on_release(response)
+                        recorder = None
+                    elif 'content-length' in response.headers:
+                        recorder.bytes_received = int(response.headers['content-length'])
                 return response
             else:
                 if 'content-length' in response.headers:
@@ -678,6 +1037,8 @@ def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
                         )
 
                 content = response.data
+                if recorder is not None:
+                    recorder.bytes_received = len(content)
 
                 response_was_json = False
 
@@ -700,6 +1061,7 @@ def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
                 if test_retry:
                     retried_responses.append(content)
                     if len(retried_responses) == 1:
+                        retrying = True
                         continue
                     else:
                         _set_retry_response(retried_responses[0])
@@ -708,52 +1070,26 @@ def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
                 return content
             raise AssertionError('Should never reach this line: expected a result to have been returned by now')
         except Exception as e:
-            # Avoid reusing connections in the pool, since they may be
-            # in an inconsistent state (observed as "ResponseNotReady"
-            # errors).
-            _get_pool_manager(**pool_args).clear()
+            # Avoid reusing the connection of the failed request, since it
+            # may be in an inconsistent state (observed as "ResponseNotReady"
+            # errors). urllib3 already discards the connection when the
+            # request itself fails; the other connections in the pool stay
+            # open.
+            if response is not None:
+                response.close()
+                response.release_conn()
             success = False
-            exception_msg = _extract_msg_from_last_exception()
+            exception_msg = error_msg = _extract_msg_from_last_exception()
             if isinstance(e, _expected_exceptions):
-                # Total number of allowed tries is the initial try PLUS
-                # up to (max_retries) subsequent retries.
-                total_allowed_tries = max_retries + 1
-                ok_to_retry = False
-                is_retryable = always_retry or (method == 'GET') or _is_retryable_exception(e)
-                # Because try_index is not incremented until we escape
-                # this iteration of the loop, try_index is equal to the
-                # number of tries that have failed so far, minus one.
-                if try_index + 1 < total_allowed_tries:
-                    # BadStatusLine ---  server did not return anything
-                    # BadJSONInReply --- server returned JSON that didn't parse properly
-                    if (response is None
-                       or isinstance(e, _RETRYABLE_WITH_RESPONSE)):
-                        ok_to_retry = is_retryable
-                    else:
-                        ok_to_retry = 500 <= response.status < 600
-
-                    # The server has closed the connection prematurely
-                    if (response is not None
-                       and response.status == 400 and is_retryable and method == 'PUT'
-                       and isinstance(e, urllib3.exceptions.HTTPError)):
-                        request_timeout_str = '<Code>RequestTimeout</Code>'
-                        if (request_timeout_str in exception_msg
-                            or (isinstance(e, exceptions.HTTPErrorWithContent) and request_timeout_str in e.content)):
-                            logger.info("Retrying 400 HTTP error, due to slow data transfer. " +
-                                        "Request Time=%f Request ID=%s", time_started, req_id)
-                        else:
-                            logger.info("400 HTTP error, of unknown origin, exception_msg=[%s]. " +
-                                        "Request Time=%f Request ID=%s", exception_msg, time_started, req_id)
-                        ok_to_retry = True
-
-                    # Unprocessable entity, request has semantical errors
-                    if response is not None and response.status == 422:
-                        ok_to_retry = False
-                if ok_to_retry:
+                ok_to_retry = _ok_to_retry(e, response, method, always_retry, try_index, max_retries, exception_msg,
+                                           time_started, req_id)
+                if ok_to_retry and _withdraw_retry(limits, method, _url, exception_msg):
+                    _count_request_retry()
                     if rewind_input_buffer_offset is not None:
                         data.seek(rewind_input_buffer_offset)
 
                     delay = _calculate_retry_delay(response, try_index_including_503 + 1)
+                    _pause_host_for_retry(response, _url)
 
                     range_str = (' (range=%s)' % (headers['Range'],)) if 'Range' in headers else ''
                     if response is not None and response.status == 503:
@@ -767,6 +1103,9 @@ def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
                         log_msg += "\n%s" % e.content
 
                     logger.warning(log_msg)
+                    if recorder is not None:
+                        recorder.retry(exception_msg, delay)
+                    retrying = True
                     time.sleep(delay)
                     try_index_including_503 += 1
                     if response is None or response.status != 503:
@@ -790,6 +1129,8 @@ def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True,
         finally:
             if success and try_index > 0:
                 logger.info("[%s] %s %s: Recovered after %d retries", time.ctime(), method, _url, try_index)
+            if recorder is not None and not retrying:
+                recorder.end(error_msg)
 
         raise AssertionError('Should never reach this line: should have attempted a retry or reraised by now')
 
@@ -819,44 +1160,116 @@ class DXHTTPOAuth2():
 
 '''
 This function is used for reading a part of an S3 object. It returns a string containing the data. If there is an
-error, and exception is thrown.
-
-There is special handling if a DXIncompleteReadsError is thrown, for which urllib3 gets only part of the requested
-range from the chunk of data. The range is split into smaller chunks, and each sub-chunk is tried in a DXHTTPRequest.
-The smaller chunks are then concatenated to form the original range of data. If a DXIncompleteReadsError is thrown
-(after retrying the sub-chunk 6 times) while reading a sub-chunk, then we fail.
+error, and exception is thrown. The data is read by _dxhttp_read_range_into.
 '''
 
 
 def _dxhttp_read_range(url, headers, start_pos, end_pos, timeout, sub_range=True):
-    if sub_range:
-        headers['Range'] = "bytes=" + str(start_pos) + "-" + str(end_pos)
-    try:
-        data = DXHTTPRequest(url, '', method='GET', headers=headers, auth=None, jsonify_data=False, prepend_srv=False,
-                             always_retry=True, timeout=timeout, decode_response_body=False)
-        _raise_error_for_testing()
-        return data
-
-    # When chunk fails to be read, it gets broken into sub-chunks
-    except exceptions.DXIncompleteReadsError:
-        chunk_buffer = StringIO()
-        subchunk_len = int(math.ceil((end_pos - start_pos + 1)/INCOMPLETE_READS_NUM_SUBCHUNKS))
-        subchunk_start_pos = start_pos
-
-        while subchunk_start_pos <= end_pos:
-            subchunk_end_pos = min(subchunk_start_pos + subchunk_len - 1, end_pos)
-            headers['Range'] = "bytes=" + str(subchunk_start_pos) + "-" + str(subchunk_end_pos)
-            subchunk_start_pos += subchunk_len
-            data = DXHTTPRequest(url, '', method='GET', headers=headers, auth=None, jsonify_data=False,
-                                 prepend_srv=False, always_retry=True, timeout=timeout,
-                                 decode_response_body=False)
-
-            # Concatenate sub-chunks
-            chunk_buffer.write(data)
-
-        concat_chunks = chunk_buffer.getvalue()
-        chunk_buffer.close()
-        return concat_chunks
+    buffer = bytearray(end_pos - start_pos + 1)
+    _dxhttp_read_range_into(url, headers, start_pos, end_pos, timeout, buffer, sub_range=sub_range)
+    return bytes(buffer)
+
+
+'''
+Reads the bytes start_pos..end_pos of a URL. Instead of letting urllib3 preload the whole response body (which the
+caller then copies again into its own buffer or file), the bytes are read off the socket in pieces of at most
+STREAMING_READ_SIZE bytes and stored directly into *buffer*. *buffer* may be any writable object supporting the buffer
+protocol (bytearray, memoryview, mmap) and must be exactly end_pos - start_pos + 1 bytes long. Returns the number of
+bytes read.
+
+The response must be exactly the range requested: a 206 response with matching Content-Range and Content-Length
+headers (or, without *sub_range* or for a range starting at byte 0, a 200 response of the length of the range), and
+without content encoding, so that the bytes received are the bytes of the range. Otherwise DXError is raised.
+
+If the connection breaks after part of the range has been received, only the missing tail of the range is requested
+again, up to *max_retries* times. If the range still cannot be completed, DXIncompleteReadsError is raised.
+'''
+
+
+_RETRYABLE_STREAMING_EXCEPTIONS = exceptions.network_exceptions + (exceptions.DXIncompleteReadsError,
+                                                                   urllib3.exceptions.HTTPError, BadStatusLine)
+
+
+def _dxhttp_read_range_into(url, headers, start_pos, end_pos, timeout, buffer, sub_range=True,
+                            max_retries=DEFAULT_RETRIES):
+    view = memoryview(buffer).cast('B')
+    range_len = end_pos - start_pos + 1
+    if len(view) != range_len:
+        raise exceptions.DXError("Buffer of length %d cannot hold range %d-%d" % (len(view), start_pos, end_pos))
+
+    bytes_read = 0
+    try_index = 0
+    # Encoded bodies would not be the bytes of the range, nor could they be resumed at a byte offset
+    headers['Accept-Encoding'] = 'identity'
+    while bytes_read < range_len:
+        range_requested = sub_range or bytes_read > 0
+        if range_requested:
+            headers['Range'] = "bytes=" + str(start_pos + bytes_read) + "-" + str(end_pos)
+        response = DXHTTPRequest(url, '', method='GET', headers=headers, auth=None, jsonify_data=False,
+                                 prepend_srv=False, always_retry=True, timeout=timeout, want_full_response=True,
+                                 preload_content=False)
+        response_ok = False
+        try:
+            _check_range_response(response, range_requested, start_pos + bytes_read, end_pos)
+            while bytes_read < range_len:
+                # Raw reads return whatever arrived before a broken connection,
+                # so that those bytes need not be requested again
+                data = response.read(min(STREAMING_READ_SIZE, range_len - bytes_read), decode_content=False)
+                if not data:
+                    break
+                view[bytes_read:bytes_read + len(data)] = data
+                bytes_read += len(data)
+                del data
+                _raise_error_for_testing()
+            if bytes_read < range_len:
+                raise exceptions.DXIncompleteReadsError(
+                    "Received %d of %d bytes of range %d-%d" % (bytes_read, range_len, start_pos, end_pos))
+            # A connection with more data pending on it cannot be reused
+            response_ok = not response.length_remaining
+        except _RETRYABLE_STREAMING_EXCEPTIONS:
+            _count_request_retry()
+            try_index += 1
+            if try_index > max_retries:
+                raise exceptions.DXIncompleteReadsError(_extract_msg_from_last_exception())
+            delay = _calculate_retry_delay(None, try_index)
+            logger.warning("[%s] GET %s: %s. Waiting %d seconds before resuming at byte %d (retry %d of %d)...",
+                           time.ctime(), url, _extract_msg_from_last_exception(), delay, start_pos + bytes_read,
+                           try_index, max_retries)
+            time.sleep(delay)
+        finally:
+            if not response_ok:
+                # Don't return a connection with unread data on it to the pool
+                response.close()
+            response.release_conn()
+
+    return bytes_read
+
+
+def _check_range_response(response, range_requested, start_pos, end_pos):
+    # Raises DXError unless the body of the response is exactly the bytes start_pos..end_pos
+    expected_status = 206 if range_requested else 200
+    content_length = response.headers.get('content-length')
+    if range_requested and response.status == 200 and start_pos == 0 and content_length is not None \
+            and int(content_length) == end_pos + 1:
+        # A server that ignores Range sends the whole file, which is the
+        # range requested if the range is the whole file
+        expected_status = 200
+    if response.status != expected_status:
+        raise exceptions.DXError("Expected status %d for range %d-%d, got %d" %
+                                 (expected_status, start_pos, end_pos, response.status))
+    content_encoding = response.headers.get('content-encoding', 'identity').lower()
+    if content_encoding != 'identity':
+        raise exceptions.DXError("Unexpected content encoding %s for range %d-%d" %
+                                 (content_encoding, start_pos, end_pos))
+    content_range = response.headers.get('content-range')
+    if range_requested and content_range is not None:
+        match = re.match(r'bytes\s+(\d+)-(\d+)/', content_range)
+        if match is None or (int(match.group(1)), int(match.group(2))) != (start_pos, end_pos):
+            raise exceptions.DXError("Requested range %d-%d, got Content-Range %s" %
+                                     (start_pos, end_pos, content_range))
+    if content_length is not None and int(content_length) != end_pos - start_pos + 1:
+        raise exceptions.DXError("Requested range %d-%d (%d bytes), got Content-Length %s" %
+                                 (start_pos, end_pos, end_pos - start_pos + 1, content_length))
 
 
 def set_api_server_info(host=None, port=None, protocol=None):
@@ -1019,9 +1432,10 @@ def append_underlying_workflow_describe(globalworkflow_desc):
             not 'regionalOptions' in globalworkflow_desc:
         return globalworkflow_desc
 
+    from . import api
     for region, config in globalworkflow_desc['regionalOptions'].items():
         workflow_id = config['workflow']
-        workflow_desc = dxpy.api.workflow_describe(workflow_id, input_params={"project": config["resources"]})
+        workflow_desc = api.workflow_describe(workflow_id, input_params={"project": config["resources"]})
         globalworkflow_desc['regionalOptions'][region]['workflowDescribe'] = workflow_desc
     return globalworkflow_desc
 
@@ -1029,6 +1443,44 @@ def append_underlying_workflow_describe(globalworkflow_desc):
 from .utils.config import DXConfig as _DXConfig
 config = _DXConfig()
 
-from .bindings import *
+
+def _import_bindings():
+    # Returns the bindings module, and the names that "from .bindings
+    # import *" used to add to this module: all of its public names
+    bindings = importlib.import_module('.bindings', __name__)
+    return bindings, set(name for name in vars(bindings) if not name.startswith('_'))
+
+
+def __getattr__(name):
+    # The bindings (and dxpy.api) are only imported the first time one
+    # of their names is looked up in this module, to keep "import dxpy"
+    # fast for short-lived commands
+    if name == '__all__':
+        # "from dxpy import *" exports the names of the bindings too
+        _bindings, exports = _import_bindings()
+        return sorted(exports | set(name for name in globals() if not name.startswith('_')) | {'certifi'})
+    if name == 'certifi':
+        # Used to be imported by this module
+        return importlib.import_module('certifi')
+    if name.startswith('_'):
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    bindings, exports = _import_bindings()
+    if name in globals():
+        # A submodule, added when importing the bindings
+        return globals()[name]
+    if name not in exports:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(bindings, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    _bindings, exports = _import_bindings()
+    return sorted(set(globals()) | exports)
+
+
 from .dxlog import DXLogHandler
 from .utils.exec_utils import run, entry_point
+from .utils.request_stats import enable_request_stats, disable_request_stats, get_request_stats
+from .utils.rate_limiter import configure_rate_limits, get_rate_limits
@@ -0,0 +1,456 @@
+# Copyright (C) 2013-2016 DNAnexus, Inc.
+#
+# This file is part of dx-toolkit (DNAnexus platform client libraries).
+#
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may not
+#   use this file except in compliance with the License. You may obtain a copy
+#   of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+'''
+Asynchronous (:mod:`asyncio`) client for the DNAnexus API.
+
+:func:`DXHTTPRequest` is the coroutine counterpart of
+:func:`dxpy.DXHTTPRequest`, with the same retry, backoff and error
+semantics, and :mod:`dxpy.aio.api` provides a coroutine for each API
+method wrapped by :mod:`dxpy.api`. Many requests can be outstanding at
+once from a single event loop::
+
+    import asyncio
+    import dxpy.aio.api
+
+    async def describe_all(file_ids):
+        return await asyncio.gather(*[dxpy.aio.api.file_describe(file_id) for file_id in file_ids])
+
+    descriptions = asyncio.run(describe_all(file_ids))
+
+Connections are kept open for reuse, separately for each event loop.
+At most :data:`dxpy.API_SERVER_POOL_SIZE` requests are sent to the API
+server at the same time (:data:`dxpy.STORAGE_POOL_SIZE` to each other
+host); the others wait for a connection. :func:`close` closes the
+connections of the running event loop.
+
+The requests are made with the configuration of :mod:`dxpy` (API
+server, security context, CA certificates and proxy environment
+variables), and share its rate limit, retry budget, host pauses and
+request listeners (see :func:`dxpy.add_request_listener`). HTTPS
+requests through a proxy require Python 3.11 or later.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import asyncio
+import http.client
+import io
+import json
+import os
+import ssl
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import urllib3
+
+import dxpy
+from .. import exceptions, logger
+from ..utils import rate_limiter
+
+_pools = weakref.WeakKeyDictionary()
+
+
+class DXAsyncHTTPResponse(object):
+    '''
+    HTTP response returned by :func:`DXHTTPRequest` when
+    *want_full_response* is True.
+
+    The attributes *status*, *reason* and *data* (the response body, as
+    bytes) have the same meaning as those of
+    :class:`urllib3.response.HTTPResponse`; *headers* is a
+    case-insensitive mapping.
+    '''
+    def __init__(self, status, reason, headers, data, headers_received=None):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.data = data
+        self._headers_received = headers_received
+
+
+def _get_ssl_context(verify=None, cert_file=None, key_file=None, ssl_context=None):
+    if ssl_context is not None:
+        return ssl_context
+    ca_certs = verify if isinstance(verify, str) else os.environ.get('DX_CA_CERT')
+    if verify is False or ca_certs == 'NOVERIFY':
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    elif ca_certs:
+        context = ssl.create_default_context(cafile=ca_certs)
+    elif 'DX_USE_OS_CA_BUNDLE' in os.environ:
+        context = ssl.create_default_context()
+    else:
+        context = ssl.create_default_context(cafile=dxpy._get_default_certs())
+    if cert_file is not None:
+        context.load_cert_chain(cert_file, key_file)
+    return context
+
+
+class _Connection(object):
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+
+    def close(self):
+        self.writer.close()
+
+
+class _ConnectionPool(object):
+    '''
+    Keep-alive HTTP/1.1 connections to one host, of which at most
+    *maxsize* are in use at any time.
+    '''
+    def __init__(self, scheme, host, port, maxsize, ssl_context):
+        self.scheme, self.host, self.port = scheme, host, port
+        self.ssl_context = ssl_context
+        default_port = 443 if scheme == 'https' else 80
+        self.host_header = host if port == default_port else '%s:%d' % (host, port)
+        self._semaphore = asyncio.Semaphore(maxsize)
+        self._idle = []
+
+    async def _open_connection(self):
+        server_ssl = self.ssl_context if self.scheme == 'https' else None
+        proxy = dxpy._get_env_var_proxy()
+        if proxy and server_ssl is not None and not hasattr(asyncio.StreamWriter, 'start_tls'):
+            # Not a network error: retrying would not help
+            raise exceptions.DXError('HTTPS requests through a proxy require Python 3.11 or later')
+        try:
+            if proxy:
+                reader, writer = await self._open_tunnel(proxy, server_ssl)
+            else:
+                reader, writer = await asyncio.open_connection(self.host, self.port, ssl=server_ssl)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise urllib3.exceptions.NewConnectionError(None, 'Failed to establish a new connection: %s' % (e,))
+        dxpy._record_pool_event(self.host, 'connections_opened')
+        if server_ssl is not None:
+            dxpy._record_pool_event(self.host, 'tls_handshakes')
+        return _Connection(reader, writer)
+
+    async def _open_tunnel(self, proxy, server_ssl):
+        proxy_info = urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+        reader, writer = await asyncio.open_connection(proxy_info.hostname, proxy_info.port or 80)
+        target = '%s:%d' % (self.host, self.port)
+        request_headers = {'Host': target}
+        if proxy_info.username:
+            credentials = proxy_info.username + (':' + proxy_info.password if proxy_info.password else '')
+            request_headers.update(urllib3.make_headers(proxy_basic_auth=credentials))
+        writer.write(_serialize_head('CONNECT', target, request_headers))
+        status, reason, _headers = await _read_head(reader)
+        if status != 200:
+            writer.close()
+            raise OSError('Proxy refused to open a tunnel to %s: %d %s' % (target, status, reason))
+        if server_ssl is not None:
+            await writer.start_tls(server_ssl, server_hostname=self.host)
+        return reader, writer
+
+    async def request(self, method, target, headers, body, timeout):
+        async with self._semaphore:
+            while self._idle:
+                connection = self._idle.pop()
+                if connection.reader.at_eof():
+                    # Closed by the server while idle
+                    connection.close()
+                    continue
+                dxpy._record_pool_event(self.host, 'connections_reused')
+                try:
+                    return await self._send(connection, method, target, headers, body, timeout)
+                except http.client.RemoteDisconnected:
+                    # The server closed the connection just before the request
+                    # was sent; this is not a failure of the request.
+                    pass
+            try:
+                connection = await asyncio.wait_for(self._open_connection(), timeout)
+            except asyncio.TimeoutError:
+                raise urllib3.exceptions.ConnectTimeoutError(
+                    'Connection to %s timed out. (connect timeout=%s)' % (self.host, timeout))
+            return await self._send(connection, method, target, headers, body, timeout)
+
+    async def _send(self, connection, method, target, headers, body, timeout):
+        try:
+            response, keep_alive = await asyncio.wait_for(
+                _exchange(connection, method, target, dict(headers, Host=self.host_header), body), timeout)
+        except asyncio.TimeoutError:
+            connection.close()
+            raise urllib3.exceptions.ReadTimeoutError(None, target, 'Read timed out. (read timeout=%s)' % (timeout,))
+        except (ConnectionResetError, http.client.HTTPException):
+            connection.close()
+            raise
+        except OSError as e:
+            connection.close()
+            raise urllib3.exceptions.ProtocolError('Connection aborted.', e)
+        except BaseException:
+            connection.close()
+            raise
+        if keep_alive:
+            self._idle.append(connection)
+        else:
+            connection.close()
+        return response
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+def _serialize_head(method, target, headers):
+    lines = ['%s %s HTTP/1.1' % (method, target)]
+    lines.extend('%s: %s' % (name, value) for name, value in headers.items())
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+async def _read_head(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise http.client.RemoteDisconnected('Remote end closed connection without response')
+    try:
+        _version, status, reason = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+        status = int(status)
+    except ValueError:
+        raise http.client.BadStatusLine(status_line)
+    header_lines = []
+    while True:
+        line = await reader.readline()
+        header_lines.append(line)
+        if line in (b'\r\n', b'\n', b''):
+            break
+    return status, reason, http.client.parse_headers(io.BytesIO(b''.join(header_lines)))
+
+
+async def _read_body(reader, method, status, headers):
+    '''
+    Returns the body of the response and whether the connection can be
+    reused.
+    '''
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    try:
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            return b'', keep_alive
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b';', 1)[0].strip(), 16)
+                if size == 0:
+                    # Skip trailers
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return b''.join(chunks), keep_alive
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+        if 'content-length' in headers:
+            return await reader.readexactly(int(headers['content-length'])), keep_alive
+        return await reader.read(), False
+    except asyncio.IncompleteReadError as e:
+        raise urllib3.exceptions.ProtocolError('Connection broken: IncompleteRead(%d bytes read)' % len(e.partial), e)
+    except ValueError as e:
+        raise urllib3.exceptions.ProtocolError('Connection broken: invalid chunk length', e)
+
+
+async def _exchange(connection, method, target, headers, body):
+    connection.writer.write(_serialize_head(method, target, headers))
+    if body:
+        connection.writer.write(body)
+    await connection.writer.drain()
+    status, reason, response_headers = await _read_head(connection.reader)
+    headers_received = time.time()
+    data, keep_alive = await _read_body(connection.reader, method, status, response_headers)
+    return DXAsyncHTTPResponse(status, reason, response_headers, data, headers_received), keep_alive
+
+
+def _get_pool(url, pool_args):
+    url_info = urlsplit(url)
+    scheme = url_info.scheme
+    port = url_info.port or (443 if scheme == 'https' else 80)
+    pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    key = (scheme, url_info.hostname, port) + tuple(pool_args[arg] for arg in sorted(pool_args))
+    if key not in pools:
+        maxsize = dxpy.API_SERVER_POOL_SIZE if url_info.hostname == dxpy.APISERVER_HOST else dxpy.STORAGE_POOL_SIZE
+        pools[key] = _ConnectionPool(scheme, url_info.hostname, port, maxsize,
+                                     _get_ssl_context(**pool_args) if scheme == 'https' else None)
+    return pools[key]
+
+
+async def close():
+    '''
+    Closes the idle connections opened by the running event loop.
+    '''
+    for pool in _pools.pop(asyncio.get_running_loop(), {}).values():
+        pool.close()
+
+
+def _encode_header(value):
+    return value.decode('ascii') if isinstance(value, bytes) else value
+
+
+async def _request_once(method, url, headers, body, timeout, pool_args):
+    url_info = urlsplit(url)
+    target = (url_info.path or '/') + ('?' + url_info.query if url_info.query else '')
+    try:
+        target.encode('ascii')
+    except UnicodeEncodeError:
+        import urllib.parse
+        target = urllib.parse.quote(url_info.path) + ('?' + url_info.query if url_info.query else '')
+    request_headers = {_encode_header(name): _encode_header(value) for name, value in headers.items()
+                       if _encode_header(name).lower() not in ('host', 'content-length')}
+    request_headers['User-Agent'] = dxpy.USER_AGENT
+    request_headers['DNAnexus-API'] = dxpy.API_VERSION
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    request_headers['Content-Length'] = str(len(body or b''))
+    return await _get_pool(url, pool_args).request(method, target, request_headers, body, timeout)
+
+
+async def DXHTTPRequest(resource, data, method='POST', headers=None, auth=True, timeout=dxpy.DEFAULT_TIMEOUT,
+                        jsonify_data=True, want_full_response=False, decode_response_body=True, prepend_srv=True,
+                        max_retries=dxpy.DEFAULT_RETRIES, always_retry=False, **kwargs):
+    '''
+    :param resource: API server route, e.g. "/record/new". If *prepend_srv* is False, a fully qualified URL is expected.
+    :type resource: string
+    :param data: Content of the request body
+    :type data: list or dict, if *jsonify_data* is True; or bytes or string, otherwise
+    :returns: Response from API server in the format indicated by *want_full_response* and *decode_response_body*; the full response is a :class:`DXAsyncHTTPResponse`.
+    :raises: :exc:`~dxpy.exceptions.DXAPIError` or a subclass if the server returned a non-200 status code, or one of :data:`~dxpy.exceptions.network_exceptions` if no valid response was received
+
+    Coroutine that makes an HTTP request to the API server. The other
+    parameters, and the conditions under which a failed request is
+    retried (after the same backoff, or the delay requested by a 503
+    response), are those of :func:`dxpy.DXHTTPRequest`. The arguments
+    *verify*, *cert_file*, *key_file* and *ssl_context* are also
+    accepted.
+    '''
+    if headers is None:
+        headers = {}
+
+    seq_num = dxpy._get_sequence_number()
+
+    url = dxpy.APISERVER + resource if prepend_srv else resource
+    method = method.upper()
+
+    if auth is True:
+        auth = dxpy.AUTH_HELPER
+
+    if auth:
+        auth(dxpy._RequestForAuth(method, url, headers))
+
+    pool_args = {arg: kwargs.pop(arg, None) for arg in ("verify", "cert_file", "key_file", "ssl_context")}
+    if kwargs:
+        raise TypeError('Unexpected keyword arguments: ' + ', '.join(sorted(kwargs)))
+
+    if jsonify_data:
+        serialized_data = json.dumps(data)
+        if 'Content-Type' not in headers and method == 'POST':
+            headers['Content-Type'] = 'application/json'
+    else:
+        serialized_data = data
+
+    recorder = dxpy._new_request_recorder(seq_num, method, serialized_data)
+    limits = dxpy._get_request_limits(prepend_srv)
+
+    try_index = 0  # excluding 503 errors
+    try_index_including_503 = 0  # including 503 errors, used for the backoff
+
+    redirect_url = None
+    while True:
+        response = None
+        req_id = None
+        retrying, error_msg = False, None
+        await limits.bucket.acquire_async()
+        await rate_limiter.get_host_pauses().wait_async(dxpy._url_host(url))
+        time_started = time.time()
+        if recorder is not None:
+            recorder.attempt(url, prepend_srv)
+        try:
+            dxpy._debug_print_request(dxpy._DEBUG, seq_num, time_started, method, url, headers, jsonify_data, data)
+
+            response = await _request_once(method, url, headers, serialized_data, timeout, pool_args)
+            if recorder is not None:
+                recorder.response_received(response, time_started, response._headers_received)
+            req_id = response.headers.get("x-request-id", "unavailable")
+
+            # Handle redirection manually for symlink files
+            if response.status // 100 == 3:
+                redirect_url = response.headers.get('Location')
+                if not redirect_url:
+                    raise exceptions.UrllibInternalError("Location not found in redirect response", response.status)
+                break
+
+            if response.status // 100 != 2:
+                dxpy._raise_error_for_response(response, time_started, req_id)
+
+            if recorder is not None:
+                recorder.bytes_received = len(response.data)
+            if want_full_response:
+                return response
+
+            content = response.data
+            response_was_json = False
+            if decode_response_body:
+                content = content.decode('utf-8')
+                if response.headers.get('content-type', '').startswith('application/json'):
+                    try:
+                        content = json.loads(content)
+                    except ValueError:
+                        # The JSON is not parsable, but we should be able to retry.
+                        raise exceptions.BadJSONInReply("Invalid JSON received from server", response.status)
+                    else:
+                        response_was_json = True
+
+            dxpy._debug_print_response(dxpy._DEBUG, seq_num, time_started, response.headers.get('x-request-id') or "--",
+                                       response.status, response_was_json, method, url, content)
+
+            if try_index > 0:
+                logger.info("[%s] %s %s: Recovered after %d retries", time.ctime(), method, url, try_index)
+            return content
+        except Exception as e:
+            exception_msg = error_msg = dxpy._extract_msg_from_last_exception()
+            if not (isinstance(e, dxpy._expected_exceptions)
+                    and dxpy._ok_to_retry(e, response, method, always_retry, try_index, max_retries, exception_msg,
+                                          time_started, req_id)
+                    and dxpy._withdraw_retry(limits, method, url, exception_msg)):
+                # All retries have been exhausted OR the error is deemed not retryable
+                if not isinstance(e, exceptions.DXAPIError):
+                    logger.error("[%s] %s %s: %s.", time.ctime(), method, url, exception_msg)
+                raise
+
+            dxpy._count_request_retry()
+            delay = dxpy._calculate_retry_delay(response, try_index_including_503 + 1)
+            dxpy._pause_host_for_retry(response, url)
+            if response is not None and response.status == 503:
+                waiting_msg = 'Waiting %d seconds before retry...' % (delay,)
+            else:
+                waiting_msg = 'Waiting %d seconds before retry %d of %d...' % (delay, try_index + 1, max_retries)
+            log_msg = "[%s] %s %s: %s. %s" % (time.ctime(), method, url, exception_msg, waiting_msg)
+            if isinstance(e, exceptions.HTTPErrorWithContent):
+                log_msg += "\n%s" % e.content
+            logger.warning(log_msg)
+            if recorder is not None:
+                recorder.retry(exception_msg, delay)
+            retrying = True
+        finally:
+            if recorder is not None and not retrying:
+                recorder.end(error_msg)
+
+        await asyncio.sleep(delay)
+        try_index_including_503 += 1
+        if response is None or response.status != 503:
+            try_index += 1
+
+    return await DXHTTPRequest(redirect_url, serialized_data, method=method, headers=headers, auth=auth,
+                               timeout=timeout, jsonify_data=False, want_full_response=want_full_response,
+                               decode_response_body=decode_response_body, prepend_srv=False,
+                               max_retries=max_retries, always_retry=always_retry, **pool_args)
@@ -25,6 +25,7 @@ from __future__ import print_function, unicode_literals, division, absolute_impo
 import time, copy, re
 
 import dxpy.api
+from ..utils import describe_cache
 from ..exceptions import (DXError, DXAPIError, DXFileError, DXSearchError, DXAppletError,
                           DXJobFailureError, AppError, AppInternalError, DXCLIError)
 from ..compat import basestring
@@ -373,10 +374,19 @@ class DXDataObject(DXObject):
         if self._proj is not None:
             describe_input["project"] = self._proj
 
-        self._desc = self._describe(self._dxid, describe_input, **kwargs)
+        cache = describe_cache.get_describe_cache()
+        desc = cache.get(self._dxid, self._proj, describe_input) if cache is not None else None
+        if desc is None:
+            desc = self._describe(self._dxid, describe_input, **kwargs)
+            if cache is not None:
+                cache.put(self._dxid, self._proj, describe_input, desc)
+        self._desc = desc
 
         return self._desc
 
+    def _invalidate_describe_cache(self):
+        describe_cache.invalidate_describe_cache(self._dxid)
+
     def add_types(self, types, **kwargs):
         """
         :param types: Types to add to the object
@@ -388,7 +398,10 @@ class DXDataObject(DXObject):
 
         """
 
-        self._add_types(self._dxid, {"types": types}, **kwargs)
+        try:
+            self._add_types(self._dxid, {"types": types}, **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def remove_types(self, types, **kwargs):
         """
@@ -401,7 +414,10 @@ class DXDataObject(DXObject):
 
         """
 
-        self._remove_types(self._dxid, {"types": types}, **kwargs)
+        try:
+            self._remove_types(self._dxid, {"types": types}, **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def get_details(self, **kwargs):
         """
@@ -425,7 +441,10 @@ class DXDataObject(DXObject):
 
         """
 
-        return self._set_details(self._dxid, details, **kwargs)
+        try:
+            return self._set_details(self._dxid, details, **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def hide(self, **kwargs):
         """
@@ -435,7 +454,10 @@ class DXDataObject(DXObject):
 
         """
 
-        return self._set_visibility(self._dxid, {"hidden": True}, **kwargs)
+        try:
+            return self._set_visibility(self._dxid, {"hidden": True}, **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def unhide(self, **kwargs):
         """
@@ -445,7 +467,10 @@ class DXDataObject(DXObject):
 
         """
 
-        return self._set_visibility(self._dxid, {"hidden": False}, **kwargs)
+        try:
+            return self._set_visibility(self._dxid, {"hidden": False}, **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def rename(self, name, **kwargs):
         """
@@ -459,8 +484,11 @@ class DXDataObject(DXObject):
 
         """
 
-        return self._rename(self._dxid, {"project": self._proj,
-                                         "name": name}, **kwargs)
+        try:
+            return self._rename(self._dxid, {"project": self._proj,
+                                             "name": name}, **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def get_properties(self, **kwargs):
         """
@@ -502,9 +530,12 @@ class DXDataObject(DXObject):
 
         """
 
-        self._set_properties(self._dxid, {"project": self._proj,
-                                          "properties": properties},
-                             **kwargs)
+        try:
+            self._set_properties(self._dxid, {"project": self._proj,
+                                              "properties": properties},
+                                 **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def add_tags(self, tags, **kwargs):
         """
@@ -519,8 +550,11 @@ class DXDataObject(DXObject):
 
         """
 
-        self._add_tags(self._dxid, {"project": self._proj, "tags": tags},
-                       **kwargs)
+        try:
+            self._add_tags(self._dxid, {"project": self._proj, "tags": tags},
+                           **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def remove_tags(self, tags, **kwargs):
         """
@@ -535,8 +569,11 @@ class DXDataObject(DXObject):
 
         """
 
-        self._remove_tags(self._dxid, {"project": self._proj, "tags": tags},
-                          **kwargs)
+        try:
+            self._remove_tags(self._dxid, {"project": self._proj, "tags": tags},
+                              **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def close(self, **kwargs):
         """
@@ -545,7 +582,10 @@ class DXDataObject(DXObject):
 
         """
 
-        return self._close(self._dxid, **kwargs)
+        try:
+            return self._close(self._dxid, **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
     def list_projects(self, **kwargs):
         """
@@ -569,8 +609,11 @@ class DXDataObject(DXObject):
         if self._proj is None:
             raise DXError("Remove called when a project ID was not associated with this object handler")
 
-        dxpy.api.project_remove_objects(self._proj, {"objects": [self._dxid]},
-                                        **kwargs)
+        try:
+            dxpy.api.project_remove_objects(self._proj, {"objects": [self._dxid]},
+                                            **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
         # Reset internal state
         self._dxid = None
@@ -590,9 +633,12 @@ class DXDataObject(DXObject):
         if self._proj is None:
             raise DXError("Move called when a project ID was not associated with this object handler")
 
-        dxpy.api.project_move(self._proj, {"objects": [self._dxid],
-                                           "destination": folder},
-                              **kwargs)
+        try:
+            dxpy.api.project_move(self._proj, {"objects": [self._dxid],
+                                               "destination": folder},
+                                  **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
 
     def clone(self, project, folder="/", **kwargs):
@@ -681,11 +727,11 @@ class DXDataObject(DXObject):
             i += 1
             elapsed += wait
 
-from .dxfile import DXFile, DXFILE_HTTP_THREADS, DEFAULT_BUFFER_SIZE
+from .dxfile import DXFile, DXFileBlockCache, DXFILE_HTTP_THREADS, DEFAULT_BUFFER_SIZE
 from .dxdatabase import DXDatabase, DXFILE_HTTP_THREADS, DEFAULT_BUFFER_SIZE
 from .download_all_inputs import download_all_inputs
 from .mount_all_inputs import mount_all_inputs
-from .dxfile_functions import open_dxfile, new_dxfile, download_dxfile, upload_local_file, upload_string, list_subfolders, download_folder
+from .dxfile_functions import open_dxfile, new_dxfile, download_dxfile, download_dxfiles, cache_dxfile, upload_local_file, upload_local_files, upload_string, list_subfolders, download_folder
 from .dxdatabase_functions import download_dxdatabasefile
 from .dxrecord import DXRecord, new_dxrecord
 from .dxproject import DXContainer, DXProject
@@ -696,7 +742,10 @@ from .dxapp import DXApp
 from .dxglobalworkflow import DXGlobalWorkflow
 from .dxworkflow import DXWorkflow, new_dxworkflow
 from .auth import user_info, whoami
-from .dxdataobject_functions import dxlink, is_dxlink, get_dxlink_ids, get_handler, describe, get_details, remove
+from ..utils.file_cache import enable_file_cache, disable_file_cache, get_file_cache
+from ..utils.describe_cache import (enable_describe_cache, disable_describe_cache, get_describe_cache,
+                                    get_describe_cache_stats)
+from .dxdataobject_functions import dxlink, is_dxlink, get_dxlink_ids, get_handler, describe, describe_async, get_details, remove
 from .search import (find_data_objects, find_executions, find_jobs, find_analyses, find_projects, find_apps, find_global_workflows,
                      find_one_data_object, find_one_project, find_one_app, resolve_data_objects, find_orgs,
                      org_find_members, org_find_projects, org_find_apps)
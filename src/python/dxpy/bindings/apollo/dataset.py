@@ -1,8 +1,6 @@
-import sys
-import gzip
 from dxpy import DXHTTPRequest
-from dxpy.bindings import DXRecord, DXFile
-import json
+from dxpy.bindings import DXRecord
+from dxpy.bindings.apollo.descriptor_cache import get_descriptor_cache
 
 
 class Dataset(DXRecord):
@@ -39,22 +37,7 @@ class Dataset(DXRecord):
 
     @property
     def descriptor_file_dict(self):
-        is_python2 = sys.version_info.major == 2
-        content = DXFile(
-            self.descriptor_file, mode="rb", project=self.project_id
-        ).read()
-
-        if is_python2:
-            import StringIO
-
-            x = StringIO.StringIO(content)
-            file_obj = gzip.GzipFile(fileobj=x)
-            content = file_obj.read()
-
-        else:
-            content = gzip.decompress(content)
-
-        return json.loads(content)
+        return get_descriptor_cache().get(self.descriptor_file, project=self.project_id)
 
     @property
     def visualize_info(self):
@@ -88,24 +71,7 @@ class Dataset(DXRecord):
 
     @property
     def assays_info_dict(self):
-        assays = self.descriptor_file_dict["assays"]
-        assays_info_dict = {}
-
-        for index in range(len(assays)):
-            model = assays[index]["generalized_assay_model"]
-            assay_dict = {
-                "name": assays[index]["name"],
-                "index": index,
-                "uuid": assays[index]["uuid"],
-                "reference": assays[index].get("reference"),
-            }
-
-            if model not in assays_info_dict.keys():
-                assays_info_dict[model] = []
-
-            assays_info_dict[model].append(assay_dict)
-
-        return assays_info_dict
+        return get_descriptor_cache().get_index(self.descriptor_file, project=self.project_id)["assays"]
 
     def assay_names_list(self, assay_type):
         assay_names_list = []
@@ -0,0 +1,221 @@
+# Copyright (C) 2013-2016 DNAnexus, Inc.
+#
+# This file is part of dx-toolkit (DNAnexus platform client libraries).
+#
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may not
+#   use this file except in compliance with the License. You may obtain a copy
+#   of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""
+Cache of the parsed descriptors of datasets, and of an index of their
+assays and entities, keyed by the ID of the descriptor file (the
+contents of a closed file never change).
+
+Descriptors are always cached in memory, for the lifetime of the
+process. They can also be stored on disk, to be reused by later
+processes (for example, successive ``dx extract_assay`` commands), by
+calling :func:`configure_descriptor_cache`, or by setting the
+environment variable ``DX_DATASET_DESCRIPTOR_CACHE_DIR`` to the cache
+directory.
+"""
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import collections
+import gzip
+import json
+import os
+import threading
+
+from dxpy.bindings import DXFile
+
+# Version of the format of the files in the on-disk cache; files written in
+# another format are ignored
+CACHE_FORMAT_VERSION = 1
+
+
+def build_descriptor_index(descriptor):
+    '''
+    :param descriptor: Parsed descriptor of a dataset
+    :type descriptor: dict
+    :returns: Index of the descriptor: "assays" maps each generalized assay model to the list of its assays (with
+        their "name", "index" in the descriptor, "uuid" and "reference"), and "entities" maps each entity name to the
+        list of the names of its fields
+    :rtype: dict
+    '''
+    assays = collections.OrderedDict()
+    for index, assay in enumerate(descriptor.get("assays", [])):
+        assays.setdefault(assay["generalized_assay_model"], []).append({
+            "name": assay["name"],
+            "index": index,
+            "uuid": assay["uuid"],
+            "reference": assay.get("reference"),
+        })
+    entities = collections.OrderedDict(
+        (name, list(entity.get("fields", {})))
+        for name, entity in descriptor.get("model", {}).get("entities", {}).items()
+    )
+    return {"assays": assays, "entities": entities}
+
+
+def _download_descriptor(file_id, project):
+    content = DXFile(file_id, mode="rb", project=project).read()
+    return json.loads(gzip.decompress(content).decode("utf-8"), object_pairs_hook=collections.OrderedDict)
+
+
+class DatasetDescriptorCache(object):
+    """
+    Keeps the *max_entries* most recently used descriptors in memory
+    and, if *directory* is set, every descriptor (and its index) in a
+    file of that directory.
+
+    The descriptors returned are shared by all the callers, and must
+    not be modified.
+    """
+    def __init__(self, max_entries=4, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._descriptors = collections.OrderedDict()
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _path(self, file_id, kind):
+        return os.path.join(self.directory, "{}.v{}.{}.json".format(file_id, CACHE_FORMAT_VERSION, kind))
+
+    def _read(self, file_id, kind):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(file_id, kind)) as fd:
+                return json.load(fd, object_pairs_hook=collections.OrderedDict)
+        except (IOError, OSError, ValueError):
+            # Missing, or left incomplete or corrupted
+            return None
+
+    def _write(self, file_id, kind, value):
+        if self.directory is None:
+            return
+        path = self._path(file_id, kind)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with open(tmp_path, "w") as fd:
+                json.dump(value, fd)
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            # The cache is only an optimization
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _remember(self, file_id, descriptor):
+        with self._lock:
+            self._descriptors[file_id] = descriptor
+            self._descriptors.move_to_end(file_id)
+            while len(self._descriptors) > self.max_entries:
+                self._descriptors.popitem(last=False)
+
+    def get(self, file_id, project=None):
+        '''
+        :param file_id: ID of the (gzipped) descriptor file
+        :type file_id: string
+        :param project: Project from which to download the file, if it is not cached
+        :type project: string
+        :returns: The parsed descriptor
+        :rtype: dict
+        '''
+        with self._lock:
+            descriptor = self._descriptors.get(file_id)
+        if descriptor is not None:
+            self._remember(file_id, descriptor)
+            return descriptor
+        descriptor = self._read(file_id, "descriptor")
+        downloaded = descriptor is None
+        if downloaded:
+            descriptor = _download_descriptor(file_id, project)
+            self._write(file_id, "descriptor", descriptor)
+        self._remember(file_id, descriptor)
+        with self._lock:
+            index = self._indexes.get(file_id)
+        if index is None:
+            index = build_descriptor_index(descriptor)
+            with self._lock:
+                self._indexes[file_id] = index
+            # An index found on disk is replaced along with its descriptor
+            if downloaded or (self.directory is not None and not os.path.exists(self._path(file_id, "index"))):
+                self._write(file_id, "index", index)
+        return descriptor
+
+    def get_index(self, file_id, project=None):
+        '''
+        :param file_id: ID of the (gzipped) descriptor file
+        :type file_id: string
+        :param project: Project from which to download the file, if it is not cached
+        :type project: string
+        :returns: The index of the descriptor (see :func:`build_descriptor_index`)
+        :rtype: dict
+
+        The index is read from the on-disk cache if it is there, without
+        reading the (much larger) descriptor.
+        '''
+        with self._lock:
+            index = self._indexes.get(file_id)
+        if index is not None:
+            return index
+        index = self._read(file_id, "index")
+        if index is not None:
+            with self._lock:
+                self._indexes[file_id] = index
+            return index
+        self.get(file_id, project=project)
+        return self._indexes[file_id]
+
+    def clear(self):
+        '''
+        Discards the descriptors kept in memory. The on-disk cache is left
+        as is.
+        '''
+        with self._lock:
+            self._descriptors.clear()
+            self._indexes.clear()
+
+
+_descriptor_cache = DatasetDescriptorCache()
+
+
+def configure_descriptor_cache(directory=None, max_entries=4):
+    '''
+    :param directory: Directory in which descriptors are stored for later processes, or None to only cache them in
+        memory
+    :type directory: string
+    :param max_entries: Maximum number of descriptors kept in memory
+    :type max_entries: int
+    :returns: The cache
+    :rtype: :class:`DatasetDescriptorCache`
+
+    Replaces the descriptor cache (discarding the descriptors kept in
+    memory).
+    '''
+    global _descriptor_cache
+    _descriptor_cache = DatasetDescriptorCache(max_entries=max_entries, directory=directory)
+    return _descriptor_cache
+
+
+def get_descriptor_cache():
+    '''
+    :returns: The descriptor cache
+    :rtype: :class:`DatasetDescriptorCache`
+    '''
+    return _descriptor_cache
+
+
+if os.environ.get("DX_DATASET_DESCRIPTOR_CACHE_DIR"):
+    configure_descriptor_cache(os.environ["DX_DATASET_DESCRIPTOR_CACHE_DIR"])
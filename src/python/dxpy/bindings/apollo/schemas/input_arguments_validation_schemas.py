@@ -16,6 +16,7 @@ EXTRACT_ASSAY_EXPRESSION_INPUT_ARGS_SCHEMA = {
         "expression_matrix",
         "json_help",
         "filter_json",
+        "page_size",
     ],
     "1_path_or_json_help-at_least_one_required": {
         "properties": {
@@ -120,4 +121,14 @@ EXTRACT_ASSAY_EXPRESSION_INPUT_ARGS_SCHEMA = {
             "message": '"--expression-matrix"/"-em" cannot be passed with the flag, "--sql".'
         },
     },
+    "10_page_size-with_none_of": {
+        "properties": {
+            "main_key": "page_size",
+            "items": ["expression_matrix", "sql"],
+        },
+        "condition": "with_none_of",
+        "error_message": {
+            "message": '"--page-size" cannot be passed with "--expression-matrix"/"-em" or "--sql".'
+        },
+    },
 }
@@ -1,6 +1,43 @@
 from __future__ import print_function
 import dxpy
 
+
+def iter_paged_results(get_response, payload, page_size, error_handler=print):
+    """
+    Yields the rows ("results") of a raw query, requesting them
+    *page_size* rows at a time (with "limit" and "offset"), so that only
+    one page is held in memory. get_response(payload) returns the
+    response of the server to a payload.
+
+    The pages are cut from the rows in the order of the "order_by" of
+    the payload; if it is not set, the rows are ordered by all the
+    returned fields. A "limit" already in the payload is honored.
+    """
+    payload = dict(payload)
+    total_limit = payload.pop("limit", None)
+    if "order_by" not in payload:
+        fields = payload["fields"]
+        if isinstance(fields, dict):
+            fields = [fields]
+        payload["order_by"] = [{name: "asc"} for field in fields for name in field]
+
+    offset = 0
+    previous_first_row = None
+    while total_limit is None or offset < total_limit:
+        limit = page_size if total_limit is None else min(page_size, total_limit - offset)
+        rows = get_response(dict(payload, limit=limit, offset=offset))["results"]
+        if rows and offset > 0 and rows[0] == previous_first_row:
+            error_handler("The server returned the same page of results twice; it may not support paging")
+            return
+        for row in rows:
+            yield row
+        if len(rows) != limit:
+            # The last page (or all the rows, if the server does not page)
+            return
+        previous_first_row = rows[0]
+        offset += limit
+
+
 class VizClient(object):
     def __init__(self, url, project_id, error_handler=print):
         self.url = url
@@ -31,6 +68,19 @@ class VizClient(object):
         resource_url = "{}/data/3.0/{}/raw".format(self.url, record_id)
         return self._get_response(payload, resource_url)
 
+    def iter_data(self, payload, record_id, page_size):
+        """
+        Yields the rows returned by get_data, fetching them page_size rows
+        at a time (see iter_paged_results).
+        """
+        resource_url = "{}/data/3.0/{}/raw".format(self.url, record_id)
+        return iter_paged_results(
+            lambda page_payload: self._get_response(page_payload, resource_url),
+            payload,
+            page_size,
+            error_handler=self.error_handler,
+        )
+
     def get_raw_sql(self, payload, record_id):
         resource_url = "{}/viz-query/3.0/{}/raw-query".format(self.url, record_id)
         return self._get_response(payload, resource_url)
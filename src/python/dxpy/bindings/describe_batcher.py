@@ -0,0 +1,233 @@
+# Copyright (C) 2013-2016 DNAnexus, Inc.
+#
+# This file is part of dx-toolkit (DNAnexus platform client libraries).
+#
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may not
+#   use this file except in compliance with the License. You may obtain a copy
+#   of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+'''
+Coalesces describe requests for individual data objects into bulk
+:meth:`~dxpy.api.system_describe_data_objects` calls.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import concurrent.futures
+import threading
+import time
+
+import dxpy
+from .. import exceptions
+
+# Maximum number of objects accepted by a single /system/describeDataObjects call
+MAX_DESCRIBE_BATCH_SIZE = 1000
+
+
+class DXDescribeBatcher(object):
+    '''
+    Merges describe requests for data objects, made from any number of
+    threads, into bulk :meth:`~dxpy.api.system_describe_data_objects`
+    calls.
+
+    Each call to :meth:`describe_async` queues one object and returns a
+    :class:`concurrent.futures.Future` for its describe output. A batch
+    is sent as soon as *max_batch_size* objects are queued, or
+    *max_delay* seconds after its first object was queued, whichever
+    comes first. Objects that cannot be described (for example, because
+    they do not exist) fail their own future with
+    :class:`~dxpy.exceptions.DXAPIError`; the other objects in the batch
+    are unaffected.
+
+    Example::
+
+        batcher = DXDescribeBatcher()
+        futures = [batcher.describe_async(file_id, fields={"name", "size"}) for file_id in file_ids]
+        sizes = {f.result()["name"]: f.result()["size"] for f in futures}
+
+    '''
+    def __init__(self, max_batch_size=MAX_DESCRIBE_BATCH_SIZE, max_delay=0.01, class_describe_options=None,
+                 **kwargs):
+        '''
+        :param max_batch_size: Maximum number of objects described by a single API call
+        :type max_batch_size: int
+        :param max_delay: Number of seconds to wait for more requests before sending a partial batch
+        :type max_delay: float
+        :param class_describe_options: Describe options for each data object class, sent as "classDescribeOptions" with every batch
+        :type class_describe_options: dict
+
+        Additional keyword arguments are passed to
+        :meth:`~dxpy.api.system_describe_data_objects`.
+        '''
+        self.max_batch_size = min(max_batch_size, MAX_DESCRIBE_BATCH_SIZE)
+        self.max_delay = max_delay
+        self.class_describe_options = class_describe_options
+        self._api_kwargs = kwargs
+        self._cond = threading.Condition()
+        self._queue = []
+        self._first_queued_at = None
+        self._thread = None
+        self.idle_timeout = 1.0
+
+    def describe_async(self, object_id, project=None, fields=None, default_fields=None, **kwargs):
+        '''
+        :param object_id: ID of the data object to describe
+        :type object_id: string
+        :param project: Project ID in which to describe the object
+        :type project: string
+        :param fields: Set of fields to include in the describe output, or a "fields" mapping as accepted by the API
+        :type fields: set or list of strings, or dict
+        :param default_fields: Whether to include the default set of fields in the output
+        :type default_fields: bool
+        :returns: Future for the describe output of the object
+        :rtype: :class:`concurrent.futures.Future`
+
+        Queues a describe request for the object. Any other keyword
+        arguments are passed as describe options for the object.
+        '''
+        future = self._enqueue(object_id, project, fields, default_fields, kwargs)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        return future
+
+    def _enqueue(self, object_id, project=None, fields=None, default_fields=None, options=None):
+        future = concurrent.futures.Future()
+        with self._cond:
+            if not self._queue:
+                self._first_queued_at = time.time()
+            self._queue.append((_describe_entry(object_id, project, fields, default_fields, options), future))
+            self._cond.notify()
+        return future
+
+    def describe_many(self, object_ids, **kwargs):
+        '''
+        :param object_ids: IDs of the data objects to describe
+        :type object_ids: iterable of strings
+        :returns: describe outputs, in the same order as *object_ids*
+        :rtype: list of dicts
+
+        Describes all the objects with as few API calls as possible. The
+        same keyword arguments, accepted by :meth:`describe_async`, are
+        used for all the objects.
+        '''
+        return describe_many(object_ids, max_batch_size=self.max_batch_size,
+                             class_describe_options=self.class_describe_options, api_kwargs=self._api_kwargs,
+                             **kwargs)
+
+    def flush(self):
+        '''
+        Sends all queued requests without waiting for more requests to
+        arrive.
+        '''
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            self._send(batch)
+
+    def _take_batch(self):
+        with self._cond:
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:self.max_batch_size]
+            self._first_queued_at = time.time() if self._queue else None
+            return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._queue:
+                    # Let the thread exit when the batcher is idle; describe_async starts a new one
+                    self._cond.wait(self.idle_timeout)
+                    if not self._queue:
+                        self._thread = None
+                        return
+                while self._queue and len(self._queue) < self.max_batch_size:
+                    remaining = self._first_queued_at + self.max_delay - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self.flush()
+
+    def _send(self, batch):
+        results = _describe_batch([entry for entry, _ in batch], self.class_describe_options, self._api_kwargs)
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+def _describe_entry(object_id, project=None, fields=None, default_fields=None, options=None):
+    describe_input = dict(options or {})
+    if project is not None:
+        describe_input['project'] = project
+    if isinstance(fields, dict):
+        describe_input['fields'] = fields
+    elif fields is not None:
+        describe_input['fields'] = {field: True for field in fields}
+    if default_fields is not None:
+        describe_input['defaultFields'] = default_fields
+    return {'id': object_id, 'describe': describe_input or True}
+
+
+def _describe_batch(entries, class_describe_options=None, api_kwargs=None):
+    # Returns the describe output, or the exception, of each entry
+    describe_input = {'objects': entries}
+    if class_describe_options is not None:
+        describe_input['classDescribeOptions'] = class_describe_options
+    try:
+        response = dxpy.api.system_describe_data_objects(describe_input, **(api_kwargs or {}))
+    except Exception as e:
+        return [e] * len(entries)
+    results = []
+    for entry, result in zip(entries, response['results']):
+        if 'describe' in result:
+            results.append(result['describe'])
+        else:
+            error = result.get('error', {'type': 'ResourceNotFound',
+                                         'message': 'Could not describe ' + entry['id']})
+            error_class = getattr(exceptions, error['type'], exceptions.DXAPIError)
+            results.append(error_class({'error': error}, result.get('statusCode', 404)))
+    return results
+
+
+def describe_many(object_ids, project=None, fields=None, default_fields=None, max_batch_size=MAX_DESCRIBE_BATCH_SIZE,
+                  class_describe_options=None, api_kwargs=None, **kwargs):
+    '''
+    :param object_ids: IDs of the data objects to describe
+    :type object_ids: iterable of strings
+    :param max_batch_size: Maximum number of objects described by a single API call
+    :type max_batch_size: int
+    :param class_describe_options: Describe options for each data object class, sent as "classDescribeOptions" with every call
+    :type class_describe_options: dict
+    :param api_kwargs: Keyword arguments passed to :meth:`~dxpy.api.system_describe_data_objects`
+    :type api_kwargs: dict
+    :returns: describe outputs, in the same order as *object_ids*
+    :rtype: list of dicts
+    :raises: :class:`~dxpy.exceptions.DXAPIError` if any object could not be described
+
+    Describes all the objects in the calling thread, with as few API
+    calls as possible. *project*, *fields*, *default_fields* and the
+    other keyword arguments are used for all the objects, as in
+    :meth:`DXDescribeBatcher.describe_async`.
+    '''
+    entries = [_describe_entry(object_id, project, fields, default_fields, kwargs) for object_id in object_ids]
+    max_batch_size = min(max_batch_size, MAX_DESCRIBE_BATCH_SIZE)
+    descs = []
+    for start in range(0, len(entries), max_batch_size):
+        for result in _describe_batch(entries[start:start + max_batch_size], class_describe_options, api_kwargs):
+            if isinstance(result, Exception):
+                raise result
+            descs.append(result)
+    return descs
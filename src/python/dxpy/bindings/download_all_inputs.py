@@ -19,10 +19,12 @@ import concurrent.futures
 import os
 import sys
 import multiprocessing
-import psutil
+import threading
+import time
 
 import dxpy
 from dxpy.utils import file_load_utils
+from dxpy.bindings.dxfile import DEFAULT_BUFFER_SIZE, DXFILE_HTTP_MAX_THREADS, MIN_BUFFER_SIZE
 
 def _create_dirs(idir, dirs):
     '''
@@ -79,6 +81,131 @@ def _parallel_file_download(to_download, idir, max_num_parallel_downloads):
         print("", file=sys.stderr)
         os._exit(os.EX_IOERR)
 
+class _ConnectionGrant(object):
+    '''
+    Connections granted to one file by a :class:`_DownloadScheduler`,
+    passed as the *max_active_tasks* of its download: its *window* is
+    read again every time a chunk has been written, and grows as other
+    files finish.
+    '''
+    def __init__(self, scheduler, num_chunks, connections):
+        self._scheduler = scheduler
+        self.num_chunks = num_chunks
+        self.connections = connections
+
+    @property
+    def window(self):
+        return self._scheduler._regrant(self)
+
+class _DownloadScheduler(object):
+    '''
+    Plans the download of a whole set of files under two global limits:
+    the number of range requests in flight (*max_connections*), and the
+    number of bytes those requests buffer in memory (*max_buffer_bytes*,
+    at most one chunk of *chunksize* bytes per request).
+
+    Files are started largest first, up to *max_files* at a time. Each
+    file is granted a fair share of the connections (but no more than it
+    has chunks). Shares grow as the set of files left shrinks, and the
+    connections freed by the files that are done are granted both to the
+    files started later and to those still running.
+    '''
+    def __init__(self, max_files, max_connections, max_buffer_bytes, chunksize=DEFAULT_BUFFER_SIZE):
+        self.max_files = max(max_files, 1)
+        self.chunksize = max(min(chunksize, max_buffer_bytes), MIN_BUFFER_SIZE)
+        self.num_connections = max(min(max_connections, max_buffer_bytes // self.chunksize), 1)
+        self.bytes_downloaded = 0
+        self.elapsed = None
+        self._cond = threading.Condition()
+        self._free_connections = self.num_connections
+        self._num_unfinished = 0
+
+    def _fair_share(self):
+        return max(self.num_connections // min(self.max_files, self._num_unfinished), 1)
+
+    def _acquire(self, file_size):
+        num_chunks = max(-(-file_size // self.chunksize), 1)
+        with self._cond:
+            while self._free_connections == 0:
+                self._cond.wait()
+            connections = min(num_chunks, self._fair_share(), self._free_connections)
+            self._free_connections -= connections
+            return _ConnectionGrant(self, num_chunks, connections)
+
+    def _regrant(self, grant):
+        # Connections are only ever added to a grant, so that its chunks in
+        # flight never exceed it
+        with self._cond:
+            extra = min(min(grant.num_chunks, self._fair_share()) - grant.connections, self._free_connections)
+            if extra > 0:
+                grant.connections += extra
+                self._free_connections -= extra
+            return grant.connections
+
+    def _release(self, grant, file_size):
+        with self._cond:
+            self._free_connections += grant.connections
+            self._num_unfinished -= 1
+            self.bytes_downloaded += file_size
+            self._cond.notify_all()
+
+    def _download_one_file(self, file_rec, desc, idir):
+        file_size = desc.get('size') or 0
+        grant = self._acquire(file_size)
+        try:
+            dxfile = dxpy.DXFile(file_rec['src_file_id'], mode='r', project=file_rec['handler'].get_proj_id())
+            trg_file = os.path.join(idir, file_rec['trg_fname'])
+            print("downloading file: " + file_rec['src_file_id'] + " to filesystem: " + trg_file +
+                  " ({} connections)".format(grant.connections))
+            sys.stdout.flush()
+            # Caps the number of chunks of this file in flight (or
+            # downloaded and not yet written to disk)
+            dxpy.download_dxfile(dxfile, trg_file, chunksize=self.chunksize, describe_output=desc,
+                                 max_active_tasks=grant)
+        finally:
+            self._release(grant, file_size)
+        return file_rec
+
+    def run(self, to_download, idir):
+        '''
+        Downloads the files described by the records in *to_download*
+        into *idir*, and reports the aggregate throughput on stderr.
+        '''
+        if not to_download:
+            return
+        descs = dxpy.describe([file_rec['src_file_id'] for file_rec in to_download],
+                              fields={'id', 'size', 'parts', 'drive', 'md5'})
+        files = sorted(zip(to_download, descs), key=lambda item: item[1].get('size') or 0, reverse=True)
+        self._num_unfinished = len(files)
+        time_started = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_files) as executor:
+            future_files = {executor.submit(self._download_one_file, file_rec, desc, idir): file_rec
+                            for file_rec, desc in files}
+            for future in concurrent.futures.as_completed(future_files):
+                file_rec = future_files[future]
+                try:
+                    future.result()
+                except Exception:
+                    sys.stderr.write('%r -> %s generated an exception' %
+                                     (file_rec['src_file_id'], file_rec['trg_fname']))
+                    raise
+        self.elapsed = time.time() - time_started
+        sys.stderr.write("Downloaded {} files ({:,} bytes) in {:.1f} seconds ({:.1f} MB/s)\n".format(
+            len(files), self.bytes_downloaded, self.elapsed,
+            self.bytes_downloaded / max(self.elapsed, 1e-6) / (1 << 20)))
+
+def _scheduled_file_download(to_download, idir, max_num_parallel_downloads, max_buffer_bytes):
+    scheduler = _DownloadScheduler(max_num_parallel_downloads, DXFILE_HTTP_MAX_THREADS,
+                                   max_buffer_bytes)
+    sys.stderr.write("Downloading files using up to {} threads and {} connections of {:,} bytes\n".format(
+        scheduler.max_files, scheduler.num_connections, scheduler.chunksize))
+    try:
+        scheduler.run(to_download, idir)
+    except KeyboardInterrupt:
+        # See _parallel_file_download
+        print("", file=sys.stderr)
+        os._exit(os.EX_IOERR)
+
 def _gen_helper_dict(filtered_inputs):
     '''
     Create a dict of values for the downloaded files. This is similar to the variables created
@@ -112,7 +239,7 @@ def _get_num_parallel_threads(max_threads, num_cores, mem_available_mb):
     return min(max_threads, num_cores, max(int(mem_available_mb/1200), 1))
 
 
-def download_all_inputs(exclude=None, parallel=False, max_threads=8):
+def download_all_inputs(exclude=None, parallel=False, max_threads=8, max_buffer_bytes=None):
     '''
     :param exclude: List of input variables that should not be downloaded.
     :type exclude: Array of strings
@@ -121,6 +248,11 @@ def download_all_inputs(exclude=None, parallel=False, max_threads=8):
     :param max_threads: If parallel is True, how many threads should be used
         to download files? (default: 8)
     :type append: int
+    :param max_buffer_bytes: If given, files are downloaded in parallel by a
+        scheduler that shares one budget of HTTP connections among all the
+        files, so that downloaded data buffered in memory never exceeds this
+        many bytes, and reports the aggregate throughput. (default: None)
+    :type max_buffer_bytes: int
     :returns: dict of lists of strings where each key is the input variable
                 and each list element is the full path to the file that has
                 been downloaded.
@@ -192,7 +324,10 @@ def download_all_inputs(exclude=None, parallel=False, max_threads=8):
         to_download.extend(ival_list)
 
     # Download the files
-    if parallel:
+    if max_buffer_bytes is not None:
+        _scheduled_file_download(to_download, idir, max_threads, max_buffer_bytes)
+    elif parallel:
+        import psutil
         total_mem = psutil.virtual_memory().total >> 20  # Total RAM in MB
         num_cores = multiprocessing.cpu_count()
         max_num_parallel_downloads = _get_num_parallel_threads(max_threads, num_cores, total_mem)
@@ -28,8 +28,11 @@ full object handler.
 
 from __future__ import print_function, unicode_literals, division, absolute_import
 
+import threading
+
 import dxpy
 from . import DXDataObject
+from .describe_batcher import DXDescribeBatcher, describe_many
 from . import __dict__ as all_bindings
 from ..exceptions import DXError
 from ..compat import basestring
@@ -214,19 +217,46 @@ def describe(id_or_link, **kwargs):
                     link = link['$dnanexus_link']['id']
             links.append(link)
 
-        # Prepare input to system_describe_data_objects, the same fields will be passed
-        # for all data object classes; if a class doesn't include a field in its describe
-        # output, it will be ignored
-        describe_input = \
-            dict([(field, True) for field in kwargs['fields']]) if kwargs.get('fields', []) else True
-        describe_links_input = [{'id': link, 'describe': describe_input} for link in links]
-        bulk_describe_input = {'objects': describe_links_input}
+        # The same fields will be requested for all data object classes, in addition to the
+        # default fields; if a class doesn't include a field in its describe output, it will
+        # be ignored
+        fields = kwargs.get('fields') or None
+        return describe_many(links, fields=fields, default_fields=True if fields else None,
+                             class_describe_options=kwargs.get('classDescribeOptions'))
+
+_describe_batcher = None
+_describe_batcher_lock = threading.Lock()
+
+def describe_async(id_or_link, **kwargs):
+    '''
+    :param id_or_link: String containing an object ID or dict containing a DXLink
+    :returns: Future for the describe output of the object
+    :rtype: :class:`concurrent.futures.Future`
+
+    Queues a describe request for the object. Requests queued at about
+    the same time, from any thread, are merged into bulk
+    :meth:`~dxpy.api.system_describe_data_objects` calls by a shared
+    :class:`~dxpy.bindings.describe_batcher.DXDescribeBatcher`. Accepts
+    the keyword arguments of
+    :meth:`~dxpy.bindings.describe_batcher.DXDescribeBatcher.describe_async`.
+
+    Example::
 
-        if 'classDescribeOptions' in kwargs:
-            bulk_describe_input['classDescribeOptions'] = kwargs['classDescribeOptions']
+        futures = [describe_async(file_id, fields={"state"}) for file_id in file_ids]
+        states = [future.result()["state"] for future in futures]
 
-        data_object_descriptions = dxpy.api.system_describe_data_objects(bulk_describe_input)
-        return [desc['describe'] for desc in data_object_descriptions['results']]
+    '''
+    global _describe_batcher
+    if is_dxlink(id_or_link):
+        object_id, project = get_dxlink_ids(id_or_link)
+        if project is not None:
+            kwargs.setdefault('project', project)
+    else:
+        object_id = id_or_link
+    with _describe_batcher_lock:
+        if _describe_batcher is None:
+            _describe_batcher = DXDescribeBatcher()
+    return _describe_batcher.describe_async(object_id, **kwargs)
 
 def get_details(id_or_link, **kwargs):
     '''
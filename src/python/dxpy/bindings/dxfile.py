@@ -24,6 +24,7 @@ This remote file handler is a Python file-like object.
 from __future__ import print_function, unicode_literals, division, absolute_import
 
 import os, sys, logging, traceback, hashlib, copy, time
+import collections
 import math
 import mmap
 from threading import Lock
@@ -33,11 +34,16 @@ import dxpy
 from . import DXDataObject
 from ..exceptions import DXFileError, DXIncompleteReadsError
 from ..utils import warn
+from ..utils.adaptive_concurrency import AdaptiveConcurrency
+from ..utils.file_cache import get_file_cache
 from ..utils.resolver import object_exists_in_project
 from ..compat import BytesIO, basestring, USING_PYTHON2, md5_hasher
 
 
 DXFILE_HTTP_THREADS = min(cpu_count(), 8)
+# Upper bound for the adaptive number of concurrent HTTP requests, which
+# starts at DXFILE_HTTP_THREADS
+DXFILE_HTTP_MAX_THREADS = 16
 MIN_BUFFER_SIZE = 1024*1024
 DEFAULT_BUFFER_SIZE = 1024*1024*16
 if dxpy.JOB_ID:
@@ -59,6 +65,187 @@ def _validate_headers(headers):
     return headers
 
 
+def _read_range(url, headers, start_pos, end_pos, timeout, sub_range=True):
+    """
+    Downloads the given byte range of a file. The response is streamed
+    into a buffer allocated once for the whole range, so the range is
+    never held in memory more than once.
+    """
+    data = bytearray(end_pos - start_pos + 1)
+    _read_range_into(url, headers, start_pos, end_pos, timeout, data, sub_range=sub_range)
+    return data
+
+
+def _read_range_into(url, headers, start_pos, end_pos, timeout, buffer, sub_range=True):
+    """
+    Downloads the given byte range of a file into *buffer*, counting the
+    request against the limit on concurrent range requests.
+    """
+    ticket, failed = DXFile._http_concurrency.acquire(), True
+    num_retries = dxpy._get_thread_request_retries()
+    try:
+        dxpy._dxhttp_read_range_into(url, headers, start_pos, end_pos, timeout, buffer, sub_range=sub_range)
+        failed = False
+    finally:
+        DXFile._http_concurrency.release(ticket, 0 if failed else end_pos - start_pos + 1, failed=failed,
+                                         retried=dxpy._get_thread_request_retries() != num_retries)
+
+
+# MD5 checksums are computed on a thread pool of their own, so that hashing
+# overlaps with network I/O and is spread across cores (hashlib releases the
+# GIL while hashing large buffers)
+_md5_threadpool = dxpy.utils.get_futures_threadpool(max_workers=cpu_count())
+
+
+def _md5_hasher_for(data):
+    """
+    Returns an MD5 hasher updated with *data*.
+    """
+    hasher = md5_hasher()
+    hasher.update(data)
+    return hasher
+
+
+class _PipelinedMD5(object):
+    """
+    MD5 hasher whose updates run in the background on the MD5 thread pool,
+    in the order they were made. update() only waits when more than
+    *max_pending_updates* updates are outstanding; hexdigest() waits for all
+    of them.
+    """
+    def __init__(self, max_pending_updates=2):
+        self._hasher = md5_hasher()
+        self._updates = collections.deque()
+        self._max_pending_updates = max_pending_updates
+
+    def _update(self, previous_update, data):
+        if previous_update is not None:
+            previous_update.result()
+        self._hasher.update(data)
+
+    def update(self, data):
+        while len(self._updates) >= self._max_pending_updates:
+            self._updates.popleft().result()
+        previous_update = self._updates[-1] if self._updates else None
+        self._updates.append(_md5_threadpool.submit(self._update, previous_update, data))
+
+    def hexdigest(self):
+        while self._updates:
+            self._updates.popleft().result()
+        return self._hasher.hexdigest()
+
+
+class DXFileBlockCache(object):
+    """
+    Cache of fixed-size blocks of remote files, for random-access reads.
+
+    Blocks are keyed by file ID and offset, so handlers of the same file
+    share them. The least recently used blocks are evicted once their
+    total size exceeds *max_bytes*. While a handler reads consecutive
+    blocks, up to *max_readahead* of the following blocks are requested
+    in advance (the number doubles with each block read in sequence);
+    seeking elsewhere stops the readahead, but blocks already being
+    downloaded are kept, and are used if the reader comes back to them.
+
+    The number of blocks found in the cache (including those still being
+    downloaded) and downloaded on demand are available in the *hits* and
+    *misses* attributes.
+
+    Example::
+
+        cache = DXFileBlockCache(block_size=256*1024)
+        with DXFile("file-xxxx", mode="rb", block_cache=cache) as fd:
+            fd.seek(offset)
+            header = fd.read(1024)
+
+    """
+    def __init__(self, max_bytes=128*1024*1024, block_size=1024*1024, max_readahead=8):
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.max_readahead = max_readahead
+        self.hits, self.misses = 0, 0
+        self._blocks = collections.OrderedDict()
+        self._num_bytes = 0
+        self._lock = Lock()
+
+    def _block_len(self, dxfile, block_start):
+        return min(self.block_size, dxfile._file_length - block_start)
+
+    def _evict(self):
+        # Blocks that are still being downloaded are never evicted
+        for key in list(self._blocks):
+            if self._num_bytes <= self.max_bytes:
+                break
+            future, num_bytes = self._blocks[key]
+            if future.done():
+                del self._blocks[key]
+                self._num_bytes -= num_bytes
+
+    def _request(self, dxfile, block_start, project, **kwargs):
+        key = (dxfile.get_id(), block_start)
+        with self._lock:
+            if key in self._blocks:
+                self._blocks.move_to_end(key)
+                return self._blocks[key][0], True
+        url, headers = dxfile.get_download_url(project=project, **kwargs)
+        block_end = block_start + self._block_len(dxfile, block_start) - 1
+        with self._lock:
+            if key in self._blocks:
+                return self._blocks[key][0], True
+            future = dxfile._http_threadpool.submit(_read_range, url, headers, block_start, block_end,
+                                                    FILE_REQUEST_TIMEOUT)
+            self._blocks[key] = (future, block_end - block_start + 1)
+            self._num_bytes += block_end - block_start + 1
+            self._evict()
+        return future, False
+
+    def get_block(self, dxfile, block_start, project=None, readahead=True, **kwargs):
+        """
+        :returns: Contents of the block of *dxfile* that starts at *block_start*
+        :rtype: bytearray
+
+        Returns the block, downloading it if it is not in the cache, and
+        (if *readahead* is True) requests the following blocks if the
+        cursor of *dxfile* is moving through the file sequentially.
+        """
+        num_blocks_ahead = 0
+        if readahead:
+            if dxfile._last_block_start is not None and block_start == dxfile._last_block_start + self.block_size:
+                dxfile._sequential_blocks += 1
+            elif block_start != dxfile._last_block_start:
+                dxfile._sequential_blocks = 0
+            dxfile._last_block_start = block_start
+            # A single step to the next block is usually a read that straddles
+            # two blocks; read ahead from the second consecutive block on
+            if dxfile._sequential_blocks >= 2:
+                num_blocks_ahead = min(2 ** (dxfile._sequential_blocks - 2), self.max_readahead)
+
+        future, hit = self._request(dxfile, block_start, project, **kwargs)
+        for i in range(1, num_blocks_ahead + 1):
+            if block_start + i * self.block_size >= dxfile._file_length:
+                break
+            self._request(dxfile, block_start + i * self.block_size, project, **kwargs)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        try:
+            return future.result()
+        except:
+            # Don't keep the failure; the block is requested again on the next read
+            with self._lock:
+                key = (dxfile.get_id(), block_start)
+                if key in self._blocks and self._blocks[key][0] is future:
+                    self._num_bytes -= self._blocks.pop(key)[1]
+            raise
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self._num_bytes = 0
+
+
 def _readable_part_size(num_bytes):
     "Returns the file size in readable form."
     B = num_bytes
@@ -79,6 +266,11 @@ def _readable_part_size(num_bytes):
         return '{0:.2f} TiB'.format(B/TB)
 
 
+def _get_file_upload_params(project, **kwargs):
+    return dxpy.api.project_describe(project, {'fields': {'fileUploadParameters': True}},
+                                     **kwargs)['fileUploadParameters']
+
+
 def _get_write_buf_size(buffer_size_hint, file_upload_params, expected_file_size, file_is_mmapd=False):
     max_num_parts = file_upload_params['maximumNumParts']
     min_part_size = file_upload_params['minimumPartSize']
@@ -170,8 +362,10 @@ class DXFile(DXDataObject):
     _close = staticmethod(dxpy.api.file_close)
     _list_projects = staticmethod(dxpy.api.file_list_projects)
 
-    _http_threadpool_size = DXFILE_HTTP_THREADS
+    _http_threadpool_size = DXFILE_HTTP_MAX_THREADS
     _http_threadpool = dxpy.utils.get_futures_threadpool(max_workers=_http_threadpool_size)
+    # Limits the number of range and part requests in flight, across all files
+    _http_concurrency = AdaptiveConcurrency(DXFILE_HTTP_THREADS, DXFILE_HTTP_MAX_THREADS)
 
     NO_PROJECT_HINT = 'NO_PROJECT_HINT'
 
@@ -185,7 +379,8 @@ class DXFile(DXDataObject):
         print('set_http_threadpool_size is deprecated')
 
     def __init__(self, dxid=None, project=None, mode=None, read_buffer_size=DEFAULT_BUFFER_SIZE,
-                 write_buffer_size=DEFAULT_BUFFER_SIZE, expected_file_size=None, file_is_mmapd=False):
+                 write_buffer_size=DEFAULT_BUFFER_SIZE, expected_file_size=None, file_is_mmapd=False,
+                 block_cache=None):
         """
         :param dxid: Object ID
         :type dxid: string
@@ -207,6 +402,11 @@ class DXFile(DXDataObject):
             write buffer size will be constrained to be a multiple of
             the allocation granularity)
         :type file_is_mmapd: bool
+        :param block_cache: if set, reads are made in fixed-size blocks
+            kept in this cache, which suits random access (frequent
+            seeks) better than the default streaming of the file from
+            the current position
+        :type block_cache: :class:`DXFileBlockCache`
         """
         DXDataObject.__init__(self, dxid=dxid, project=project)
 
@@ -243,10 +443,18 @@ class DXFile(DXDataObject):
         # This lock protects accesses to the above three variables, ensuring that they would
         # be checked and changed atomically. This protects against thread race conditions.
         self._url_download_mutex = Lock()
+        # Ensures that threads calling readinto_at describe the file once
+        self._prepare_read_lock = Lock()
 
         self._request_iterator, self._response_iterator = None, None
         self._http_threadpool_futures = set()
 
+        self._block_cache = block_cache
+        self._last_block_start, self._sequential_blocks = None, 0
+
+        # Memory map of the copy of the file in the file cache, if any
+        self._cached_copy, self._file_cache_checked = None, False
+
         # Initialize state
         self._pos = 0
         self._file_length = None
@@ -274,6 +482,7 @@ class DXFile(DXDataObject):
         return self
 
     def __exit__(self, type, value, traceback):
+        self._release_cached_copy()
         self.flush()
         if self._close_on_exit and self._get_state() == "open":
             self.close()
@@ -294,6 +503,7 @@ class DXFile(DXDataObject):
         Neither this nor context managers are compatible with kwargs pass-through (so e.g. no
         custom auth).
         '''
+        self._release_cached_copy()
         if not hasattr(self, '_write_buf'):
             # This occurs when there is an exception initializing the
             # DXFile object
@@ -313,41 +523,55 @@ class DXFile(DXDataObject):
             raise
 
     def __iter__(self):
-        _buffer = self.read(self._read_bufsize)
-        done = False
-        if USING_PYTHON2:
-            while not done:
-                if b"\n" in _buffer:
-                    lines = _buffer.splitlines()
-                    for i in range(len(lines) - 1):
-                        yield lines[i]
-                    _buffer = lines[len(lines) - 1]
-                else:
-                    more = self.read(self._read_bufsize)
-                    if more == b"":
-                        done = True
-                    else:
-                        _buffer = _buffer + more
-        else:
-            if self._binary_mode:
-                raise DXFileError("Cannot read lines when file opened in binary mode")
-            # python3 is much stricter about distinguishing
-            # 'bytes' from 'str'.
-            while not done:
-                if "\n" in _buffer:
-                    lines = _buffer.splitlines()
-                    for i in range(len(lines) - 1):
-                        yield lines[i]
-                    _buffer = lines[len(lines) - 1]
-                else:
-                    more = self.read(self._read_bufsize)
-                    if more == "":
-                        done = True
-                    else:
-                        _buffer = _buffer + more
+        return self.iter_lines()
 
-        if _buffer:
-            yield _buffer
+    def iter_lines(self, batched=False, decode=None, **kwargs):
+        '''
+        :param batched: if True, yields lists of the lines found in each
+            chunk read, rather than single lines
+        :type batched: bool
+        :param decode: if True, lines are decoded (as UTF-8) into str; if
+            False, they are returned as bytes. Defaults to True if the
+            file was opened in text mode, and False in binary mode.
+        :type decode: bool
+
+        Iterates over the lines (without line terminators) from the
+        current position to the end of the file. Each chunk is split
+        once, so the cost is linear in the size of the file, even for
+        lines spanning several chunks. Iterating over the handler is
+        equivalent to calling this method with the default arguments.
+        '''
+        if decode is None:
+            decode = not self._binary_mode
+
+        def split(data):
+            return (data.decode("utf-8") if decode else data).splitlines()
+
+        # Pieces of the line that continues in the next chunk
+        pending = []
+        while True:
+            chunk = self._read2(self._read_bufsize, **kwargs)
+            if len(chunk) == 0:
+                break
+            end = chunk.rfind(b"\n")
+            if end < 0:
+                pending.append(chunk)
+                continue
+            pending.append(chunk[:end + 1])
+            lines = split(b"".join(pending) if len(pending) > 1 else pending[0])
+            pending = [chunk[end + 1:]] if end + 1 < len(chunk) else []
+            if batched:
+                yield lines
+            else:
+                for line in lines:
+                    yield line
+        if pending:
+            lines = split(b"".join(pending))
+            if batched:
+                yield lines
+            else:
+                for line in lines:
+                    yield line
 
     next = next
     __next__ = next
@@ -401,6 +625,9 @@ class DXFile(DXDataObject):
         orig_pos = self._pos
         self._pos = reference_pos + offset
 
+        if self._block_cache is not None or self._cached_copy is not None:
+            return
+
         in_buf = False
         orig_buf_pos = self._read_buf.tell()
         if offset < orig_pos:
@@ -466,24 +693,26 @@ class DXFile(DXDataObject):
             finally:
                 self._http_threadpool_futures = set()
 
-    def _async_upload_part_request(self, *args, **kwargs):
-        while len(self._http_threadpool_futures) >= self._http_threadpool_size:
+    def _async_upload_part_request(self, data, **kwargs):
+        # Start hashing the part right away, while waiting for earlier parts to be uploaded
+        md5_future = _md5_threadpool.submit(_md5_hasher_for, data)
+        while len(self._http_threadpool_futures) >= self._http_concurrency.window:
             future = dxpy.utils.wait_for_a_future(self._http_threadpool_futures)
             if future.exception() != None:
                 raise future.exception()
             self._http_threadpool_futures.remove(future)
 
-        future = self._http_threadpool.submit(self.upload_part, *args, **kwargs)
+        future = self._http_threadpool.submit(self._upload_hashed_part, data, md5_future, **kwargs)
         self._http_threadpool_futures.add(future)
 
-    def _ensure_write_bufsize(self, **kwargs):
+    def _upload_hashed_part(self, data, md5_future, **kwargs):
+        return self.upload_part(data, md5=md5_future.result().hexdigest(), **kwargs)
+
+    def _ensure_write_bufsize(self, file_upload_params=None, **kwargs):
         if self._write_bufsize is not None:
             return
-        file_upload_params = dxpy.api.project_describe(
-            self.get_proj_id(),
-            {'fields': {'fileUploadParameters': True}},
-            **kwargs
-        )['fileUploadParameters']
+        if file_upload_params is None:
+            file_upload_params = _get_file_upload_params(self.get_proj_id(), **kwargs)
         self._empty_last_part_allowed = file_upload_params['emptyLastPartAllowed']
         self._write_bufsize = _get_write_buf_size(self._write_buffer_size_hint,
                                                   file_upload_params,
@@ -612,6 +841,7 @@ class DXFile(DXDataObject):
            been fully uploaded. An exception will be thrown if this is
            not the case.
         '''
+        self._release_cached_copy()
         self.flush(**kwargs)
 
         # Also populates emptyLastPartAllowed
@@ -630,10 +860,14 @@ class DXFile(DXDataObject):
             except dxpy.exceptions.InvalidState:
                 pass
 
-        if 'report_progress_fn' in kwargs:
-            del kwargs['report_progress_fn']
+        for progress_kwarg in ('report_progress_fn', 'report_part_fn'):
+            if progress_kwarg in kwargs:
+                del kwargs[progress_kwarg]
 
-        dxpy.api.file_close(self._dxid, **kwargs)
+        try:
+            dxpy.api.file_close(self._dxid, **kwargs)
+        finally:
+            self._invalidate_describe_cache()
 
         if block:
             self._wait_on_close(**kwargs)
@@ -648,7 +882,8 @@ class DXFile(DXDataObject):
         '''
         self._wait_on_close(timeout, **kwargs)
 
-    def upload_part(self, data, index=None, display_progress=False, report_progress_fn=None, **kwargs):
+    def upload_part(self, data, index=None, display_progress=False, report_progress_fn=None, report_part_fn=None,
+                    md5=None, **kwargs):
         """
         :param data: Data to be uploaded in this part
         :type data: str or mmap object, bytes on python3
@@ -658,6 +893,11 @@ class DXFile(DXDataObject):
         :type display_progress: boolean
         :param report_progress_fn: Optional: a function to call that takes in two arguments (self, # bytes transmitted)
         :type report_progress_fn: function or None
+        :param report_part_fn: Optional: a function to call once the part has been uploaded, that takes in four
+            arguments (self, part index, part md5 hex digest, part size)
+        :type report_part_fn: function or None
+        :param md5: Optional: MD5 hex digest of *data*, if it has already been computed
+        :type md5: string or None
         :raises: :exc:`dxpy.exceptions.DXFileError` if *index* is given and is not in the correct range, :exc:`urllib3.exceptions.HTTPError` if upload fails
 
         Uploads the data in *data* as part number *index* for the
@@ -673,22 +913,24 @@ class DXFile(DXDataObject):
         if index is not None:
             req_input["index"] = int(index)
 
-        md5 = md5_hasher()
-        if hasattr(data, 'seek') and hasattr(data, 'tell'):
-            # data is a buffer; record initial position (so we can rewind back)
-            rewind_input_buffer_offset = data.tell()
-            while True:
-                bytes_read = data.read(MD5_READ_CHUNK_SIZE)
-                if bytes_read:
-                    md5.update(bytes_read)
-                else:
-                    break
-            # rewind the buffer to original position
-            data.seek(rewind_input_buffer_offset)
-        else:
-            md5.update(data)
+        if md5 is None:
+            hasher = md5_hasher()
+            if hasattr(data, 'seek') and hasattr(data, 'tell'):
+                # data is a buffer; record initial position (so we can rewind back)
+                rewind_input_buffer_offset = data.tell()
+                while True:
+                    bytes_read = data.read(MD5_READ_CHUNK_SIZE)
+                    if bytes_read:
+                        hasher.update(bytes_read)
+                    else:
+                        break
+                # rewind the buffer to original position
+                data.seek(rewind_input_buffer_offset)
+            else:
+                hasher.update(data)
+            md5 = hasher.hexdigest()
 
-        req_input["md5"] = md5.hexdigest()
+        req_input["md5"] = md5
         req_input["size"] = len(data)
 
         def get_upload_url_and_headers():
@@ -710,14 +952,21 @@ class DXFile(DXDataObject):
         # attempt an upload. Because DXHTTPRequest will retry requests under retryable conditions, we give it a callback
         # to ask us for a new upload URL every time it attempts a request (instead of giving them directly).
 
-        dxpy.DXHTTPRequest(get_upload_url_and_headers,
-                           data,
-                           jsonify_data=False,
-                           prepend_srv=False,
-                           always_retry=True,
-                           timeout=FILE_REQUEST_TIMEOUT,
-                           auth=None,
-                           method='PUT')
+        ticket, failed = self._http_concurrency.acquire(), True
+        num_retries = dxpy._get_thread_request_retries()
+        try:
+            dxpy.DXHTTPRequest(get_upload_url_and_headers,
+                               data,
+                               jsonify_data=False,
+                               prepend_srv=False,
+                               always_retry=True,
+                               timeout=FILE_REQUEST_TIMEOUT,
+                               auth=None,
+                               method='PUT')
+            failed = False
+        finally:
+            self._http_concurrency.release(ticket, 0 if failed else req_input["size"], failed=failed,
+                                           retried=dxpy._get_thread_request_retries() != num_retries)
 
         self._num_uploaded_parts += 1
 
@@ -727,6 +976,9 @@ class DXFile(DXDataObject):
         if report_progress_fn is not None:
             report_progress_fn(self, len(data))
 
+        if report_part_fn is not None:
+            report_part_fn(self, req_input.get("index", 1), req_input["md5"], req_input["size"])
+
     def wait_until_parts_uploaded(self, **kwargs):
         self._wait_until_parts_uploaded(**kwargs)
 
@@ -855,14 +1107,15 @@ class DXFile(DXDataObject):
         for chunk_start_pos, chunk_end_pos in chunk_ranges(start_pos, end_pos):
             url, headers = self.get_download_url(project=project, **kwargs)
             # It is possible for chunk_end_pos to be outside of the range of the file
-            yield dxpy._dxhttp_read_range, [url, headers, chunk_start_pos, min(chunk_end_pos, self._file_length - 1),
-                                            FILE_REQUEST_TIMEOUT], {}
+            yield _read_range, [url, headers, chunk_start_pos, min(chunk_end_pos, self._file_length - 1),
+                                FILE_REQUEST_TIMEOUT], {}
 
     def _next_response_content(self, get_first_chunk_sequentially=False):
         if self._response_iterator is None:
             self._response_iterator = dxpy.utils.response_iterator(
                 self._request_iterator,
                 self._http_threadpool,
+                max_active_tasks=self._http_concurrency,
                 do_first_task_sequentially=get_first_chunk_sequentially
             )
         try:
@@ -875,6 +1128,62 @@ class DXFile(DXDataObject):
             self._request_iterator = None
             raise
 
+    def _prepare_read(self, **kwargs):
+        # Ensures the file length is known, and returns whether the next
+        # chunk should be downloaded before issuing any other requests.
+        desc = None
+        if self._file_length == None:
+            if get_file_cache() is not None:
+                # The parts identify the copy of the file in the file cache
+                desc = self.describe(fields={"parts"}, default_fields=True, **kwargs)
+            else:
+                desc = self.describe(**kwargs)
+            if desc["state"] != "closed":
+                raise DXFileError("Cannot read from file until it is in the closed state")
+            self._file_length = int(desc["size"])
+
+        if not self._file_cache_checked:
+            self._file_cache_checked = True
+            self._open_cached_copy(desc)
+
+        # If running on a worker, wait for the first file download chunk
+        # to come back before issuing any more requests. This ensures
+        # that all subsequent requests can take advantage of caching,
+        # rather than having all of the first DXFILE_HTTP_THREADS
+        # requests simultaneously hit a cold cache. Enforce a minimum
+        # size for this heuristic so we don't incur the overhead for
+        # tiny files (which wouldn't contribute as much to the load
+        # anyway).
+        return self._file_length > 128 * 1024 and self._pos == 0 and dxpy.JOB_ID
+
+    def _open_cached_copy(self, desc):
+        # Maps the copy of the file in the file cache, if there is one. The
+        # copy is only looked up with the describe output of the file read by
+        # _prepare_read (if the length of the file was already known, the
+        # file is not looked up, rather than describing it again).
+        file_cache = get_file_cache()
+        if file_cache is None or self._file_length == 0 or desc is None or "parts" not in desc:
+            return
+        path = file_cache.lookup(desc)
+        if path is None:
+            return
+        try:
+            with open(path, "rb") as fh:
+                self._cached_copy = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Evicted in the meantime; download the file as usual
+            return
+        # Data buffered before the file was found in the cache is still
+        # valid, but simpler to drop
+        self._read_buf = BytesIO()
+        self._request_iterator, self._response_iterator = None, None
+
+    def _release_cached_copy(self):
+        cached_copy = getattr(self, "_cached_copy", None)
+        if cached_copy is not None:
+            self._cached_copy = None
+            cached_copy.close()
+
     def _read2(self, length=None, use_compression=None, project=None, **kwargs):
         '''
         :param length: Maximum number of bytes to be read
@@ -900,21 +1209,7 @@ class DXFile(DXDataObject):
            iterator (i.e. until next seek).
 
         '''
-        if self._file_length == None:
-            desc = self.describe(**kwargs)
-            if desc["state"] != "closed":
-                raise DXFileError("Cannot read from file until it is in the closed state")
-            self._file_length = int(desc["size"])
-
-        # If running on a worker, wait for the first file download chunk
-        # to come back before issuing any more requests. This ensures
-        # that all subsequent requests can take advantage of caching,
-        # rather than having all of the first DXFILE_HTTP_THREADS
-        # requests simultaneously hit a cold cache. Enforce a minimum
-        # size for this heuristic so we don't incur the overhead for
-        # tiny files (which wouldn't contribute as much to the load
-        # anyway).
-        get_first_chunk_sequentially = (self._file_length > 128 * 1024 and self._pos == 0 and dxpy.JOB_ID)
+        get_first_chunk_sequentially = self._prepare_read(**kwargs)
 
         if self._pos == self._file_length:
             return b""
@@ -922,6 +1217,15 @@ class DXFile(DXDataObject):
         if length == None or length > self._file_length - self._pos:
             length = self._file_length - self._pos
 
+        if self._cached_copy is not None:
+            self._pos += length
+            return self._cached_copy[self._pos - length:self._pos]
+
+        if self._block_cache is not None:
+            data = bytearray(length)
+            self._read_blocks_into(memoryview(data), project=project, **kwargs)
+            return bytes(data)
+
         buf = self._read_buf
         buf_remaining_bytes = dxpy.utils.string_buffer_length(buf) - buf.tell()
         if length <= buf_remaining_bytes:
@@ -939,7 +1243,10 @@ class DXFile(DXDataObject):
                     self._request_iterator = self._generate_read_requests(
                         start_pos=self._pos, project=project, **kwargs)
 
-                content = self._next_response_content(get_first_chunk_sequentially=get_first_chunk_sequentially)
+                # Slicing the memoryview (rather than the content itself)
+                # avoids making another copy of the response
+                content = memoryview(
+                    self._next_response_content(get_first_chunk_sequentially=get_first_chunk_sequentially))
 
                 if len(content) < remaining_len:
                     buf.write(content)
@@ -968,6 +1275,142 @@ class DXFile(DXDataObject):
             return data
         return data.decode("utf-8")
     
+    def readinto(self, buffer, project=None, **kwargs):
+        '''
+        :param buffer: Writable buffer, e.g. a bytearray, memoryview, or mmap object
+        :type buffer: object supporting the buffer protocol
+        :param project: project to use as context for this download; see :meth:`read`
+        :type project: str or None
+        :returns: Number of bytes read into *buffer*; 0 at the end of the file
+        :rtype: int
+
+        Reads up to ``len(buffer)`` bytes into *buffer*, regardless of
+        whether the file was opened in binary or text mode. Downloaded
+        chunks are copied straight into *buffer*, so no intermediate
+        bytes object is created for the data returned to the caller.
+        '''
+        view = memoryview(buffer).cast('B')
+        get_first_chunk_sequentially = self._prepare_read(**kwargs)
+
+        length = min(len(view), self._file_length - self._pos)
+        if self._cached_copy is not None:
+            view[:length] = self._cached_copy[self._pos:self._pos + length]
+            self._pos += length
+            return length
+        if self._block_cache is not None:
+            return self._read_blocks_into(view[:length], project=project, **kwargs)
+        num_bytes_read = self._read_buf.readinto(view[:length])
+        self._pos += num_bytes_read
+        while num_bytes_read < length:
+            if self._response_iterator is None:
+                self._request_iterator = self._generate_read_requests(
+                    start_pos=self._pos, project=project, **kwargs)
+
+            content = memoryview(
+                self._next_response_content(get_first_chunk_sequentially=get_first_chunk_sequentially))
+            num_bytes = min(len(content), length - num_bytes_read)
+            view[num_bytes_read:num_bytes_read + num_bytes] = content[:num_bytes]
+            num_bytes_read += num_bytes
+            self._pos += num_bytes
+            # Keep whatever the caller did not ask for, positioned at the
+            # new cursor
+            self._read_buf = BytesIO(content[num_bytes:])
+        return num_bytes_read
+
+    def read_at(self, offset, length, project=None, **kwargs):
+        '''
+        :param offset: Position in the file of the first byte to read
+        :type offset: int
+        :param length: Maximum number of bytes to read
+        :type length: int
+        :param project: project to use as context for this download; see :meth:`read`
+        :type project: str or None
+        :returns: The bytes read; fewer than *length* only at the end of the file
+        :rtype: bytes
+
+        Reads bytes at the given position without using or moving the
+        cursor of the handler (see :meth:`readinto_at`).
+        '''
+        data = bytearray(max(0, length))
+        num_bytes_read = self.readinto_at(offset, data, project=project, **kwargs)
+        return bytes(memoryview(data)[:num_bytes_read])
+
+    def readinto_at(self, offset, buffer, project=None, **kwargs):
+        '''
+        :param offset: Position in the file of the first byte to read
+        :type offset: int
+        :param buffer: Writable buffer, e.g. a bytearray, memoryview, or mmap object
+        :type buffer: object supporting the buffer protocol
+        :param project: project to use as context for this download; see :meth:`read`
+        :type project: str or None
+        :returns: Number of bytes read into *buffer*; 0 at or past the end of the file
+        :rtype: int
+
+        Reads up to ``len(buffer)`` bytes at the given position into
+        *buffer*, regardless of whether the file was opened in binary or
+        text mode, without using or moving the cursor of the handler.
+
+        This method is safe to call from many threads at once on the same
+        handler: they share its download URL, the connection pool and the
+        block cache, if any. Reads larger than the read buffer size are
+        split into range requests that are made in parallel.
+        '''
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+        view = memoryview(buffer).cast('B')
+        if self._file_length is None or not self._file_cache_checked:
+            with self._prepare_read_lock:
+                self._prepare_read(**kwargs)
+        length = max(0, min(len(view), self._file_length - offset))
+        view = view[:length]
+
+        if self._cached_copy is not None:
+            view[:] = self._cached_copy[offset:offset + length]
+            return length
+
+        if self._block_cache is not None:
+            block_size = self._block_cache.block_size
+            pos = offset
+            while pos < offset + length:
+                block_start = pos - pos % block_size
+                block = memoryview(self._block_cache.get_block(self, block_start, project=project, readahead=False,
+                                                               **kwargs))
+                num_bytes = min(block_start + len(block), offset + length) - pos
+                view[pos - offset:pos - offset + num_bytes] = block[pos - block_start:pos - block_start + num_bytes]
+                pos += num_bytes
+            return length
+
+        chunk_size = max(self._read_bufsize, 1)
+        futures = []
+        for chunk_start in range(offset, offset + length, chunk_size):
+            chunk_end = min(chunk_start + chunk_size, offset + length) - 1
+            url, headers = self.get_download_url(project=project, **kwargs)
+            args = (url, headers, chunk_start, chunk_end, FILE_REQUEST_TIMEOUT,
+                    view[chunk_start - offset:chunk_end - offset + 1])
+            if chunk_end + 1 < offset + length:
+                futures.append(self._http_threadpool.submit(_read_range_into, *args))
+            else:
+                # The last chunk is read on the calling thread
+                _read_range_into(*args)
+        for future in futures:
+            future.result()
+        return length
+
+    def _read_blocks_into(self, view, project=None, **kwargs):
+        # Fills view with the bytes following the cursor, from the blocks of
+        # the block cache
+        block_size = self._block_cache.block_size
+        num_bytes_read = 0
+        while num_bytes_read < len(view):
+            block_start = self._pos - self._pos % block_size
+            block = memoryview(self._block_cache.get_block(self, block_start, project=project, **kwargs))
+            offset = self._pos - block_start
+            num_bytes = min(len(block) - offset, len(view) - num_bytes_read)
+            view[num_bytes_read:num_bytes_read + num_bytes] = block[offset:offset + num_bytes]
+            num_bytes_read += num_bytes
+            self._pos += num_bytes
+        return num_bytes_read
+
     def archive(self, all_copies=False):
         '''
         :param all_copies: Force the transition of files into the archived state. Requesting user must be the ADMIN of the project billTo org. 
@@ -24,28 +24,35 @@ The following helper functions are useful shortcuts for interacting with File ob
 
 from __future__ import print_function, unicode_literals, division, absolute_import
 
-import os, sys, math, mmap, stat
+import os, sys, math, mmap, stat, json, errno
 import hashlib
+import shutil
 import traceback
 import warnings
-from collections import defaultdict
+from collections import defaultdict, deque
 import multiprocessing
 from random import randint
+from threading import Lock
 from time import sleep
 
 import dxpy
 from .. import logger
 from . import dxfile, DXFile
-from .dxfile import FILE_REQUEST_TIMEOUT
+from .dxfile import FILE_REQUEST_TIMEOUT, MD5_READ_CHUNK_SIZE, _read_range, _md5_threadpool, _md5_hasher_for, _PipelinedMD5
 from ..exceptions import DXError, DXFileError, DXPartLengthMismatchError, DXChecksumMismatchError, DXIncompleteReadsError, err_exit
 from ..compat import open, md5_hasher, USING_PYTHON2
 from ..utils import response_iterator
+from ..utils.file_cache import get_file_cache
 import subprocess
 
-def open_dxfile(dxid, project=None, mode=None, read_buffer_size=dxfile.DEFAULT_BUFFER_SIZE):
+UPLOAD_CHECKPOINT_SUFFIX = ".dxupload"
+
+def open_dxfile(dxid, project=None, mode=None, read_buffer_size=dxfile.DEFAULT_BUFFER_SIZE, block_cache=None):
     '''
     :param dxid: file ID
     :type dxid: string
+    :param block_cache: if set, the file is read in blocks kept in this cache (see :class:`~dxpy.bindings.dxfile.DXFileBlockCache`)
+    :type block_cache: :class:`~dxpy.bindings.dxfile.DXFileBlockCache`
     :rtype: :class:`~dxpy.bindings.dxfile.DXFile`
 
     Given the object ID of an uploaded file, returns a remote file
@@ -62,7 +69,7 @@ def open_dxfile(dxid, project=None, mode=None, read_buffer_size=dxfile.DEFAULT_B
       DXFile(dxid)
 
     '''
-    return DXFile(dxid, project=project, mode=mode, read_buffer_size=read_buffer_size)
+    return DXFile(dxid, project=project, mode=mode, read_buffer_size=read_buffer_size, block_cache=block_cache)
 
 
 def new_dxfile(mode=None, write_buffer_size=dxfile.DEFAULT_BUFFER_SIZE, expected_file_size=None, file_is_mmapd=False,
@@ -97,7 +104,7 @@ def new_dxfile(mode=None, write_buffer_size=dxfile.DEFAULT_BUFFER_SIZE, expected
 
 
 def download_dxfile(dxid, filename, chunksize=dxfile.DEFAULT_BUFFER_SIZE, append=False, show_progress=False,
-                    project=None, describe_output=None, symlink_max_tries=15, **kwargs):
+                    project=None, describe_output=None, symlink_max_tries=15, max_active_tasks=None, **kwargs):
     '''
     :param dxid: DNAnexus file ID or DXFile (file handler) object
     :type dxid: string or DXFile
@@ -116,28 +123,80 @@ def download_dxfile(dxid, filename, chunksize=dxfile.DEFAULT_BUFFER_SIZE, append
     :type describe_output: dict or None
     :param symlink_max_tries: Maximum amount of tries when downloading a symlink with aria2c.
     :type symlink_max_tries: int or None
+    :param max_active_tasks: Maximum number of chunks of the file in flight or not yet written to
+            disk, as for :func:`~dxpy.utils.response_iterator` (default: the shared limit of
+            :class:`~dxpy.bindings.dxfile.DXFile`)
+    :type max_active_tasks: int or object
 
     Downloads the remote file referenced by *dxid* and saves it to *filename*.
 
+    If the file cache is enabled (see :func:`~dxpy.utils.file_cache.enable_file_cache`),
+    the file is copied from the cache, after being downloaded into it if needed.
+
     Example::
 
         download_dxfile("file-xxxx", "localfilename.fastq")
 
     '''
+    if not append:
+        cached_path = cache_dxfile(dxid, chunksize=chunksize, show_progress=show_progress, project=project,
+                                   describe_output=describe_output, max_active_tasks=max_active_tasks, **kwargs)
+        if cached_path is not None:
+            try:
+                shutil.copyfile(cached_path, filename)
+                return
+            except (IOError, OSError) as e:
+                # Evicted by another process in the meantime; download the file as usual
+                if e.errno != errno.ENOENT:
+                    raise
+
+    _download_dxfile_with_retries(dxid, filename, chunksize=chunksize, append=append, show_progress=show_progress,
+                                  project=project, describe_output=describe_output,
+                                  symlink_max_tries=symlink_max_tries, max_active_tasks=max_active_tasks, **kwargs)
+
+
+def _download_dxfile_with_retries(dxid, filename, **kwargs):
     # retry the inner loop while there are retriable errors
     part_retry_counter = defaultdict(lambda: 3)
     success = False
     while not success:
-        success = _download_dxfile(dxid,
-                                   filename,
-                                   part_retry_counter,
-                                   chunksize=chunksize,
-                                   append=append,
-                                   show_progress=show_progress,
-                                   project=project,
-                                   describe_output=describe_output,
-                                   symlink_max_tries=symlink_max_tries,
-                                   **kwargs)
+        success = _download_dxfile(dxid, filename, part_retry_counter, **kwargs)
+
+
+def cache_dxfile(dxid, chunksize=dxfile.DEFAULT_BUFFER_SIZE, show_progress=False, project=None, describe_output=None,
+                 max_active_tasks=None, **kwargs):
+    '''
+    :param dxid: DNAnexus file ID or DXFile (file handler) object
+    :type dxid: string or DXFile
+    :param project: project to use as context for this download; see :func:`download_dxfile`
+    :type project: str or None
+    :param describe_output: output of the file-xxxx/describe API call, including the "parts" field, if available
+    :type describe_output: dict or None
+    :param max_active_tasks: Maximum number of chunks in flight; see :func:`download_dxfile`
+    :type max_active_tasks: int or object
+    :returns: Path of the copy of the file in the file cache, or :const:`None` if the file cache is disabled or the file cannot be cached
+    :rtype: string
+
+    Adds the remote file to the file cache (see
+    :func:`~dxpy.utils.file_cache.enable_file_cache`), unless it is
+    already there. Other processes that need the file at the same time
+    wait for it to be downloaded once.
+    '''
+    file_cache = get_file_cache()
+    if file_cache is None:
+        return None
+    if not (describe_output and describe_output.get("parts") is not None):
+        if isinstance(dxid, DXFile):
+            handler = dxid
+        else:
+            handler = DXFile(dxid, mode="r", project=(project if project != DXFile.NO_PROJECT_HINT else None))
+        describe_output = handler.describe(fields={"parts"}, default_fields=True, **kwargs)
+
+    def download(path):
+        _download_dxfile_with_retries(dxid, path, chunksize=chunksize, show_progress=show_progress, project=project,
+                                      describe_output=describe_output, max_active_tasks=max_active_tasks, **kwargs)
+
+    return file_cache.fetch(describe_output, download)
 
 
 # Check if a program (wget, curl, etc.) is on the path, and
@@ -226,9 +285,12 @@ def _download_symbolic_link(dxid, md5digest, project, dest_filename, symlink_max
     if md5digest is not None:
         _verify(dest_filename, md5digest)
 
+def _is_symbolic_link(dxfile_desc):
+    return 'drive' in dxfile_desc and ('parts' not in dxfile_desc or dxfile_desc["drive"] == "drive-PUBLISHED")
+
 def _download_dxfile(dxid, filename, part_retry_counter,
                      chunksize=dxfile.DEFAULT_BUFFER_SIZE, append=False, show_progress=False,
-                     project=None, describe_output=None, symlink_max_tries=15, **kwargs):
+                     project=None, describe_output=None, symlink_max_tries=15, max_active_tasks=None, **kwargs):
     '''
     Core of download logic. Download file-id *dxid* and store it in
     a local file *filename*.
@@ -269,6 +331,8 @@ def _download_dxfile(dxid, filename, part_retry_counter,
         dxfile = dxid
     else:
         dxfile = DXFile(dxid, mode="r", project=(project if project != DXFile.NO_PROJECT_HINT else None))
+    if max_active_tasks is None:
+        max_active_tasks = dxfile._http_concurrency
 
     if describe_output and describe_output.get("parts") is not None:
         dxfile_desc = describe_output
@@ -276,8 +340,7 @@ def _download_dxfile(dxid, filename, part_retry_counter,
         dxfile_desc = dxfile.describe(fields={"parts"}, default_fields=True, **kwargs)
 
     # handling of symlinked files.
-    if 'drive' in dxfile_desc and 'parts' not in dxfile_desc \
-            or 'drive' in dxfile_desc and dxfile_desc["drive"] == "drive-PUBLISHED":
+    if _is_symbolic_link(dxfile_desc):
         if 'md5' in dxfile_desc:
             md5 = dxfile_desc['md5']
         else:
@@ -312,8 +375,10 @@ def _download_dxfile(dxid, filename, part_retry_counter,
         sub_range = False
         if len(parts) > 1 or (start > 0) or (end - start + 1 < parts[part_id_to_get]["size"]):
             sub_range = True
-        data = dxpy._dxhttp_read_range(url, headers, start, end, FILE_REQUEST_TIMEOUT, sub_range)
-        return part_id_to_get, data
+        data = _read_range(url, headers, start, end, FILE_REQUEST_TIMEOUT, sub_range)
+        # A chunk holding a whole part is hashed right here, in parallel with the other requests
+        hasher = _md5_hasher_for(data) if end - start + 1 == parts[part_id_to_get]["size"] else None
+        return part_id_to_get, data, hasher
 
     def chunk_requests():
         for part_id_to_chunk in parts_to_get:
@@ -334,34 +399,55 @@ def _download_dxfile(dxid, filename, part_retry_counter,
             msg = msg.format(dxfile.get_id(), _part_id, parts[_part_id]["md5"], hasher.hexdigest())
             raise DXChecksumMismatchError(msg)
 
+    part_being_verified = [None]
+
+    def verify_local_part(part_id):
+        part_info = parts[part_id]
+        hasher = md5_hasher()
+        with open(filename, "rb") as part_fh:
+            part_fh.seek(part_info["start"])
+            bytes_to_read = part_info["size"]
+            while bytes_to_read > 0:
+                chunk = part_fh.read(min(MD5_READ_CHUNK_SIZE, bytes_to_read))
+                if len(chunk) == 0:
+                    raise DXFileError("Local data for part {} is truncated".format(part_id))
+                hasher.update(chunk)
+                bytes_to_read -= len(chunk)
+        if hasher.hexdigest() != part_info["md5"]:
+            raise DXFileError("Checksum mismatch when verifying downloaded part {}".format(part_id))
+
+    def verify_parts(pending_parts, max_pending):
+        # Checks downloaded parts in order, leaving up to max_pending of them
+        # to finish hashing in the background
+        while len(pending_parts) > max_pending:
+            part_being_verified[0] = pending_parts[0][0]
+            verify_part(*pending_parts.popleft())
+            part_being_verified[0] = None
+
     with fh:
         last_verified_pos = 0
 
         if fh.mode == "rb+":
             # We already downloaded the beginning of the file, verify that the
-            # chunk checksums match the metadata.
-            last_verified_part, max_verify_chunk_size = None, 1024*1024
+            # chunk checksums match the metadata. The parts are read and hashed
+            # in parallel.
+            last_verified_part = None
             try:
                 for part_id in parts_to_get:
-                    part_info = parts[part_id]
-                    if "md5" not in part_info:
+                    if "md5" not in parts[part_id]:
                         raise DXFileError("File {} does not contain part md5 checksums".format(dxfile.get_id()))
-                    bytes_to_read = part_info["size"]
-                    hasher = md5_hasher()
-                    while bytes_to_read > 0:
-                        chunk = fh.read(min(max_verify_chunk_size, bytes_to_read))
-                        if len(chunk) < min(max_verify_chunk_size, bytes_to_read):
-                            raise DXFileError("Local data for part {} is truncated".format(part_id))
-                        hasher.update(chunk)
-                        bytes_to_read -= max_verify_chunk_size
-                    if hasher.hexdigest() != part_info["md5"]:
-                        raise DXFileError("Checksum mismatch when verifying downloaded part {}".format(part_id))
-                    else:
+                part_verifications = [_md5_threadpool.submit(verify_local_part, part_id) for part_id in parts_to_get]
+                try:
+                    for part_id, verification in zip(parts_to_get, part_verifications):
+                        verification.result()
                         last_verified_part = part_id
-                        last_verified_pos = fh.tell()
+                        last_verified_pos = parts[part_id]["start"] + parts[part_id]["size"]
                         if show_progress:
-                            _bytes += part_info["size"]
+                            _bytes += parts[part_id]["size"]
                             print_progress(_bytes, file_size, action="Verified")
+                finally:
+                    for verification in part_verifications:
+                        verification.cancel()
             except (IOError, DXFileError) as e:
                 logger.debug(e)
             fh.seek(last_verified_pos)
@@ -376,23 +462,33 @@ def _download_dxfile(dxid, filename, part_retry_counter,
             # Main loop. In parallel: download chunks, verify them, and write them to disk.
             get_first_chunk_sequentially = (file_size > 128 * 1024 and last_verified_pos == 0 and dxpy.JOB_ID)
             cur_part, got_bytes, hasher = None, None, None
-            for chunk_part, chunk_data in response_iterator(chunk_requests(),
-                                                            dxfile._http_threadpool,
-                                                            do_first_task_sequentially=get_first_chunk_sequentially):
+            # Parts whose checksums may still be being computed
+            pending_parts = deque()
+            for chunk_part, chunk_data, chunk_hasher in response_iterator(chunk_requests(),
+                                                                          dxfile._http_threadpool,
+                                                                          max_active_tasks=max_active_tasks,
+                                                                          do_first_task_sequentially=get_first_chunk_sequentially):
                 if chunk_part != cur_part:
-                    verify_part(cur_part, got_bytes, hasher)
-                    cur_part, got_bytes, hasher = chunk_part, 0, md5_hasher()
+                    if cur_part is not None:
+                        pending_parts.append((cur_part, got_bytes, hasher))
+                        verify_parts(pending_parts, multiprocessing.cpu_count())
+                    cur_part, got_bytes, hasher = chunk_part, 0, chunk_hasher or _PipelinedMD5()
                 got_bytes += len(chunk_data)
-                hasher.update(chunk_data)
+                if chunk_hasher is None:
+                    hasher.update(chunk_data)
                 fh.write(chunk_data)
                 if show_progress:
                     _bytes += len(chunk_data)
                     print_progress(_bytes, file_size)
-            verify_part(cur_part, got_bytes, hasher)
+            if cur_part is not None:
+                pending_parts.append((cur_part, got_bytes, hasher))
+            verify_parts(pending_parts, 0)
             if show_progress:
                 print_progress(_bytes, file_size, action="Completed")
         except DXFileError:
             print(traceback.format_exc(), file=sys.stderr)
+            if part_being_verified[0] is not None:
+                cur_part = part_being_verified[0]
             part_retry_counter[cur_part] -= 1
             if part_retry_counter[cur_part] > 0:
                 print("Retrying {} ({} tries remain for part {})".format(dxfile.get_id(), part_retry_counter[cur_part], cur_part),
@@ -405,9 +501,224 @@ def _download_dxfile(dxid, filename, part_retry_counter,
 
         return True
 
+def _get_small_dxfile(project, dxfile_desc, **kwargs):
+    # Returns the data of the file, and the error found when verifying it (if
+    # any). Verification happens here so that files are hashed in parallel.
+    dxfile = DXFile(dxfile_desc["id"], mode="r", project=(project if project != DXFile.NO_PROJECT_HINT else None))
+    data = b""
+    if dxfile_desc["size"] > 0:
+        url, headers = dxfile.get_download_url(project=project, **kwargs)
+        # Same as in _download_dxfile: a single part is fetched without the Range header
+        sub_range = len(dxfile_desc["parts"]) > 1
+        data = _read_range(url, headers, 0, dxfile_desc["size"] - 1, FILE_REQUEST_TIMEOUT, sub_range)
+    try:
+        _verify_small_dxfile(dxfile_desc, data)
+    except DXFileError as e:
+        return data, e
+    return data, None
+
+def _verify_small_dxfile(dxfile_desc, data):
+    parts = dxfile_desc["parts"]
+    offset = 0
+    for part_id in sorted(parts, key=int):
+        part_data = data[offset:offset + parts[part_id]["size"]]
+        offset += parts[part_id]["size"]
+        if len(part_data) != parts[part_id]["size"]:
+            msg = "Unexpected part data size in {} part {} (expected {}, got {})"
+            raise DXPartLengthMismatchError(msg.format(dxfile_desc["id"], part_id, parts[part_id]["size"],
+                                                       len(part_data)))
+        if "md5" not in parts[part_id]:
+            warnings.warn("Download of file {} is not being checked for integrity".format(dxfile_desc["id"]))
+            continue
+        hasher = md5_hasher()
+        hasher.update(part_data)
+        if hasher.hexdigest() != parts[part_id]["md5"]:
+            msg = "Checksum mismatch in {} part {} (expected {}, got {})"
+            raise DXChecksumMismatchError(msg.format(dxfile_desc["id"], part_id, parts[part_id]["md5"],
+                                                     hasher.hexdigest()))
+
+def download_dxfiles(downloads, chunksize=dxfile.DEFAULT_BUFFER_SIZE, parallel_files=dxfile.DXFILE_HTTP_THREADS,
+                     show_progress=False, symlink_max_tries=15, **kwargs):
+    '''
+    :param downloads: Files to download, as (project, describe output, local filename) tuples.
+            The describe output must contain the "id", "size" and "parts" fields (and
+            "drive" and "md5", to recognize symbolic links). The project is used as in
+            :func:`download_dxfile`.
+    :type downloads: iterable of tuples
+    :param parallel_files: Maximum number of files downloaded at the same time
+    :type parallel_files: int
+    :param show_progress: Report the number of files downloaded so far on stderr
+    :type show_progress: boolean
+    :param symlink_max_tries: Maximum amount of tries when downloading a symlink with aria2c.
+    :type symlink_max_tries: int
+
+    Downloads many remote files at once. Up to *parallel_files* files are
+    downloaded at the same time, largest first, and the range requests of all
+    of them go through the shared HTTP thread pool of :class:`DXFile`, so that
+    the number of requests in flight is bounded no matter how many files are
+    downloaded. Files no larger than *chunksize* are fetched with a single
+    request each and are not given a file slot: their requests are batched
+    straight into the shared pool, so that folders of many small files are not
+    limited by the latency of each individual file. If the file cache is
+    enabled, all the files are downloaded with :func:`download_dxfile`, which
+    copies them from the cache.
+
+    If a download fails, the downloads that have not started yet are
+    cancelled, and the others are waited for, before the error is raised.
+
+    Example::
+
+        download_dxfiles([("project-xxxx", describe_output, "localfilename.fastq")], parallel_files=4)
+
+    '''
+    small_files, large_files = [], []
+    use_file_cache = get_file_cache() is not None
+    for download in downloads:
+        project, dxfile_desc, filename = download
+        if not use_file_cache and not _is_symbolic_link(dxfile_desc) and dxfile_desc.get("parts") is not None \
+                and dxfile_desc["size"] <= chunksize:
+            small_files.append(download)
+        else:
+            large_files.append(download)
+    for files in small_files, large_files:
+        files.sort(key=lambda download: download[1].get("size") or 0, reverse=True)
+
+    num_files = len(small_files) + len(large_files)
+    num_done, progress_lock = [0], Lock()
+
+    def file_done():
+        with progress_lock:
+            num_done[0] += 1
+            if show_progress:
+                sys.stderr.write("\33[2K")
+                sys.stderr.write("Downloaded {} of {} files\r".format(num_done[0], num_files))
+                sys.stderr.flush()
+
+    def download_large_file(project, dxfile_desc, filename):
+        download_dxfile(dxfile_desc["id"], filename, chunksize=chunksize, project=project,
+                        describe_output=dxfile_desc, symlink_max_tries=symlink_max_tries, **kwargs)
+        file_done()
+
+    def small_file_requests():
+        for project, dxfile_desc, _filename in small_files:
+            yield _get_small_dxfile, [project, dxfile_desc], kwargs
+
+    executor = dxpy.utils.get_futures_threadpool(max_workers=parallel_files)
+    futures = [executor.submit(download_large_file, *download) for download in large_files]
+    try:
+        small_file_data = response_iterator(small_file_requests(), DXFile._http_threadpool,
+                                            max_active_tasks=DXFile._http_concurrency,
+                                            do_first_task_sequentially=False)
+        for (project, dxfile_desc, filename), (data, error) in zip(small_files, small_file_data):
+            if error is not None:
+                logger.debug(error)
+                # Let the single file download logic retry it
+                download_dxfile(dxfile_desc["id"], filename, chunksize=chunksize, project=project,
+                                describe_output=dxfile_desc, **kwargs)
+            else:
+                with open(filename, "wb") as fh:
+                    fh.write(data)
+            file_done()
+        dxpy.utils.wait_for_all_futures(futures)
+        for future in futures:
+            future.result()
+    except Exception:
+        # Don't leave files being written to after returning
+        for future in futures:
+            future.cancel()
+        dxpy.utils.wait_for_all_futures(futures)
+        raise
+    finally:
+        executor.shutdown(wait=False)
+    if show_progress and num_files > 0:
+        sys.stderr.write("\n")
+
+class _UploadCheckpoint(object):
+    '''
+    Journal of an in-progress upload of a local file, kept in a sidecar
+    file in JSON lines format. The first line identifies the remote file,
+    the version of the local file (size and modification time), and the
+    part size; every following line records one part that has been
+    uploaded, with its index, offset, size, and md5.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.part_size = None
+        self._lock = Lock()
+
+    def load(self, file_size, mtime):
+        '''
+        Returns the header of the journal and a dict of the recorded parts
+        by index, or (None, {}) if there is no usable journal for this
+        version of the local file.
+        '''
+        parts = {}
+        try:
+            with open(self.path, "r") as fh:
+                header = json.loads(fh.readline())
+                for line in fh:
+                    try:
+                        part = json.loads(line)
+                    except ValueError:
+                        # Partially written record, left by an interrupted upload
+                        break
+                    parts[part["index"]] = part
+        except (IOError, OSError, ValueError, KeyError) as e:
+            logger.debug("Ignoring upload checkpoint %s: %s", self.path, e)
+            return None, {}
+        if header.get("size") != file_size or header.get("mtime") != mtime:
+            logger.debug("Ignoring upload checkpoint %s: local file has changed", self.path)
+            return None, {}
+        self.part_size = header["partSize"]
+        return header, parts
+
+    def start(self, handler, file_size, mtime):
+        self.part_size = handler._write_bufsize
+        header = {"id": handler.get_id(), "project": handler.get_proj_id(), "size": file_size, "mtime": mtime,
+                  "partSize": self.part_size}
+        with self._lock, open(self.path, "w") as fh:
+            fh.write(json.dumps(header) + "\n")
+
+    def record_part(self, handler, index, md5, size):
+        part = {"index": index, "offset": (index - 1) * self.part_size, "size": size, "md5": md5}
+        with self._lock, open(self.path, "a") as fh:
+            fh.write(json.dumps(part) + "\n")
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _get_complete_parts(parts_desc, file_size, part_size, recorded_parts=None):
+    '''
+    :param parts_desc: "parts" field of the remote file's describe output
+    :param recorded_parts: parts recorded in the upload checkpoint, by index
+
+    Returns the set of indices of the parts that do not need to be sent
+    again: parts reported complete by the platform whose size matches
+    the corresponding range of the local file (and, if *recorded_parts*
+    is given, whose md5 matches the one recorded when it was uploaded).
+    '''
+    complete_parts = set()
+    for index, part in (parts_desc or {}).items():
+        index = int(index)
+        expected_size = min(part_size, file_size - (index - 1) * part_size)
+        if part.get("state") != "complete" or part.get("size") != expected_size or expected_size <= 0:
+            continue
+        if recorded_parts is not None:
+            recorded_part = recorded_parts.get(index)
+            if recorded_part is None or recorded_part["md5"] != part.get("md5"):
+                continue
+        complete_parts.add(index)
+    return complete_parts
+
+
 def upload_local_file(filename=None, file=None, media_type=None, keep_open=False,
                       wait_on_close=False, use_existing_dxfile=None, show_progress=False,
-                      write_buffer_size=None, multithread=True, **kwargs):
+                      write_buffer_size=None, multithread=True, resume=False, checkpoint_file=None,
+                      file_upload_params=None, **kwargs):
     '''
     :param filename: Local filename
     :type filename: string
@@ -425,6 +736,18 @@ def upload_local_file(filename=None, file=None, media_type=None, keep_open=False
     :type use_existing_dxfile: :class:`~dxpy.bindings.dxfile.DXFile`
     :param multithread: If True, sends multiple write requests asynchronously
     :type multithread: boolean
+    :param resume: If True, keeps a checkpoint of the uploaded parts next to
+        *filename*, and if a checkpoint left by an earlier, interrupted
+        upload of the same file exists, continues that upload, sending only
+        the parts that are not complete yet
+    :type resume: boolean
+    :param checkpoint_file: Path of the checkpoint to use when *resume* is
+        True (default: *filename* with the suffix ".dxupload")
+    :type checkpoint_file: string
+    :param file_upload_params: Upload parameters of the project of the new
+        file (the "fileUploadParameters" field of its description), if
+        already known
+    :type file_upload_params: dict
     :returns: Remote file handler
     :rtype: :class:`~dxpy.bindings.dxfile.DXFile`
 
@@ -439,6 +762,10 @@ def upload_local_file(filename=None, file=None, media_type=None, keep_open=False
     is set to the basename of *filename* or to *file.name* (if it
     exists).
 
+    If some parts fail to upload, only those parts are sent again (unless
+    the data is read from a stream, such as stdin, in which case the whole
+    upload is retried with a new file object).
+
     Examples::
 
       # Upload from a path
@@ -448,6 +775,9 @@ def upload_local_file(filename=None, file=None, media_type=None, keep_open=False
           dxpy.upload_local_file(file=fh)
 
     '''
+    if resume and filename is None:
+        raise DXFileError("Only uploads of local files given by filename can be resumed")
+
     fd = file if filename is None else open(filename, 'rb')
     try:
         file_size = os.fstat(fd.fileno()).st_size
@@ -522,30 +852,79 @@ def upload_local_file(filename=None, file=None, media_type=None, keep_open=False
     if write_buffer_size is None:
         write_buffer_size=dxfile.DEFAULT_BUFFER_SIZE
 
+    # For subsequent API calls, don't supply the dataobject metadata
+    # parameters that are only needed at creation time.
+    _, remaining_kwargs = dxpy.DXDataObject._get_creation_params(kwargs)
+
+    # Parts of a regular file can be read again from their offsets, so a
+    # failed upload can be repaired by sending only the missing parts.
+    try:
+        can_resend_parts = can_be_mmapd(fd)
+    except (OSError, ValueError):
+        can_resend_parts = False
+    handler, part_size, complete_parts = None, None, set()
+
+    checkpoint, mtime = None, None
+    if resume:
+        if not can_resend_parts:
+            raise DXFileError("Cannot resume the upload of {}: it is not a regular file".format(filename))
+        checkpoint = _UploadCheckpoint(checkpoint_file or filename + UPLOAD_CHECKPOINT_SUFFIX)
+        mtime = os.fstat(fd.fileno()).st_mtime_ns
+        header, recorded_parts = checkpoint.load(file_size, mtime)
+        if header is not None:
+            checkpointed_handler = DXFile(header["id"], project=header["project"], mode='a',
+                                          write_buffer_size=write_buffer_size, expected_file_size=file_size,
+                                          file_is_mmapd=file_is_mmapd)
+            try:
+                desc = checkpointed_handler.describe(fields={"state", "parts"}, **remaining_kwargs)
+            except dxpy.exceptions.ResourceNotFound:
+                desc = {"state": None}
+            if desc["state"] == "open":
+                handler, part_size = checkpointed_handler, header["partSize"]
+                complete_parts = _get_complete_parts(desc.get("parts"), file_size, part_size, recorded_parts)
+                logger.info("Resuming upload of %s to %s (%d parts already uploaded)",
+                            filename, handler.get_id(), len(complete_parts))
+
     # APPS-650 file upload would occasionally fail due to some parts not being uploaded correctly. This will try to re-upload in case this happens.
     while retries <= max_retries:
         retries += 1
 
-        if use_existing_dxfile:
-            handler = use_existing_dxfile
+        if handler is None:
+            if use_existing_dxfile:
+                handler = use_existing_dxfile
+                handler._ensure_write_bufsize(**remaining_kwargs)
+            else:
+                handler = get_new_handler(filename)
+                handler._ensure_write_bufsize(file_upload_params=file_upload_params, **remaining_kwargs)
+            if checkpoint is not None:
+                checkpoint.start(handler, file_size, mtime)
         else:
-            handler = get_new_handler(filename)
-
-        # For subsequent API calls, don't supply the dataobject metadata
-        # parameters that are only needed at creation time.
-        _, remaining_kwargs = dxpy.DXDataObject._get_creation_params(kwargs)
+            # Continuing an earlier attempt: the parts must be cut exactly
+            # as they were then
+            handler._ensure_write_bufsize(**remaining_kwargs)
+            if part_size is not None:
+                handler._write_bufsize = part_size
+            handler._cur_part = 1
+            # Keeps close() from replacing part 1 with an empty part
+            handler._num_uploaded_parts = len(complete_parts)
 
         num_ticks = 60
         offset = 0
 
-        handler._ensure_write_bufsize(**remaining_kwargs)
-
         handler._num_bytes_transmitted = 0
 
         if show_progress:
             report_progress(handler, 0)
 
         while True:
+            if handler._cur_part in complete_parts and offset < file_size:
+                num_bytes = min(handler._write_bufsize, file_size - offset)
+                offset += num_bytes
+                handler._cur_part += 1
+                if show_progress:
+                    report_progress(handler, num_bytes)
+                continue
+
             buf = read(handler._write_bufsize)
             offset += len(buf)
 
@@ -554,10 +933,13 @@ def upload_local_file(filename=None, file=None, media_type=None, keep_open=False
 
             handler.write(buf,
                           report_progress_fn=report_progress if show_progress else None,
+                          report_part_fn=checkpoint.record_part if checkpoint is not None else None,
                           multithread=multithread,
                           **remaining_kwargs)
 
-        handler.flush(report_progress_fn=report_progress if show_progress else None, **remaining_kwargs)
+        handler.flush(report_progress_fn=report_progress if show_progress else None,
+                      report_part_fn=checkpoint.record_part if checkpoint is not None else None,
+                      **remaining_kwargs)
 
         if show_progress:
             sys.stderr.write("\n")
@@ -571,11 +953,20 @@ def upload_local_file(filename=None, file=None, media_type=None, keep_open=False
                 raise
             if show_progress:
                 logger.warning("Retrying...({}/{})".format(retries, max_retries))
+            if can_resend_parts:
+                part_size = handler._write_bufsize
+                desc = handler.describe(fields={"parts"}, **remaining_kwargs)
+                complete_parts = _get_complete_parts(desc.get("parts"), file_size, part_size)
+            else:
+                handler = None
             continue
         if filename is not None:
             fd.close()
         break
 
+    if checkpoint is not None:
+        checkpoint.remove()
+
     if not keep_open:
         handler.close(block=wait_on_close, report_progress_fn=report_progress if show_progress else None, **remaining_kwargs)
 
@@ -617,6 +1008,180 @@ def upload_string(to_upload, media_type=None, keep_open=False, wait_on_close=Fal
 
     return handler
 
+class _BulkUploadCheckpoint(object):
+    '''
+    Journal of the uploads made by :func:`upload_local_files`, in JSON
+    lines format: one line per local file whose upload is complete (that
+    is, whose remote file has been closed), with the path, size and
+    modification time of the local file, and the ID and project of the
+    remote file.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self._lock = Lock()
+
+    def load(self):
+        '''
+        Returns the recorded uploads, by absolute local path.
+        '''
+        uploads = {}
+        try:
+            with open(self.path, "r") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Partially written record, left by an interrupted upload
+                        break
+                    uploads[record["path"]] = record
+        except (IOError, OSError) as e:
+            logger.debug("Ignoring upload checkpoint %s: %s", self.path, e)
+        return uploads
+
+    def record(self, path, file_stat, handler):
+        record = {"path": os.path.abspath(path), "size": file_stat.st_size, "mtime": file_stat.st_mtime,
+                  "id": handler.get_id(), "project": handler.get_proj_id()}
+        with self._lock, open(self.path, "a") as fh:
+            fh.write(json.dumps(record) + "\n")
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _wait_until_closed(handlers, timeout=3600*24*1):
+    '''
+    Waits until all the files in *handlers* are closed, polling their
+    states with :func:`dxpy.describe` (so that each poll costs one API
+    call per 1000 files, rather than one per file).
+    '''
+    pending = {handler.get_id() for handler in handlers}
+    elapsed = 0
+    i = 0
+    while True:
+        ids = sorted(pending)
+        for dxid, desc in zip(ids, dxpy.describe(ids, fields={"state"})):
+            if desc["state"] == "closed":
+                pending.discard(dxid)
+            elif desc["state"] != "closing":
+                raise DXError("Unexpected state of {}: {}".format(dxid, desc["state"]))
+        if not pending:
+            return
+
+        if elapsed >= timeout or elapsed < 0:
+            raise DXError("Reached timeout while waiting for the remote objects to close")
+
+        wait = min(2**7, 2**i)
+        sleep(wait)
+        i += 1
+        elapsed += wait
+
+
+def upload_local_files(uploads, parallel_files=32, wait_on_close=False, checkpoint_file=None, show_progress=False,
+                       **kwargs):
+    '''
+    :param uploads: Files to upload, as (local filename, dict of keyword arguments) tuples. The
+            keyword arguments (such as "folder" or "properties") are passed to
+            :func:`upload_local_file` for that file only.
+    :type uploads: list of tuples
+    :param parallel_files: Maximum number of files uploaded at the same time
+    :type parallel_files: int
+    :param wait_on_close: If True, waits for all the files to close
+    :type wait_on_close: boolean
+    :param checkpoint_file: Path of a journal of the completed uploads, removed once all of them
+            are complete. Files recorded in it by an earlier, interrupted call, and not modified
+            since, are not uploaded again as long as their remote file still exists in the same
+            project.
+    :type checkpoint_file: string
+    :param show_progress: Report the number of files uploaded so far on stderr
+    :type show_progress: boolean
+    :returns: Remote file handlers, in the same order as *uploads*
+    :rtype: list of :class:`~dxpy.bindings.dxfile.DXFile`
+
+    Additional keyword arguments are passed to :func:`upload_local_file`
+    for all the files.
+
+    Uploads many local files at once. For small files, the time taken by
+    an upload is mostly the latency of its API calls (creating the file,
+    requesting an upload URL, and closing the file), so up to
+    *parallel_files* uploads are pipelined, each at a different stage.
+    Files are closed without waiting; if *wait_on_close* is True, their
+    states are then polled in bulk until all of them are closed. The
+    upload parameters of each project are fetched only once.
+
+    Example::
+
+        upload_local_files([("out/a.txt", {"folder": "/a"}), ("out/b.txt", {})], checkpoint_file="uploads.json")
+
+    '''
+    checkpoint = _BulkUploadCheckpoint(checkpoint_file) if checkpoint_file is not None else None
+    recorded_uploads = checkpoint.load() if checkpoint is not None else {}
+    handlers = [None] * len(uploads)
+    file_stats = [os.stat(filename) for filename, _upload_kwargs in uploads]
+    projects = [upload_kwargs.get("project", kwargs.get("project", dxpy.WORKSPACE_ID))
+                for _filename, upload_kwargs in uploads]
+
+    # Reuse the remote files of uploads completed by an earlier call
+    recorded_descs = {}
+    for index, (filename, _upload_kwargs) in enumerate(uploads):
+        record = recorded_uploads.get(os.path.abspath(filename))
+        if record is not None and record["size"] == file_stats[index].st_size \
+                and record["mtime"] == file_stats[index].st_mtime and record["project"] == projects[index]:
+            recorded_descs[index] = (record, dxpy.describe_async(record["id"], fields={"state"}))
+    for index, (record, desc) in recorded_descs.items():
+        try:
+            state = desc.result()["state"]
+        except DXError as e:
+            logger.debug("Uploading %s again: %s", uploads[index][0], e)
+            continue
+        if state in ("closing", "closed"):
+            handlers[index] = DXFile(record["id"], project=record["project"])
+
+    num_done, progress_lock = [len(uploads) - handlers.count(None)], Lock()
+
+    _, api_kwargs = dxpy.DXDataObject._get_creation_params(kwargs)
+    file_upload_params = {project: dxfile._get_file_upload_params(project, **api_kwargs)
+                          for project in set(project for project, handler in zip(projects, handlers)
+                                             if handler is None)}
+
+    def upload_one_file(index):
+        filename, upload_kwargs = uploads[index]
+        file_kwargs = dict(kwargs, **upload_kwargs)
+        handler = upload_local_file(filename, wait_on_close=False,
+                                    file_upload_params=file_upload_params[projects[index]], **file_kwargs)
+        if checkpoint is not None:
+            checkpoint.record(filename, file_stats[index], handler)
+        with progress_lock:
+            num_done[0] += 1
+            if show_progress:
+                sys.stderr.write("\33[2K")
+                sys.stderr.write("Uploaded {} of {} files\r".format(num_done[0], len(uploads)))
+                sys.stderr.flush()
+        return handler
+
+    executor = dxpy.utils.get_futures_threadpool(max_workers=parallel_files)
+    futures = {index: executor.submit(upload_one_file, index)
+               for index, handler in enumerate(handlers) if handler is None}
+    try:
+        dxpy.utils.wait_for_all_futures(futures.values())
+        for index, future in futures.items():
+            handlers[index] = future.result()
+    finally:
+        for future in futures.values():
+            future.cancel()
+        executor.shutdown(wait=False)
+    if show_progress and uploads:
+        sys.stderr.write("\n")
+
+    if wait_on_close and handlers:
+        _wait_until_closed(handlers)
+    if checkpoint is not None:
+        checkpoint.remove()
+    return handlers
+
+
 def list_subfolders(project, path, recurse=True):
     '''
     :param project: Project ID to use as context for the listing
@@ -642,7 +1207,7 @@ def list_subfolders(project, path, recurse=True):
         return (f for f in project_folders if f.startswith(path) and '/' not in f[len(path)+1:])
 
 def download_folder(project, destdir, folder="/", overwrite=False, chunksize=dxfile.DEFAULT_BUFFER_SIZE,
-                    show_progress=False, **kwargs):
+                    show_progress=False, parallel_files=1, **kwargs):
     '''
     :param project: Project ID to use as context for this download.
     :type project: string
@@ -652,6 +1217,8 @@ def download_folder(project, destdir, folder="/", overwrite=False, chunksize=dxf
     :type folder: string
     :param overwrite: Overwrite existing files
     :type overwrite: boolean
+    :param parallel_files: Number of files to download at the same time (see :func:`download_dxfiles`)
+    :type parallel_files: int
 
     Downloads the contents of the remote *folder* of the *project* into the local directory specified by *destdir*.
 
@@ -702,13 +1269,15 @@ def download_folder(project, destdir, folder="/", overwrite=False, chunksize=dxf
     # A generator that returns the files one by one. We don't want to materialize it, because
     # there could be many files here.
     files_gen = dxpy.search.find_data_objects(classname='file', state='closed', project=project,
-                                              folder=normalized_folder, recurse=True, describe=describe_input)
+                                              folder=normalized_folder, recurse=True, describe=describe_input,
+                                              prefetch_pages=1)
     if files_gen is None:
         # In python 3, the generator can be None, and iterating on it
         # will cause an error.
         return
 
     # Now it is safe, in both python 2 and 3, to iterate on the generator
+    downloads = []
     for remote_file in files_gen:
         local_filename = os.path.join(compose_local_dir(normalized_dest_dir,
                                                         normalized_folder,
@@ -722,6 +1291,10 @@ def download_folder(project, destdir, folder="/", overwrite=False, chunksize=dxf
                      ("" if remote_file['describe']['folder'] == "/" else remote_file['describe']['folder']),
                      remote_file['describe']['name'],
                      local_filename)
+        if parallel_files > 1:
+            # Files are scheduled together, largest first, once they are all known
+            downloads.append((project, remote_file['describe'], local_filename))
+            continue
         download_dxfile(remote_file['describe']['id'],
                         local_filename,
                         chunksize=chunksize,
@@ -729,3 +1302,6 @@ def download_folder(project, destdir, folder="/", overwrite=False, chunksize=dxf
                         show_progress=show_progress,
                         describe_output=remote_file['describe'],
                         **kwargs)
+    if downloads:
+        download_dxfiles(downloads, chunksize=chunksize, parallel_files=parallel_files, show_progress=show_progress,
+                         **kwargs)
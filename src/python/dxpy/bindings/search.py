@@ -24,6 +24,9 @@ provides search functionality over all data objects in the system. The
 
 from __future__ import print_function, unicode_literals, division, absolute_import
 
+import queue
+import threading
+
 import dxpy
 from . import DXApplet, DXApp, DXWorkflow, DXProject, DXJob, DXAnalysis
 from ..exceptions import DXError, DXSearchError
@@ -70,7 +73,70 @@ def resolve_data_objects(objects, project=None, folder=None, batchsize=1000):
     return results
 
 
-def _find(api_method, query, limit, return_handler, first_page_size, **kwargs):
+def _fetch_pages(fetch_page, query, limit=None):
+    ''' Calls *fetch_page* with *query* for each page of results of a find
+    method, until there are no more results or *limit* results have been
+    fetched, and yields the responses.
+    '''
+    num_results = 0
+    while True:
+        resp = fetch_page(query)
+        yield resp
+        num_results += len(resp["results"])
+
+        # set up next query
+        if resp["next"] is not None and (limit is None or num_results < limit):
+            query["starting"] = resp["next"]
+            query["limit"] = min(query["limit"]*2, 1000)
+        else:
+            return
+
+def _prefetch_pages(fetch_page, query, limit=None, prefetch_pages=0):
+    ''' Like :func:`_fetch_pages`, but while a page is being consumed, up to
+    *prefetch_pages* of the following pages are fetched in a background
+    thread.
+    '''
+    if prefetch_pages <= 0:
+        for resp in _fetch_pages(fetch_page, query, limit=limit):
+            yield resp
+        return
+
+    pages, stopped = queue.Queue(maxsize=prefetch_pages), threading.Event()
+
+    def put(item):
+        # Gives up if the consumer has gone away
+        while not stopped.is_set():
+            try:
+                pages.put(item, timeout=1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def fetch():
+        try:
+            for resp in _fetch_pages(fetch_page, query, limit=limit):
+                if not put((resp, None)):
+                    return
+            put((None, None))
+        except Exception as e:
+            put((None, e))
+
+    fetcher = threading.Thread(target=fetch)
+    fetcher.daemon = True
+    fetcher.start()
+    try:
+        while True:
+            resp, error = pages.get()
+            if error is not None:
+                raise error
+            if resp is None:
+                return
+            yield resp
+    finally:
+        stopped.set()
+
+def _find(api_method, query, limit, return_handler, first_page_size, prefetch_pages=0, **kwargs):
     ''' Takes an API method handler (dxpy.api.find*) and calls it with *query*,
     and then wraps a generator around its output. Used by the methods below.
 
@@ -81,9 +147,8 @@ def _find(api_method, query, limit, return_handler, first_page_size, **kwargs):
     if "limit" not in query:
         query["limit"] = first_page_size
 
-    while True:
-        resp = api_method(query, **kwargs)
-
+    for resp in _prefetch_pages(lambda page_query: api_method(page_query, **kwargs), query, limit=limit,
+                                prefetch_pages=prefetch_pages):
         by_parent = resp.get('byParent')
         descriptions = resp.get('describe')
         def format_result(result):
@@ -100,13 +165,6 @@ def _find(api_method, query, limit, return_handler, first_page_size, **kwargs):
             num_results += 1
             yield format_result(i)
 
-        # set up next query
-        if resp["next"] is not None:
-            query["starting"] = resp["next"]
-            query["limit"] = min(query["limit"]*2, 1000)
-        else:
-            return
-
 def find_data_objects(classname=None, state=None, visibility=None,
                       name=None, name_mode='exact', properties=None,
                       typename=None, tag=None, tags=None,
@@ -115,7 +173,7 @@ def find_data_objects(classname=None, state=None, visibility=None,
                       created_after=None, created_before=None,
                       describe=False, limit=None, level=None, region=None,
                       archival_state=None, return_handler=False, first_page_size=100,
-                      **kwargs):
+                      prefetch_pages=0, **kwargs):
     """
     :param classname:
         Class with which to restrict the search, i.e. one of "record",
@@ -169,6 +227,9 @@ def find_data_objects(classname=None, state=None, visibility=None,
     :type limit: int
     :param first_page_size: The number of results that the initial API call will return. Subsequent calls will raise this by multiplying by 2 up to a maximum of 1000.
     :type first_page_size: int
+    :param prefetch_pages: The number of pages of results to fetch in the background, ahead of the one being consumed
+        (default 0: each page is requested once the previous one has been consumed).
+    :type prefetch_pages: int
     :param return_handler: If True, yields results as dxpy object handlers (otherwise, yields each result as a dict with keys "id" and "project")
     :type return_handler: boolean
     :rtype: generator
@@ -267,7 +328,8 @@ def find_data_objects(classname=None, state=None, visibility=None,
     if limit is not None:
         query["limit"] = limit
 
-    return _find(dxpy.api.system_find_data_objects, query, limit, return_handler, first_page_size, **kwargs)
+    return _find(dxpy.api.system_find_data_objects, query, limit, return_handler, first_page_size,
+                 prefetch_pages=prefetch_pages, **kwargs)
 
 
 def find_executions(classname=None, launched_by=None, executable=None, project=None,
@@ -276,7 +338,7 @@ def find_executions(classname=None, launched_by=None, executable=None, project=N
                     created_after=None, created_before=None, describe=False,
                     name=None, name_mode="exact", tags=None, properties=None, limit=None,
                     first_page_size=100, return_handler=False, include_subjobs=True,
-                    include_restarted=None, **kwargs):
+                    include_restarted=None, prefetch_pages=0, **kwargs):
     '''
     :param classname:
         Class with which to restrict the search, i.e. one of "job",
@@ -326,6 +388,9 @@ def find_executions(classname=None, launched_by=None, executable=None, project=N
     :type limit: int
     :param first_page_size: The number of results that the initial API call will return. Subsequent calls will raise this by multiplying by 2 up to a maximum of 1000.
     :type first_page_size: int
+    :param prefetch_pages: The number of pages of results to fetch in the background, ahead of the one being consumed
+        (default 0: each page is requested once the previous one has been consumed).
+    :type prefetch_pages: int
     :param return_handler: If True, yields results as dxpy object handlers (otherwise, yields each result as a dict with keys "id" and "project")
     :type return_handler: boolean
     :param include_subjobs: If False, no subjobs will be returned by the API
@@ -423,7 +488,8 @@ def find_executions(classname=None, launched_by=None, executable=None, project=N
     if limit is not None:
         query["limit"] = limit
 
-    return _find(dxpy.api.system_find_executions, query, limit, return_handler, first_page_size, **kwargs)
+    return _find(dxpy.api.system_find_executions, query, limit, return_handler, first_page_size,
+                 prefetch_pages=prefetch_pages, **kwargs)
 
 def find_jobs(*args, **kwargs):
     """
@@ -442,7 +508,8 @@ def find_analyses(*args, **kwargs):
 def find_projects(name=None, name_mode='exact', properties=None, tags=None,
                   level=None, describe=False, explicit_perms=None, region=None,
                   public=None, created_after=None, created_before=None, billed_to=None,
-                  limit=None, return_handler=False, first_page_size=100, containsPHI=None, externalUploadRestricted=None, **kwargs):
+                  limit=None, return_handler=False, first_page_size=100, containsPHI=None, externalUploadRestricted=None,
+                  prefetch_pages=0, **kwargs):
     """
     :param name: Name of the project (also see *name_mode*)
     :type name: string
@@ -479,6 +546,9 @@ def find_projects(name=None, name_mode='exact', properties=None, tags=None,
     :type limit: int
     :param first_page_size: The number of results that the initial API call will return. Subsequent calls will raise this by multiplying by 2 up to a maximum of 1000.
     :type first_page_size: int
+    :param prefetch_pages: The number of pages of results to fetch in the background, ahead of the one being consumed
+        (default 0: each page is requested once the previous one has been consumed).
+    :type prefetch_pages: int
     :param return_handler: If True, yields results as dxpy object handlers (otherwise, yields each result as a dict with keys "id" and "project")
     :type return_handler: boolean
     :param containsPHI: If set to true, only returns projects that contain PHI.
@@ -537,7 +607,8 @@ def find_projects(name=None, name_mode='exact', properties=None, tags=None,
     if externalUploadRestricted is not None:
         query["externalUploadRestricted"] = externalUploadRestricted
 
-    return _find(dxpy.api.system_find_projects, query, limit, return_handler, first_page_size, **kwargs)
+    return _find(dxpy.api.system_find_projects, query, limit, return_handler, first_page_size,
+                 prefetch_pages=prefetch_pages, **kwargs)
 
 def find_global_executables(method, name=None, name_mode='exact', category=None,
                             all_versions=None, published=None,
@@ -545,7 +616,7 @@ def find_global_executables(method, name=None, name_mode='exact', category=None,
                             created_after=None, created_before=None,
                             modified_after=None, modified_before=None,
                             describe=False, limit=None, return_handler=False,
-                            first_page_size=100, **kwargs):
+                            first_page_size=100, prefetch_pages=0, **kwargs):
     """
     :param method: Name of the API method used to find the global executable (app or a global workflow).
     :type name: function
@@ -583,6 +654,9 @@ def find_global_executables(method, name=None, name_mode='exact', category=None,
     :type limit: int
     :param first_page_size: The number of results that the initial API call will return. Subsequent calls will raise this by multiplying by 2 up to a maximum of 1000.
     :type first_page_size: int
+    :param prefetch_pages: The number of pages of results to fetch in the background, ahead of the one being consumed
+        (default 0: each page is requested once the previous one has been consumed).
+    :type prefetch_pages: int
     :param return_handler: If True, yields results as dxpy object handlers (otherwise, yields each result as a dict with keys "id" and "project")
     :type return_handler: boolean
     :rtype: generator
@@ -633,14 +707,15 @@ def find_global_executables(method, name=None, name_mode='exact', category=None,
     if limit is not None:
         query["limit"] = limit
 
-    return _find(method, query, limit, return_handler, first_page_size, **kwargs)
+    return _find(method, query, limit, return_handler, first_page_size,
+                 prefetch_pages=prefetch_pages, **kwargs)
 
 def find_apps(name=None, name_mode='exact', category=None,
               all_versions=None, published=None,
               billed_to=None, created_by=None, developer=None,
               created_after=None, created_before=None,
               modified_after=None, modified_before=None,
-              describe=False, limit=None, return_handler=False, first_page_size=100, **kwargs):
+              describe=False, limit=None, return_handler=False, first_page_size=100, prefetch_pages=0, **kwargs):
     """
     This method is identical to :meth:`find_global_executables()` with the API method
     used: :meth:`system_find_apps()`.
@@ -652,7 +727,7 @@ def find_apps(name=None, name_mode='exact', category=None,
                                    created_after=created_after, created_before=created_before,
                                    modified_after=modified_after, modified_before=modified_before,
                                    describe=describe, limit=limit, return_handler=return_handler,
-                                   first_page_size=first_page_size, **kwargs)
+                                   first_page_size=first_page_size, prefetch_pages=prefetch_pages, **kwargs)
 
 def find_global_workflows(name=None, name_mode='exact', category=None,
                           all_versions=None, published=None,
@@ -660,7 +735,7 @@ def find_global_workflows(name=None, name_mode='exact', category=None,
                           created_after=None, created_before=None,
                           modified_after=None, modified_before=None,
                           describe=False, limit=None, return_handler=False,
-                          first_page_size=100, **kwargs):
+                          first_page_size=100, prefetch_pages=0, **kwargs):
     """
     This method is identical to :meth:`find_global_executables()` with the API method
     used: :meth:`system_find_global_workflows()`.
@@ -672,7 +747,7 @@ def find_global_workflows(name=None, name_mode='exact', category=None,
                                   created_after=created_after, created_before=created_before,
                                   modified_after=modified_after, modified_before=modified_before,
                                   describe=describe, limit=limit, return_handler=return_handler,
-                                  first_page_size=first_page_size, **kwargs)
+                                  first_page_size=first_page_size, prefetch_pages=prefetch_pages, **kwargs)
 
 def _find_one(method, zero_ok=False, more_ok=True, **kwargs):
     # users often incorrectly pass strings to zero_ok, fail fast in that case
@@ -756,7 +831,7 @@ def find_one_app(zero_ok=False, more_ok=True, **kwargs):
     return _find_one(find_apps, zero_ok=zero_ok, more_ok=more_ok, **kwargs)
 
 
-def _org_find(api_method, org_id, query, first_page_size=100):
+def _org_find(api_method, org_id, query, first_page_size=100, prefetch_pages=0):
     """
     Takes an API method handler ``dxpy.api.org_find...`` and calls it with
     *org_id* and *query*, then wraps a generator around its output. Used by
@@ -764,25 +839,20 @@ def _org_find(api_method, org_id, query, first_page_size=100):
 
     :param first_page_size: The number of results that the initial API call will return.
     :type first_page_size: int
+    :param prefetch_pages: The number of pages of results to fetch in the background, ahead of the one being consumed.
+    :type prefetch_pages: int
 
     """
     if "limit" not in query:
         query["limit"] = min(first_page_size, 1000)
 
-    while True:
-        resp = api_method(org_id, query)
+    for resp in _prefetch_pages(lambda page_query: api_method(org_id, page_query), query,
+                                prefetch_pages=prefetch_pages):
         for result in resp["results"]:
             yield result
 
-        # set up next query
-        if resp["next"] is not None:
-            query["starting"] = resp["next"]
-            query["limit"] = min(query["limit"] * 2, 1000)
-        else:
-            break
-
 
-def org_find_members(org_id=None, level=None, describe=False):
+def org_find_members(org_id=None, level=None, describe=False, prefetch_pages=0):
     """
     :param org_id: ID of the organization
     :type org_id: string
@@ -793,6 +863,9 @@ def org_find_members(org_id=None, level=None, describe=False):
         the describe response; True includes it; a dict will be used as the input to ``dxpy.api.user_describe`` (to
         customize the desired set of fields in the describe response).
     :type describe: bool or dict
+    :param prefetch_pages: The number of pages of results to fetch in the background, ahead of the one being consumed
+        (default 0: each page is requested once the previous one has been consumed).
+    :type prefetch_pages: int
 
     Returns a generator that yields all org members that match the query formed by intersecting all specified
     constraints. The search is not restricted by any parameters that were unspecified.
@@ -802,11 +875,12 @@ def org_find_members(org_id=None, level=None, describe=False):
         query["level"] = level
     query["describe"] = describe
 
-    return _org_find(dxpy.api.org_find_members, org_id, query)
+    return _org_find(dxpy.api.org_find_members, org_id, query, prefetch_pages=prefetch_pages)
 
 
 def org_find_projects(org_id=None, name=None, name_mode='exact', ids=None, properties=None, tags=None, describe=False,
-                      public=None, created_after=None, created_before=None, region=None, containsPHI=None):
+                      public=None, created_after=None, created_before=None, region=None, containsPHI=None,
+                      prefetch_pages=0):
     """
     :param org_id: ID of the organization
     :type org_id: string
@@ -826,6 +900,9 @@ def org_find_projects(org_id=None, name=None, name_mode='exact', ids=None, prope
         omits the describe response; True includes it; a dict will be used as the input to
         ``dxpy.api.project_describe`` (to customize the desired set of fields in the describe response).
     :type describe: bool or dict
+    :param prefetch_pages: The number of pages of results to fetch in the background, ahead of the one being consumed
+        (default 0: each page is requested once the previous one has been consumed).
+    :type prefetch_pages: int
     :param public: True indicates that each result must be public; False indicates that each result must be private;
         None indicates that both public and private projects will be returned in the result set.
     :type public: boolean or None
@@ -882,7 +959,7 @@ def org_find_projects(org_id=None, name=None, name_mode='exact', ids=None, prope
     if containsPHI is not None:
         query["containsPHI"] = containsPHI
 
-    return _org_find(dxpy.api.org_find_projects, org_id, query)
+    return _org_find(dxpy.api.org_find_projects, org_id, query, prefetch_pages=prefetch_pages)
 
 
 def org_find_apps(org_id,
@@ -902,6 +979,7 @@ def org_find_apps(org_id,
                   limit=None,
                   return_handler=False,
                   first_page_size=100,
+                  prefetch_pages=0,
                   **kwargs):
     """
     :param name: Name of the app (also see *name_mode*)
@@ -951,6 +1029,9 @@ def org_find_apps(org_id,
     :param first_page_size: The number of results that the initial API call will return. Subsequent calls will raise
         this by multiplying by 2 up to a maximum of 1000.
     :type first_page_size: int
+    :param prefetch_pages: The number of pages of results to fetch in the background, ahead of the one being consumed
+        (default 0: each page is requested once the previous one has been consumed).
+    :type prefetch_pages: int
     :param return_handler: If True, yields results as dxpy object handlers (otherwise, yields each result as a dict
         with keys "id" and "project")
     :type return_handler: boolean
@@ -1002,9 +1083,9 @@ def org_find_apps(org_id,
     if limit is not None:
         query["limit"] = limit
 
-    return _org_find(dxpy.api.org_find_apps, org_id, query)
+    return _org_find(dxpy.api.org_find_apps, org_id, query, prefetch_pages=prefetch_pages)
 
-def find_orgs(query, first_page_size=10):
+def find_orgs(query, first_page_size=10, prefetch_pages=0):
     """
     :param query: The input to the /system/findOrgs API method.
     :type query: dict
@@ -1014,6 +1095,9 @@ def find_orgs(query, first_page_size=10):
         calls will raise the number of returned results exponentially up to a
         max of 1000.
     :type first_page_size: int
+    :param prefetch_pages: The number of pages of results to fetch in the background, ahead of the one being consumed
+        (default 0: each page is requested once the previous one has been consumed).
+    :type prefetch_pages: int
 
     :rtype: generator
 
@@ -1021,4 +1105,4 @@ def find_orgs(query, first_page_size=10):
     transparently handle pagination as necessary.
     """
     return _find(dxpy.api.system_find_orgs, query, limit=None,
-                 return_handler=False, first_page_size=first_page_size)
+                 return_handler=False, first_page_size=first_page_size, prefetch_pages=prefetch_pages)
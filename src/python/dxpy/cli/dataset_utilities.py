@@ -28,6 +28,7 @@ import csv
 import dxpy
 import codecs
 import subprocess
+import itertools
 from functools import reduce
 from ..utils.printing import fill
 from ..bindings import DXRecord
@@ -50,14 +51,15 @@ from ..dx_extract_utils.filter_to_payload import validate_JSON, final_payload
 from ..dx_extract_utils.germline_utils import (
     get_genotype_only_types,
     add_germline_base_sql,
-    sort_germline_variant,
+    make_germline_variant_sort_key,
+    merge_germline_results,
     harmonize_germline_sql,
     harmonize_germline_results,
     get_germline_ref_payload,
     get_germline_loci_payload,
     update_genotype_only_ref,
     get_genotype_types,
-    infer_genotype_type,
+    iter_inferred_genotype_entries,
     get_types_to_filter_out_when_infering,
     filter_results
 )
@@ -67,6 +69,7 @@ from ..dx_extract_utils.somatic_filter_payload import somatic_final_payload
 from ..dx_extract_utils.cohort_filter_payload import cohort_filter_payload, cohort_final_payload
 
 from ..bindings.apollo.dataset import Dataset
+from ..bindings.apollo.descriptor_cache import get_descriptor_cache
 
 from ..bindings.apollo.cmd_line_options_validator import ArgsValidator
 from ..bindings.apollo.json_validation_by_schema import JSONValidator
@@ -77,10 +80,10 @@ from ..bindings.apollo.schemas.assay_filtering_conditions import EXTRACT_ASSAY_E
 
 from ..bindings.apollo.vizserver_filters_from_json_parser import JSONFiltersValidator
 from ..bindings.apollo.vizserver_payload_builder import VizPayloadBuilder
-from ..bindings.apollo.vizclient import VizClient
+from ..bindings.apollo.vizclient import VizClient, iter_paged_results
 
 from ..bindings.apollo.data_transformations import transform_to_expression_matrix
-from .output_handling import write_expression_output, pretty_print_json
+from .output_handling import write_expression_output, pretty_print_json, open_output_file
 
 from .help_messages import EXTRACT_ASSAY_EXPRESSION_JSON_HELP, EXTRACT_ASSAY_EXPRESSION_ADDITIONAL_FIELDS_HELP
 
@@ -192,6 +195,21 @@ def raw_api_call(resp, payload, sql_message=True):
     return resp_raw
 
 
+def iter_raw_api_results(resp, payload, page_size=None, sql_message=True):
+    """
+    Yields the "results" of raw_api_call. With page_size, they are requested page_size rows at a time (see
+    iter_paged_results), so that all the results are never held in memory at once.
+    """
+    if not page_size:
+        return iter(raw_api_call(resp, payload, sql_message=sql_message)["results"])
+    return iter_paged_results(
+        lambda page_payload: raw_api_call(resp, page_payload, sql_message=sql_message),
+        payload,
+        page_size,
+        error_handler=err_exit,
+    )
+
+
 def extract_dataset(args):
     """
     Retrieves the data or generates SQL to retrieve the data from a dataset or cohort for a set of entity.fields. Additionally, the dataset's dictionary can be extracted independently or in conjunction with data.
@@ -453,12 +471,11 @@ def extract_dataset(args):
                 with open(out_file_field, "w") as f:
                     print(sql_results, file=f)
         else:
-            resp_raw = raw_api_call(resp, payload)
             csv_from_json(
                 out_file_name=out_file_field,
                 print_to_stdout=print_to_stdout,
                 sep=delimiter,
-                raw_results=resp_raw["results"],
+                raw_results=iter_raw_api_results(resp, payload, page_size=args.page_size),
                 column_names=fields_list,
             )
 
@@ -703,6 +720,10 @@ def comment_fill(string, comment_string='#  ', **kwargs):
     return re.sub('^', comment_string, fill(string, width_adjustment=width_adjustment, **kwargs), flags=re.MULTILINE)
 
 
+# Maximum number of the queries of a germline genotype extraction run at the same time
+GERMLINE_QUERY_THREADS = 4
+
+
 def retrieve_samples(resp: dict, assay_name: str, assay_id: str) -> list:
     """
     Get the list of sample_ids from the sample table for the selected assay.
@@ -715,6 +736,69 @@ def retrieve_samples(resp: dict, assay_name: str, assay_id: str) -> list:
     return [_["sample_id"] for _ in raw_api_call(resp, sample_payload)["results"]]
 
 
+def retrieve_germline_genotypes(resp, genotype_payload, genotype_only_payloads, fields_list, page_size=None,
+                                query_genotype_table=True, samples_assay=None, loci_payload=None):
+    """
+    Runs the queries of the genotypes: the genotype/allele table query (with query_genotype_table), the genotype
+    table only queries, whose missing ref values are then looked up, and, for inference, the queries of the samples
+    of samples_assay (name, id) and of the loci of loci_payload.
+
+    These queries do not depend on one another, so they run concurrently, and their results are returned as if they
+    had run one after the other: the list of the results of the genotype/allele and genotype table only queries, the
+    samples and the loci (None without samples_assay and loci_payload). When a query fails (err_exit), its error is
+    raised as soon as its results are needed: the queries that have not started are cancelled, and the running ones
+    are not waited for.
+    """
+    def fetch_results(payload):
+        return list(iter_raw_api_results(resp, payload, page_size=page_size))
+
+    def fetch_genotype_only_results(payload):
+        # add missing keys that are in the allele table part of the genotype/allele table query
+        return harmonize_germline_results(fetch_results(payload), fields_list)
+
+    num_queries = int(query_genotype_table) + len(genotype_only_payloads) + (2 if loci_payload is not None else 0)
+    executor = dxpy.utils.get_futures_threadpool(max(1, min(num_queries, GERMLINE_QUERY_THREADS)))
+    futures = []
+
+    def submit(fn, *args):
+        futures.append(executor.submit(fn, *args))
+        return futures[-1]
+
+    try:
+        genotype_future = submit(fetch_results, genotype_payload) if query_genotype_table else None
+        genotype_only_futures = [submit(fetch_genotype_only_results, genotype_only_payload)
+                                 for genotype_only_payload in genotype_only_payloads]
+        samples_future = loci_future = None
+        if loci_payload is not None:
+            samples_future = submit(retrieve_samples, resp, *samples_assay)
+            loci_future = submit(fetch_results, loci_payload)
+
+        partitions = []
+        if genotype_future is not None:
+            partitions.append(genotype_future.result())
+        genotype_only_results = [future.result() for future in genotype_only_futures]
+        partitions.extend(genotype_only_results)
+
+        if genotype_only_results:
+            # get the ref value from the allele table using locus ids
+            # ingestion of VCFs lines missing ALT is unsupported so the locus_id will exist in the allele table
+            # normalized ref values in the locus_id will match the ref value for missing ALT lines if they were
+            # ingested and locus_id could be parsed for the ref value
+            ref_payload = get_germline_ref_payload(itertools.chain(*genotype_only_results), genotype_payload)
+            if ref_payload:
+                locus_id_refs = raw_api_call(resp, ref_payload)
+                update_genotype_only_ref(itertools.chain(*genotype_only_results), locus_id_refs)
+
+        samples = samples_future.result() if samples_future is not None else None
+        loci = loci_future.result() if loci_future is not None else None
+        return partitions, samples, loci
+    finally:
+        # Only has an effect after an error: the results of the other queries are not needed anymore
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
 def extract_assay_germline(args):
     """
     Retrieve the selected data or generate SQL to retrieve the data from an genetic variant assay in a dataset or cohort based on provided rules.
@@ -885,8 +969,9 @@ def extract_assay_germline(args):
                 with open(out_file, "w") as sql_file:
                     print(sql_results, file=sql_file)
         else:
-            resp_raw = raw_api_call(resp, payload)
-            ordered_results = sorted(resp_raw["results"], key=sort_germline_variant)
+            ordered_results = sorted(
+                iter_raw_api_results(resp, payload, page_size=args.page_size), key=make_germline_variant_sort_key()
+            )
 
             csv_from_json(
                 out_file_name=out_file,
@@ -998,42 +1083,37 @@ def extract_assay_germline(args):
                 with open(out_file, "w") as sql_file:
                     print(sql_results, file=sql_file)
         else:
-            # get the list of dictionary results for the genotype/allele table query
-            ordered_results = []
-            if genotype_types:
-                genotype_resp_raw = raw_api_call(resp, genotype_payload)
-                ordered_results.extend(genotype_resp_raw["results"])
+            infer = args.infer_ref or args.infer_nocall
+            partitions, samples, loci = retrieve_germline_genotypes(
+                resp,
+                genotype_payload,
+                genotype_only_payloads,
+                fields_list,
+                page_size=args.page_size,
+                query_genotype_table=bool(genotype_types),
+                samples_assay=(selected_assay_name, selected_assay_id) if infer else None,
+                loci_payload=get_germline_loci_payload(filter_dict["location"], genotype_payload) if infer else None,
+            )
+            inferred_partitions = []
 
-            # get the list of dictionary results for each genotype table only query
-            for genotype_only_payload in genotype_only_payloads:
-                genotype_only_resp_raw = raw_api_call(resp, genotype_only_payload)
-                # add missing keys that are in the allele table part of the genotype/allele table query
-                ordered_results.extend(harmonize_germline_results(genotype_only_resp_raw["results"], fields_list))
-
-            if genotype_only_types:
-                # get the ref value from the allele table using locus ids
-                # ingestion of VCFs lines missing ALT is unsupported so the locus_id will exist in the allele table
-                # normalized ref values in the locus_id will match the ref value for missing ALT lines if they
-                # were ingested and locus_id could be parsed for the ref value
-                ref_payload = get_germline_ref_payload(ordered_results, genotype_payload)
-                if ref_payload:
-                    locus_id_refs = raw_api_call(resp, ref_payload)
-                    update_genotype_only_ref(ordered_results, locus_id_refs)
-
-            if args.infer_ref or args.infer_nocall:
-                samples = retrieve_samples(resp, selected_assay_name, selected_assay_id)
+            if infer:
                 selected_samples = set(filter_dict.get("sample_id", []))
                 if selected_samples:
                     samples = list(selected_samples.intersection(samples))
-                loci_payload = get_germline_loci_payload(filter_dict["location"], genotype_payload)
-                loci = [locus for locus in raw_api_call(resp, loci_payload)["results"]]
                 type_to_infer = "ref" if args.infer_ref else "no-call"
-                ordered_results = infer_genotype_type(samples, loci, ordered_results, type_to_infer)
+                # The inferred entries are generated in order as they are written. They all have the inferred
+                # genotype type, so they are either all filtered out or all kept.
+                if type_to_infer not in types_to_filter_out:
+                    inferred_partitions.append(
+                        iter_inferred_genotype_entries(samples, loci, itertools.chain(*partitions), type_to_infer)
+                    )
                 # Filter out not requested genotypes
                 if len(types_to_filter_out) > 0:
-                    ordered_results = filter_results(ordered_results, "genotype_type", types_to_filter_out)
+                    partitions = [filter_results(partition, "genotype_type", types_to_filter_out)
+                                  for partition in partitions]
 
-            ordered_results.sort(key=sort_germline_variant)
+            # The results of each query are sorted on their own, and merged as they are written
+            ordered_results = merge_germline_results(partitions, inferred_partitions)
 
             csv_from_json(
                 out_file_name=out_file,
@@ -1095,29 +1175,36 @@ def csv_from_json(
     quote_char=str('"'),
     quoting=csv.QUOTE_MINIMAL,
 ):
+    # The results may be fetched page by page as they are written: nothing
+    # is written before the first page is received, and the output file
+    # only appears once all of them are written
+    raw_results = iter(raw_results)
+    first_entry = next(raw_results, None)
+    if first_entry is not None:
+        raw_results = itertools.chain([first_entry], raw_results)
+
+    def write_results(fields_output):
+        csv_writer = csv.DictWriter(
+            fields_output,
+            delimiter=str(sep),
+            doublequote=True,
+            escapechar=None,
+            lineterminator="\n",
+            quotechar=quote_char,
+            quoting=quoting,
+            skipinitialspace=False,
+            strict=False,
+            fieldnames=column_names,
+        )
+        csv_writer.writeheader()
+        for entry in raw_results:
+            csv_writer.writerow(entry)
+
     if print_to_stdout:
-        fields_output = sys.stdout
+        write_results(sys.stdout)
     else:
-        fields_output = open(out_file_name, "w")
-
-    csv_writer = csv.DictWriter(
-        fields_output,
-        delimiter=str(sep),
-        doublequote=True,
-        escapechar=None,
-        lineterminator="\n",
-        quotechar=quote_char,
-        quoting=quoting,
-        skipinitialspace=False,
-        strict=False,
-        fieldnames=column_names,
-    )
-    csv_writer.writeheader()
-    for entry in raw_results:
-        csv_writer.writerow(entry)
-
-    if not print_to_stdout:
-        fields_output.close()
+        with open_output_file(out_file_name) as fields_output:
+            write_results(fields_output)
 
 
 def extract_assay_somatic(args):
@@ -1277,13 +1364,11 @@ def extract_assay_somatic(args):
                 with open(out_file, "w") as sql_file:
                     print(sql_results, file=sql_file)
         else:
-            resp_raw = raw_api_call(resp, payload)
-
             csv_from_json(
                 out_file_name=out_file,
                 print_to_stdout=print_to_stdout,
                 sep="\t",
-                raw_results=resp_raw["results"],
+                raw_results=iter_raw_api_results(resp, payload, page_size=args.page_size),
                 column_names=fields_list,
                 quote_char=str("\t"),
                 quoting=csv.QUOTE_NONE,
@@ -1535,7 +1620,6 @@ def extract_assay_expression(args):
         error_handler=err_exit,
     )
 
-    DATASET_DESCRIPTOR = dataset.descriptor_file_dict
     ASSAY_NAME = (
         args.assay_name if args.assay_name else dataset.assay_names_list("molecular_expression")[0]
     )
@@ -1563,6 +1647,13 @@ def extract_assay_expression(args):
     client = VizClient(url, project, err_exit)
     if args.sql:
         vizserver_response = client.get_raw_sql(vizserver_payload, record_id)
+    elif args.page_size:
+        rows = client.iter_data(vizserver_payload, record_id, args.page_size)
+        # Only the first page is read before writing starts
+        first_row = next(rows, None)
+        vizserver_response = {
+            "results": [] if first_row is None else itertools.chain([first_row], rows)
+        }
     else:
         vizserver_response = client.get_data(vizserver_payload, record_id)
 
@@ -1874,15 +1965,18 @@ class DXDatasetDescriptor:
     def __init__(self, dxfile, **kwargs):
         python3_5_x = sys.version_info.major == 3 and sys.version_info.minor == 5
 
-        with as_handle(dxfile, is_gzip=True, **kwargs) as f:
-            if python3_5_x:
-                jsonstr = f.read()
-                if type(jsonstr) != str:
-                    jsonstr = jsonstr.decode("utf-8")
-
-                obj = json.loads(jsonstr, object_pairs_hook=collections.OrderedDict)
-            else:
-                obj = json.load(f, object_pairs_hook=collections.OrderedDict)
+        if isinstance(dxfile, DXFile):
+            obj = get_descriptor_cache().get(dxfile.get_id(), project=dxfile.get_proj_id())
+        else:
+            with as_handle(dxfile, is_gzip=True, **kwargs) as f:
+                if python3_5_x:
+                    jsonstr = f.read()
+                    if type(jsonstr) != str:
+                        jsonstr = jsonstr.decode("utf-8")
+
+                    obj = json.loads(jsonstr, object_pairs_hook=collections.OrderedDict)
+                else:
+                    obj = json.load(f, object_pairs_hook=collections.OrderedDict)
 
         for key in obj:
             setattr(self, key, obj[key])
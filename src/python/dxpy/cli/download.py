@@ -158,11 +158,32 @@ def _rel2abs(path, project):
 
 
 def _download_files(files, destdir, args, dest_filename=None):
+    parallel_files = vars(args).get('parallel_files') or 1
+    downloads = []
     for project in files:
         for f in files[project]:
             file_desc = f['describe']
             dest = dest_filename or os.path.join(destdir, file_desc['name'].replace('/', '%2F'))
+            if parallel_files > 1 and dest_filename is None:
+                # Same checks as download_one_file; the files are then downloaded together
+                if not args.overwrite and os.path.exists(dest):
+                    err_exit(fill('Error: path "' + dest + '" already exists but -f/--overwrite was not set'))
+                if file_desc['class'] != 'file':
+                    print("Skipping non-file data object {name} ({id})".format(**file_desc), file=sys.stderr)
+                elif file_desc['state'] != 'closed':
+                    print("Skipping file {name} ({id}) because it is not closed".format(**file_desc), file=sys.stderr)
+                else:
+                    downloads.append((project, file_desc, dest))
+                continue
             download_one_file(project, file_desc, dest, args)
+    if downloads:
+        try:
+            symlink_max_tries = args.symlink_max_tries if vars(args).get('symlink_max_tries') is not None else 15
+            dxpy.download_dxfiles(downloads, parallel_files=parallel_files,
+                                  show_progress=vars(args).get('show_progress', False),
+                                  symlink_max_tries=symlink_max_tries)
+        except:
+            err_exit()
 
 
 def _download_folders(folders, destdir, args):
@@ -178,7 +199,8 @@ def _download_folders(folders, destdir, args):
             folder_destdir = os.path.join(destdir, folder[len(strip_prefix):].lstrip('/'))
             try:
                 dxpy.download_folder(project, folder_destdir, folder=folder, overwrite=args.overwrite,
-                                     show_progress=show_progress)
+                                     show_progress=show_progress,
+                                     parallel_files=vars(args).get('parallel_files') or 1)
             except:
                 err_exit()
 
@@ -3,9 +3,48 @@ import sys
 import csv
 import os
 import json
+import itertools
+import tempfile
+import contextlib
 from ..exceptions import err_exit
 
 
+@contextlib.contextmanager
+def open_output_file(file_name, mode="w", **kwargs):
+    """
+    Opens file_name for writing. The data is written to a temporary file
+    in the same directory, which replaces file_name only once it has been
+    written completely, so that an error (or err_exit) while the data is
+    produced, e.g. while rows are fetched page by page, leaves neither a
+    partial file nor a clobbered earlier one behind.
+    """
+    # Like open(), write to the target of a symbolic link
+    file_name = os.path.realpath(file_name)
+    if os.path.exists(file_name) and not os.path.isfile(file_name):
+        # A device or a named pipe (e.g. /dev/stdout) cannot be replaced
+        with open(file_name, mode, **kwargs) as f:
+            yield f
+        return
+    fd, temp_file_name = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(file_name)), prefix="." + os.path.basename(file_name) + "."
+    )
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        # Same permissions as the file written by open()
+        if os.path.exists(file_name):
+            os.chmod(temp_file_name, os.stat(file_name).st_mode & 0o7777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_file_name, 0o666 & ~umask)
+        os.replace(temp_file_name, file_name)
+    except BaseException:
+        if os.path.exists(temp_file_name):
+            os.remove(temp_file_name)
+        raise
+
+
 def write_expression_output(
     arg_output,
     arg_delim,
@@ -118,15 +157,26 @@ def write_expression_output(
             error_handler("Unexpected error occurred while writing SQL query output")
 
     else:
+        if isinstance(output_listdict_or_string, list):
+            rows = output_listdict_or_string
+            first_row = rows[0]
+        else:
+            # An iterator of rows (e.g. fetched page by page): the rows are
+            # checked as they are written, instead of being read in advance
+            rows = iter(output_listdict_or_string)
+            first_row = next(rows, {})
+            rows = itertools.chain([first_row], rows)
+
         if colnames:
             COLUMN_NAMES = colnames
         else:
-            COLUMN_NAMES = output_listdict_or_string[0].keys()
+            COLUMN_NAMES = first_row.keys()
 
-        if not all(
-            set(i.keys()) == set(COLUMN_NAMES) for i in output_listdict_or_string
-        ):
-            error_handler("All rows must have the same column names")
+        if isinstance(output_listdict_or_string, list):
+            if not all(set(i.keys()) == set(COLUMN_NAMES) for i in rows):
+                error_handler("All rows must have the same column names")
+        else:
+            rows = _check_column_names(rows, COLUMN_NAMES, error_handler)
 
         WRITE_MODE = "wb" if IS_PYTHON_2 or IS_OS_WINDOWS else "w"
         NEWLINE = "" if IS_PYTHON_3 else None
@@ -150,21 +200,28 @@ def write_expression_output(
         }
 
         if WRITE_METHOD == "FILE":
-            with open(output_file_name, **write_args) as f:
+            with open_output_file(output_file_name, **write_args) as f:
                 w = csv.DictWriter(f, **dictwriter_params)
                 w.writeheader()
-                w.writerows(output_listdict_or_string)
+                w.writerows(rows)
 
         elif WRITE_METHOD == "STDOUT":
             w = csv.DictWriter(sys.stdout, **dictwriter_params)
             w.writeheader()
-            w.writerows(output_listdict_or_string)
+            w.writerows(rows)
 
         else:
             error_handler("Unexpected error occurred while writing output")
 
 
 
+def _check_column_names(rows, column_names, error_handler):
+    for row in rows:
+        if set(row.keys()) != set(column_names):
+            error_handler("All rows must have the same column names")
+        yield row
+
+
 def pretty_print_json(json_dict: dict) -> str:
     """Pretty-prints the provided JSON object.
 
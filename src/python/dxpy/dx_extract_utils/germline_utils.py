@@ -1,4 +1,7 @@
 from __future__ import annotations
+import collections
+import heapq
+import itertools
 import json
 import os
 import re
@@ -66,16 +69,51 @@ def add_germline_base_sql(resp, payload):
         payload["filters"] = resp["filters"]
 
 
-def sort_germline_variant(d):
+def _germline_variant_key(d):
     if "allele_id" in d and d["allele_id"]:
         chrom, pos, _, alt = d["allele_id"].split("_")
     elif "locus_id" in d and d["locus_id"]:
         chrom, pos = d["locus_id"].split("_")[:2]
         alt = ""
-    sample_id = d.get("sample_id", "")
     if chrom.isdigit():
-        return int(chrom), "", int(pos), alt, sample_id
-    return float("inf"), chrom, int(pos), alt, sample_id
+        return int(chrom), "", int(pos), alt
+    return float("inf"), chrom, int(pos), alt
+
+
+def sort_germline_variant(d):
+    return _germline_variant_key(d) + (d.get("sample_id", ""),)
+
+
+def make_germline_variant_sort_key():
+    """
+    Returns a function computing the same key as sort_germline_variant, which parses each allele_id or locus_id only
+    once: the (chromosome rank, chromosome, position, alt) part of the key is cached, and shared by all the entries of
+    the same variant.
+    """
+    variant_keys = {}
+
+    def germline_variant_sort_key(d):
+        allele_id = d.get("allele_id")
+        variant_id = (allele_id, None) if allele_id else (None, d.get("locus_id"))
+        variant_key = variant_keys.get(variant_id)
+        if variant_key is None:
+            variant_key = variant_keys[variant_id] = _germline_variant_key(d)
+        return variant_key + (d.get("sample_id", ""),)
+
+    return germline_variant_sort_key
+
+
+def merge_germline_results(partitions, sorted_partitions=()):
+    """
+    Returns an iterator over the entries of all the partitions (lists of results), in the order of
+    sort_germline_variant. Each partition is sorted in place, and the partitions are then merged lazily, so no list of
+    all the entries is built. sorted_partitions are iterables already in that order, merged after the partitions.
+    Entries with the same key keep the order of the partitions, and their order within each partition.
+    """
+    sort_key = make_germline_variant_sort_key()
+    for partition in partitions:
+        partition.sort(key=sort_key)
+    return heapq.merge(*partitions, *sorted_partitions, key=sort_key)
 
 
 def _parse_sql_select_named_expression(sql):
@@ -305,6 +343,71 @@ def infer_genotype_type(
     return result_entries + inferred_entries
 
 
+def iter_inferred_genotype_entries(samples: list, loci: list[dict], result_entries, type_to_infer: str):
+    """
+    Returns a generator of the entries inferred by infer_genotype_type, in the order of sort_germline_variant (the
+    order of infer_genotype_type followed by a stable sort), which builds the entries one at a time. result_entries
+    are read before this function returns. A sample listed more than once in samples gets as many copies of each of
+    its entries, next to each other: among entries with the same key, the loci keep their order in loci, as they do
+    in infer_genotype_type.
+    Args:
+        samples: list of all samples
+        loci: list of information on each loci within the filter (see infer_genotype_type)
+        result_entries: iterable of results from extract_assay query
+        type_to_infer: type to infer either  "ref" or "no-call"
+    Returns: generator of inferred entries
+
+    The samples present at each locus are recorded in a bitmap of the (sorted, distinct) samples, which is only
+    allocated for the loci that have results.
+    """
+    # a locus listed more than once keeps its first position, and its last values
+    loci_by_id = {}
+    for locus in loci:
+        loci_by_id[locus["locus_id"]] = locus
+    locus_ids = list(loci_by_id)
+    locus_indexes = {locus_id: i for i, locus_id in enumerate(locus_ids)}
+
+    sample_counts = collections.Counter(samples)
+    sorted_samples = sorted(sample_counts)
+    sample_indexes = {sample: i for i, sample in enumerate(sorted_samples)}
+    bitmap_size = (len(sorted_samples) + 7) // 8
+
+    presence = {}
+    for entry in result_entries:
+        locus_index = locus_indexes[entry["locus_id"]]
+        sample_index = sample_indexes.get(entry["sample_id"])
+        if sample_index is None:
+            continue
+        bitmap = presence.get(locus_index)
+        if bitmap is None:
+            bitmap = presence[locus_index] = bytearray(bitmap_size)
+        bitmap[sample_index >> 3] |= 1 << (sample_index & 7)
+
+    locus_keys = [_germline_variant_key({"locus_id": locus_id}) for locus_id in locus_ids]
+    sorted_locus_indexes = sorted(range(len(locus_ids)), key=locus_keys.__getitem__)
+
+    def generate_entries():
+        for _, group in itertools.groupby(sorted_locus_indexes, key=locus_keys.__getitem__):
+            group = [(presence.get(locus_index), loci_by_id[locus_ids[locus_index]]) for locus_index in group]
+            for sample_index, sample in enumerate(sorted_samples):
+                for bitmap, locus in group:
+                    if bitmap is not None and bitmap[sample_index >> 3] & (1 << (sample_index & 7)):
+                        continue
+                    for _ in range(sample_counts[sample]):
+                        yield {
+                            "sample_id": sample,
+                            "allele_id": None,
+                            "locus_id": locus["locus_id"],
+                            "chromosome": locus["chromosome"],
+                            "starting_position": locus["starting_position"],
+                            "ref": locus["ref"],
+                            "alt": None,
+                            "genotype_type": type_to_infer,
+                        }
+
+    return generate_entries()
+
+
 def filter_results(
     results: list[dict], key: str, restricted_values: list
 ) -> list[dict]:
@@ -32,14 +32,11 @@ wrap_stdio_in_codecs()
 decode_command_line_args()
 
 import dxpy
-from dxpy.scripts import dx_build_app
-from dxpy import workflow_builder
 from dxpy.exceptions import PermissionDenied, InvalidState, ResourceNotFound
 
 from ..cli import try_call, prompt_for_yn, INTERACTIVE_CLI
 from ..cli import workflow as workflow_cli
 from ..cli.cp import cp
-from ..cli.dataset_utilities import extract_dataset, extract_assay_germline, extract_assay_somatic, create_cohort, extract_assay_expression
 from ..cli.download import (download_one_file, download_one_database_file, download)
 from ..cli.parsers import (no_color_arg, delim_arg, env_args, stdout_args, all_arg, json_arg, try_arg, parser_dataobject_args,
                            parser_single_dataobject_output_args, process_properties_args,
@@ -2019,6 +2016,9 @@ def cat(args):
             mode = "r"
         try:
             dxfile = dxpy.DXFile(entity_result['id'], mode=mode)
+            # With the file cache enabled, the file is downloaded into the
+            # cache, and read from there
+            dxpy.cache_dxfile(dxfile, project=project or dxpy.DXFile.NO_PROJECT_HINT)
             while True:
                 # If we decided the project specification was not explicit, do
                 # not allow the workspace setting to bleed through
@@ -2149,7 +2149,8 @@ def upload_one(args):
                                             folder=folder,
                                             parents=args.parents,
                                             show_progress=args.show_progress,
-                                            multithread=args.multithread)
+                                            multithread=args.multithread,
+                                            resume=args.resume)
             if args.wait:
                 dxfile._wait_on_close()
             if args.brief:
@@ -2681,12 +2682,24 @@ def wait(args):
             raise DXCLIError(
                 'Could not open {}. The problem was: {}' % (args.path[0], e))
 
+    # Check the states of all the data objects given by ID together, with as
+    # few API calls as possible; closed objects need no further waiting
+    state_futures = {path: dxpy.describe_async(path, fields={'state'})
+                     for path in args.path if is_data_obj_id(path)}
+
+    def is_closed(path):
+        future = state_futures.get(path)
+        return future is not None and future.exception() is None and future.result().get('state') == 'closed'
+
     for path in args.path:
         if is_job_id(path) or is_analysis_id(path):
             dxexecution = dxpy.get_handler(path)
             print("Waiting for " + path + " to finish running...")
             try_call(dxexecution.wait_on_done)
             print("Done")
+        elif is_closed(path):
+            print("Waiting for " + path + " to close...")
+            print("Done")
         else:
             # Attempt to resolve name
             try:
@@ -2707,6 +2720,10 @@ def wait(args):
         err_exit('', 3)
 
 def build(args):
+    # Imported here rather than at the top, so that other commands do not pay for them
+    from dxpy.scripts import dx_build_app
+    from dxpy import workflow_builder
+
     sys.argv = ['dx build'] + sys.argv[2:]
 
     def get_source_exec_desc(source_exec_path):
@@ -4541,6 +4558,17 @@ class DXArgumentParser(argparse.ArgumentParser):
                                                              msg=message))
 
 
+def _dataset_command(name):
+    '''
+    Returns the command *name* of dxpy.cli.dataset_utilities, which is
+    only imported (with its dependencies) when the command is run.
+    '''
+    def command(args):
+        from ..cli import dataset_utilities
+        return getattr(dataset_utilities, name)(args)
+    command.__name__ = name
+    return command
+
 def register_parser(parser, subparsers_action=None, categories=('other', ), add_help=True):
     """Attaches `parser` to the global ``parser_map``. If `add_help` is truthy,
     then adds the helpstring of `parser` into the output of ``dx help...``, for
@@ -4900,6 +4928,11 @@ parser_upload.add_argument('--no-progress', help='Do not show a progress bar', d
                            action='store_false', default=sys.stderr.isatty())
 parser_upload.add_argument('--buffer-size', help='Set the write buffer size (in bytes)', dest='write_buffer_size')
 parser_upload.add_argument('--singlethread', help='Enable singlethreaded uploading', dest='singlethread', action='store_true')
+parser_upload.add_argument('--resume', help=fill('Keep a checkpoint of the uploaded parts next to each local file (as '
+                                                  '<filename>.dxupload), and continue an interrupted upload from its '
+                                                  'checkpoint, sending only the parts that are not complete yet',
+                                                  width_adjustment=-24),
+                           action='store_true')
 parser_upload.set_defaults(func=upload, mute=False)
 register_parser(parser_upload, categories='data')
 
@@ -4925,6 +4958,11 @@ parser_download.add_argument('--lightweight', help='Skip some validation steps t
 parser_download.add_argument('--symlink-max-tries', help='Set maximum number of tries for downloading symlinked files using aria2c',
                              type=positive_integer,
                              default=15)
+parser_download.add_argument('--parallel-files', help=fill('Number of files to download at the same time (default: 1). '
+                                                      'All files share the same bounded pool of HTTP requests, and '
+                                                      'the largest files are started first',
+                                                      width_adjustment=-24),
+                             type=positive_integer, default=1)
 parser_download.add_argument('--unicode', help='Display the characters as text/unicode when writing to stdout',
                              dest="unicode_text", action='store_true')
 parser_download.set_defaults(func=download_or_cat)
@@ -6488,7 +6526,8 @@ parser_extract_dataset.add_argument('-o', '--output', help='Local filename or di
 parser_extract_dataset.add_argument( "--list-fields", action="store_true", default=False, help='List the names and titles of all fields available in the dataset specified. When not specified together with "–-entities", it will return all the fields from the main entity. Output will be a two column table, field names and field titles, separated by a tab, where field names will be of the format, "<entity name>.<field name>" and field titles will be of the format, "<field title>".')
 parser_extract_dataset.add_argument( "--list-entities", action="store_true", default=False, help='List the names and titles of all the entities available in the dataset specified. Output will be a two column table, entity names and entity titles, separated by a tab.')
 parser_extract_dataset.add_argument("--entities", help='Similar output to "--list-fields", however using "--entities" will allow for specific entities to be specified. When multiple entities are specified, use comma as the delimiter. For example: "--list-fields --entities entityA,entityB,entityC"')
-parser_extract_dataset.set_defaults(func=extract_dataset)
+parser_extract_dataset.add_argument('--page-size', type=positive_integer, help='Retrieve the data this many rows at a time, writing each page before requesting the next one, instead of in a single request. Keeps memory use bounded and each request short for large extractions.')
+parser_extract_dataset.set_defaults(func=_dataset_command('extract_dataset'))
 register_parser(parser_extract_dataset)
 
 #####################################
@@ -6588,7 +6627,13 @@ parser_extract_assay_germline.add_argument(
     default=None,
     help = 'A local filename or directory to be used, where "-" indicates printing to STDOUT. If -o/--output is not supplied, default behavior is to create a file with a constructed name in the current folder.'
 )
-parser_extract_assay_germline.set_defaults(func=extract_assay_germline)
+parser_extract_assay_germline.add_argument(
+    "--page-size",
+    type=positive_integer,
+    help='Retrieve the data this many rows at a time, instead of in a single request. The rows are still sorted before they are written.',
+)
+
+parser_extract_assay_germline.set_defaults(func=_dataset_command('extract_assay_germline'))
 register_parser(parser_extract_assay_germline)
 
 #####################################
@@ -6671,7 +6716,13 @@ parser_extract_assay_somatic.add_argument(
     help='A local filename or directory to be used, where "-" indicates printing to STDOUT. If -o/--output is not supplied, default behavior is to create a file with a constructed name in the current folder.'
 )
 
-parser_extract_assay_somatic.set_defaults(func=extract_assay_somatic)
+parser_extract_assay_somatic.add_argument(
+    "--page-size",
+    type=positive_integer,
+    help='Retrieve the data this many rows at a time, instead of in a single request. Each page is written before the next one is requested, which keeps memory use bounded for large extractions.',
+)
+
+parser_extract_assay_somatic.set_defaults(func=_dataset_command('extract_assay_somatic'))
 register_parser(parser_extract_assay_somatic)
 
 #####################################
@@ -6768,7 +6819,13 @@ parser_extract_assay_expression.add_argument(
     help='A local filename to be used, where "-" indicates printing to STDOUT. If -o/--output is not supplied, default behavior is to create a file with a constructed name in the current folder.',
 )
 
-parser_extract_assay_expression.set_defaults(func=extract_assay_expression)
+parser_extract_assay_expression.add_argument(
+    "--page-size",
+    type=positive_integer,
+    help='Retrieve the data this many rows at a time, instead of in a single request. Each page is written before the next one is requested, which keeps memory use bounded for large extractions. Not supported with "--expression-matrix"/"-em" or "--sql".',
+)
+
+parser_extract_assay_expression.set_defaults(func=_dataset_command('extract_assay_expression'))
 register_parser(parser_extract_assay_expression)
 
 #####################################
@@ -6787,7 +6844,7 @@ parser_create_c_mutex_group.add_argument('--cohort-ids', type=str, help='A set o
 parser_create_c_mutex_group.add_argument('--cohort-ids-file', type=str, help='A set of IDs used to subset the Dataset or Cohort object in a file with one ID per line and no header. IDs must match identically in the supplied Dataset. If a Cohort is supplied instead of a Dataset, the intersection of supplied and existing cohort IDs will be used to create the new cohort.')
 parser_create_cohort.add_argument('-h','--help', help='Return the docstring and exit', action='help')
 
-parser_create_cohort.set_defaults(func=create_cohort)
+parser_create_cohort.set_defaults(func=_dataset_command('create_cohort'))
 register_parser(parser_create_cohort)
 
 
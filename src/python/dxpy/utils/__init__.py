@@ -22,7 +22,6 @@ from __future__ import print_function, unicode_literals, division, absolute_impo
 
 import os, json, collections, concurrent.futures, traceback, sys, time, gc, platform
 from multiprocessing import cpu_count
-import dateutil.parser
 from .. import logger
 from ..compat import basestring, THREAD_TIMEOUT_MAX, Mapping
 from ..exceptions import DXError
@@ -95,8 +94,11 @@ def response_iterator(request_iterator, thread_pool, max_active_tasks=None, do_f
     :param max_active_tasks:
         The maximum number of tasks that may be either running or
         waiting for consumption of their result. If not given, defaults
-        to the number of CPU cores on the machine.
-    :type max_active_tasks: int
+        to the number of CPU cores on the machine. May also be an object
+        with a *window* attribute (such as
+        :class:`dxpy.utils.adaptive_concurrency.AdaptiveConcurrency`),
+        which is read again every time a result is consumed.
+    :type max_active_tasks: int or object
     :param do_first_task_sequentially:
         If True, executes (and returns the result of) the first request
         before submitting any other requests (the subsequent requests
@@ -114,6 +116,9 @@ def response_iterator(request_iterator, thread_pool, max_active_tasks=None, do_f
     if max_active_tasks is None:
         max_active_tasks = cpu_count()
 
+    def active_tasks_limit():
+        return getattr(max_active_tasks, "window", max_active_tasks)
+
     # The following two functions facilitate GC by not adding extra variables to the enclosing scope.
     def submit_task(task_iterator, executor, futures_queue):
         retval  = next(task_iterator, None)
@@ -137,14 +142,16 @@ def response_iterator(request_iterator, thread_pool, max_active_tasks=None, do_f
         task_callable, task_args, task_kwargs = next(request_iterator)
         yield task_callable(*task_args, **task_kwargs)
 
-    for _i in range(max_active_tasks):
+    while len(tasks_in_progress) < active_tasks_limit():
         retval = submit_task(request_iterator, thread_pool, tasks_in_progress)
         if not retval:
             break
 
     while len(tasks_in_progress) > 0:
         result = next_result(tasks_in_progress)
-        submit_task(request_iterator, thread_pool, tasks_in_progress)
+        while len(tasks_in_progress) < active_tasks_limit():
+            if not submit_task(request_iterator, thread_pool, tasks_in_progress):
+                break
         yield result
         del result
 
@@ -179,6 +186,7 @@ def normalize_time_input(t, future=False, default_unit='ms'):
             t = normalize_timedelta(t)
         except ValueError:
             try:
+                import dateutil.parser
                 t = int(time.mktime(dateutil.parser.parse(t).timetuple())*1000)
                 assert t > 0
             except (ValueError, OverflowError, AssertionError):
@@ -0,0 +1,123 @@
+# Copyright (C) 2013-2016 DNAnexus, Inc.
+#
+# This file is part of dx-toolkit (DNAnexus platform client libraries).
+#
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may not
+#   use this file except in compliance with the License. You may obtain a copy
+#   of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""
+Adaptive limit on the number of concurrent HTTP requests.
+"""
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import threading
+import time
+
+from .. import logger
+
+
+class AdaptiveConcurrency(object):
+    """
+    Additive-increase/multiplicative-decrease (AIMD) limit on the number
+    of requests in flight.
+
+    Time is divided into rounds, each lasting until *window* requests
+    have completed. At the end of a round, the throughput of the round
+    (bytes transferred per second) is compared to the best seen so far:
+    if it improved by more than *gain*, the window is increased by one,
+    and if it dropped by more than *loss*, the window is decreased by one.
+    When a request fails, or had to be retried (which happens on
+    throttling and server error responses, and network errors), the
+    window is halved. Requests that started before the window was last
+    halved do not halve it again. Only the requests counted against the
+    limit affect it, not the retries of other requests of the process.
+
+    The current limit and the throughput of the last round are available
+    in the *window* and *throughput* (bytes/s) attributes.
+
+    Example::
+
+        ticket = concurrency.acquire()
+        num_bytes, num_retries = do_request()
+        concurrency.release(ticket, num_bytes, retried=num_retries > 0)
+
+    """
+    def __init__(self, initial_window, max_window, min_window=1, gain=0.05, loss=0.25):
+        self.min_window, self.max_window = min_window, max_window
+        self.window = max(min_window, min(initial_window, max_window))
+        self.throughput = None
+        self.gain, self.loss = gain, loss
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._num_started = 0
+        self._recovery_ticket = 0
+        self._best_throughput = 0
+        self._start_round(None)
+
+    def _start_round(self, now):
+        self._round_start = now if self.in_flight > 0 else None
+        self._round_bytes, self._round_requests = 0, 0
+
+    def _set_window(self, window, reason):
+        window = max(self.min_window, min(window, self.max_window))
+        if window != self.window:
+            logger.debug("HTTP concurrency window %d -> %d (%s, throughput %s bytes/s)",
+                         self.window, window, reason,
+                         "unknown" if self.throughput is None else "%.0f" % self.throughput)
+            self.window = window
+
+    def acquire(self):
+        """
+        Waits until fewer than *window* requests are in flight, and
+        returns a ticket to be passed to :meth:`release`.
+        """
+        with self._cond:
+            while self.in_flight >= self.window:
+                self._cond.wait()
+            self.in_flight += 1
+            self._num_started += 1
+            if self._round_start is None:
+                self._round_start = time.time()
+            return self._num_started
+
+    def release(self, ticket, num_bytes=0, failed=False, retried=False):
+        """
+        :param ticket: value returned by :meth:`acquire`
+        :param num_bytes: number of bytes transferred by the request
+        :param failed: whether the request failed
+        :param retried: whether the request succeeded only after being retried
+
+        Records the completion of a request and adjusts the window.
+        """
+        with self._cond:
+            now = time.time()
+            self.in_flight -= 1
+            if failed or retried:
+                if ticket > self._recovery_ticket:
+                    self._set_window(self.window // 2, "requests retried")
+                    self._recovery_ticket = self._num_started
+                    self._best_throughput = 0
+                    self._start_round(now)
+            else:
+                self._round_bytes += num_bytes
+                self._round_requests += 1
+                if self._round_requests >= self.window:
+                    self.throughput = self._round_bytes / max(now - self._round_start, 1e-6)
+                    if self.throughput > self._best_throughput * (1 + self.gain):
+                        self._set_window(self.window + 1, "throughput increased")
+                        self._best_throughput = self.throughput
+                    elif self.throughput < self._best_throughput * (1 - self.loss):
+                        self._set_window(self.window - 1, "throughput decreased")
+                        self._best_throughput = self.throughput
+                    self._start_round(now)
+            self._cond.notify_all()
@@ -50,6 +50,23 @@ def _open_for_writing_with_permissions(filename, perms=0o600):
     _remove_ignore_errors(filename)
     return os.fdopen(os.open(filename, os.O_CREAT | os.O_WRONLY, perms), "w")
 
+class _ProcProcess(object):
+    """Reads the parent of a process from /proc, providing the part of
+    the interface of psutil.Process used to find the session
+    configuration directory, without the cost of importing psutil.
+    """
+    def __init__(self, pid):
+        self.pid = pid
+
+    def parent(self):
+        with open("/proc/{}/stat".format(self.pid)) as fd:
+            # The command name, in parentheses, may contain spaces
+            ppid = int(fd.read().rsplit(")", 1)[1].split()[1])
+        return _ProcProcess(ppid) if ppid != 0 and _proc_pid_exists(ppid) else None
+
+def _proc_pid_exists(pid):
+    return os.path.exists("/proc/{}".format(pid))
+
 class DXConfig(MutableMapping):
     """This class provides the dxpy configuration manager, available as
     ``dxpy.config``. When first accessed, the config manager looks up
@@ -179,7 +196,10 @@ class DXConfig(MutableMapping):
         """
         sessions_dir = os.path.join(self._user_conf_dir, "sessions")
         try:
-            from psutil import Process, pid_exists
+            if os.path.exists("/proc/self/stat"):
+                Process, pid_exists = _ProcProcess, _proc_pid_exists
+            else:
+                from psutil import Process, pid_exists
 
             if cleanup:
                 try:
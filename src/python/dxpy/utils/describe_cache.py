@@ -0,0 +1,171 @@
+# Copyright (C) 2013-2016 DNAnexus, Inc.
+#
+# This file is part of dx-toolkit (DNAnexus platform client libraries).
+#
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may not
+#   use this file except in compliance with the License. You may obtain a copy
+#   of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""
+In-process cache of describe outputs of closed data objects.
+
+The cache is disabled by default. It is enabled by calling
+:func:`enable_describe_cache`, or by setting the environment variable
+``DX_DESCRIBE_CACHE_SIZE`` to the maximum number of entries to keep
+(``DX_DESCRIBE_CACHE_TTL`` optionally sets their lifetime in seconds).
+"""
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import collections
+import copy
+import json
+import os
+import threading
+import time
+
+
+class DescribeCache(object):
+    """
+    Size-bounded cache of describe outputs with least-recently-used
+    eviction, in which entries expire *ttl* seconds after they were
+    stored.
+
+    Entries are keyed by object ID, project and describe input. Only
+    outputs of objects in the "closed" state are stored, since the
+    contents of those objects can no longer change; their project
+    metadata (name, folder, tags, properties, visibility) can, so the
+    data object bindings that modify it call :meth:`invalidate`. Changes
+    made by other processes, or through :mod:`dxpy.api` directly, become
+    visible after at most *ttl* seconds.
+
+    The number of lookups answered from the cache and sent to the API
+    server are available in the *hits* and *misses* attributes.
+    """
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits, self.misses = 0, 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(dxid, project, describe_input):
+        return (dxid, project, json.dumps(describe_input, sort_keys=True))
+
+    def get(self, dxid, project, describe_input):
+        '''
+        :returns: A copy of the cached describe output, or :const:`None` if there is none
+        :rtype: dict
+        '''
+        key = self._key(dxid, project, describe_input)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, dxid, project, describe_input, desc):
+        '''
+        Stores *desc* if it describes a closed object.
+        '''
+        if desc.get('state') != 'closed':
+            return
+        key = self._key(dxid, project, describe_input)
+        desc = copy.deepcopy(desc)
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, desc)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, dxid):
+        '''
+        Discards all the cached describe outputs of the object *dxid*.
+        '''
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == dxid]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_describe_cache = None
+
+
+def enable_describe_cache(max_entries=1024, ttl=300):
+    '''
+    :param max_entries: Maximum number of describe outputs to keep
+    :type max_entries: int
+    :param ttl: Number of seconds after which a cached describe output expires
+    :type ttl: float
+    :returns: The cache
+    :rtype: :class:`DescribeCache`
+
+    Caches the describe outputs of closed data objects returned by
+    :meth:`dxpy.bindings.DXDataObject.describe`, replacing any existing
+    cache.
+    '''
+    global _describe_cache
+    _describe_cache = DescribeCache(max_entries=max_entries, ttl=ttl)
+    return _describe_cache
+
+
+def disable_describe_cache():
+    '''
+    Stops caching describe outputs and discards the cache.
+    '''
+    global _describe_cache
+    _describe_cache = None
+
+
+def get_describe_cache():
+    '''
+    :returns: The describe cache, or :const:`None` if caching is disabled
+    :rtype: :class:`DescribeCache`
+    '''
+    return _describe_cache
+
+
+def get_describe_cache_stats():
+    '''
+    :returns: Number of cache hits and misses, and number of entries, or :const:`None` if caching is disabled
+    :rtype: dict
+    '''
+    cache = _describe_cache
+    if cache is None:
+        return None
+    return {'hits': cache.hits, 'misses': cache.misses, 'entries': len(cache)}
+
+
+def invalidate_describe_cache(dxid):
+    '''
+    Discards the cached describe outputs of the object *dxid*, if any.
+    '''
+    cache = _describe_cache
+    if cache is not None:
+        cache.invalidate(dxid)
+
+
+if int(os.environ.get('DX_DESCRIBE_CACHE_SIZE', 0)) > 0:
+    enable_describe_cache(max_entries=int(os.environ['DX_DESCRIBE_CACHE_SIZE']),
+                          ttl=float(os.environ.get('DX_DESCRIBE_CACHE_TTL', 300)))
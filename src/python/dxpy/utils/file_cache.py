@@ -0,0 +1,240 @@
+# Copyright (C) 2013-2016 DNAnexus, Inc.
+#
+# This file is part of dx-toolkit (DNAnexus platform client libraries).
+#
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may not
+#   use this file except in compliance with the License. You may obtain a copy
+#   of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""
+On-disk cache of the contents of remote files, shared by the processes
+of a machine.
+
+The cache is disabled by default. It is enabled by calling
+:func:`enable_file_cache`, or by setting the environment variable
+``DX_FILE_CACHE_DIR`` to the cache directory (``DX_FILE_CACHE_MAX_BYTES``
+optionally sets its size limit, in bytes). It is not available on
+platforms without :mod:`fcntl` (Windows).
+"""
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import contextlib
+import errno
+import hashlib
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from ..exceptions import DXError
+
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024 * 1024
+
+_LOCK_SUFFIX = '.lock'
+_TMP_SUFFIX = '.tmp'
+
+
+class DXFileDiskCache(object):
+    """
+    Directory of complete copies of remote files, keyed by file ID and
+    the MD5 checksums of the parts of the file, so that a copy is never
+    used for different contents.
+
+    Processes coordinate with file locks: a file is downloaded into the
+    cache by one process while the others wait for it. Copies are
+    evicted, least recently used first, to keep the total size of the
+    cache below *max_bytes*; copies that are open or memory-mapped stay
+    readable until they are closed.
+    """
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        if fcntl is None:
+            raise DXError('The file cache is not supported on this platform')
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def key(desc):
+        '''
+        :param desc: Describe output of the file, including the "parts" field
+        :type desc: dict
+        :returns: Name of the cached copy of the file, or :const:`None` if the file cannot be cached (for example, a symbolic link or a file without part checksums)
+        :rtype: string
+        '''
+        parts = desc.get('parts')
+        if not parts or any('md5' not in part for part in parts.values()):
+            return None
+        checksums = [[part_id, parts[part_id]['md5'], parts[part_id]['size']] for part_id in sorted(parts, key=int)]
+        return desc['id'] + '-' + hashlib.sha256(json.dumps(checksums).encode()).hexdigest()[:32]
+
+    @contextlib.contextmanager
+    def _lock(self, name, blocking=True):
+        # Yields whether the lock was taken (always, if blocking). Lock files
+        # are removed along with their entries, so a lock taken on a file that
+        # was removed while waiting for it is taken again on a new file.
+        path = os.path.join(self.directory, name + _LOCK_SUFFIX)
+        while True:
+            lock_file = open(path, 'a')
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except (IOError, OSError) as e:
+                lock_file.close()
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+                yield False
+                return
+            try:
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino:
+                    break
+            except OSError:
+                pass
+            lock_file.close()
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            lock_file.close()
+
+    def _remove_lock_file(self, name):
+        # Only called with the lock held
+        try:
+            os.remove(os.path.join(self.directory, name + _LOCK_SUFFIX))
+        except OSError:
+            pass
+
+    def lookup(self, desc):
+        '''
+        :param desc: Describe output of the file, including the "parts" field
+        :type desc: dict
+        :returns: Path of the cached copy of the file, or :const:`None` if it is not in the cache
+        :rtype: string
+        '''
+        key = self.key(desc)
+        if key is None:
+            return None
+        path = os.path.join(self.directory, key)
+        try:
+            # The modification time records the last use, for eviction
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def fetch(self, desc, download):
+        '''
+        :param desc: Describe output of the file, including the "parts" field
+        :type desc: dict
+        :param download: Function that downloads the file to the local path it is given
+        :type download: callable
+        :returns: Path of the cached copy of the file, or :const:`None` if the file cannot be cached
+        :rtype: string
+
+        Returns the cached copy of the file, calling *download* to add it
+        to the cache first if no process has done so.
+        '''
+        key = self.key(desc)
+        if key is None or desc['size'] > self.max_bytes:
+            return None
+        with self._lock(key):
+            path = self.lookup(desc)
+            if path is not None:
+                return path
+            path = os.path.join(self.directory, key)
+            tmp_path = path + _TMP_SUFFIX
+            try:
+                download(tmp_path)
+                if os.path.getsize(tmp_path) != desc['size']:
+                    raise DXError('Downloaded copy of {} has {} bytes; expected {}'.format(
+                        desc['id'], os.path.getsize(tmp_path), desc['size']))
+                self._make_room(desc['size'])
+                os.rename(tmp_path, path)
+            except BaseException:
+                self._remove_lock_file(key)
+                raise
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return path
+
+    def _make_room(self, num_bytes):
+        with self._lock(''):
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(_LOCK_SUFFIX) or name.endswith(_TMP_SUFFIX):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total_bytes = sum(size for _mtime, size, _name in entries)
+            for _mtime, size, name in sorted(entries):
+                if total_bytes + num_bytes <= self.max_bytes:
+                    break
+                # Entries locked by another process (being fetched) are skipped
+                with self._lock(name, blocking=False) as locked:
+                    if not locked:
+                        continue
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        continue
+                    finally:
+                        self._remove_lock_file(name)
+                total_bytes -= size
+
+
+_file_cache = None
+
+
+def enable_file_cache(directory, max_bytes=DEFAULT_MAX_BYTES):
+    '''
+    :param directory: Directory in which cached copies of files are kept
+    :type directory: string
+    :param max_bytes: Maximum total size of the cached copies
+    :type max_bytes: int
+    :returns: The cache
+    :rtype: :class:`DXFileDiskCache`
+
+    Makes :func:`~dxpy.bindings.dxfile_functions.download_dxfile` and
+    ``dx cat`` keep a copy of the files they download in *directory*,
+    and :class:`~dxpy.bindings.dxfile.DXFile` read cached copies (through
+    a memory map) instead of downloading the file again.
+    '''
+    global _file_cache
+    _file_cache = DXFileDiskCache(directory, max_bytes=max_bytes)
+    return _file_cache
+
+
+def disable_file_cache():
+    '''
+    Stops using the file cache. The cached copies are left on disk.
+    '''
+    global _file_cache
+    _file_cache = None
+
+
+def get_file_cache():
+    '''
+    :returns: The file cache, or :const:`None` if it is disabled
+    :rtype: :class:`DXFileDiskCache`
+    '''
+    return _file_cache
+
+
+if os.environ.get('DX_FILE_CACHE_DIR') and fcntl is not None:
+    enable_file_cache(os.environ['DX_FILE_CACHE_DIR'],
+                      max_bytes=int(os.environ.get('DX_FILE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)))
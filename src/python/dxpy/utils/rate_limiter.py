@@ -0,0 +1,254 @@
+# Copyright (C) 2013-2016 DNAnexus, Inc.
+#
+# This file is part of dx-toolkit (DNAnexus platform client libraries).
+#
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may not
+#   use this file except in compliance with the License. You may obtain a copy
+#   of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""
+Process-wide limits on the requests made by :func:`dxpy.DXHTTPRequest`
+and :func:`dxpy.aio.DXHTTPRequest`, shared by all threads and event
+loops, for each class of route: "api" (requests to the API server) and
+"storage" (file data transfers, and any other request to a fully
+qualified URL).
+
+For each class, a token bucket limits the rate of requests, and a retry
+budget limits the number of retries to a fraction of the requests. Both
+are disabled by default; they are configured by calling
+:func:`configure_rate_limits`, or by setting the environment variables
+``DX_API_RATE_LIMIT`` and ``DX_STORAGE_RATE_LIMIT`` (requests per
+second), and ``DX_API_RETRY_BUDGET`` and ``DX_STORAGE_RETRY_BUDGET``
+(retries allowed per request).
+
+Independently of the configuration, when a server answers 503 with a
+Retry-After header, all the requests to the same host wait until the
+server asked to be retried, and then resume at staggered times, rather
+than all at once. Requests to other hosts are not held back.
+"""
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import os
+import random
+import threading
+import time
+
+ROUTE_CLASSES = ('api', 'storage')
+
+# Requests waiting for the end of a pause resume spread over this fraction
+# of the length of the pause
+PAUSE_JITTER = 0.25
+
+
+class TokenBucket(object):
+    """
+    Limits the rate of requests to *rate* per second on average, with
+    bursts of up to *burst* requests (or no limit, if *rate* is
+    :const:`None`).
+    """
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate or 0, 1)
+        self._tokens = self.burst
+        self._last_refill = time.time()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        # Takes a token and returns None, or returns the time until one is available
+        if self.rate is None:
+            return None
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        '''
+        Waits until a request may be made.
+        '''
+        delay = self._take()
+        while delay is not None:
+            time.sleep(delay)
+            delay = self._take()
+
+    async def acquire_async(self):
+        '''
+        Coroutine counterpart of :meth:`acquire`.
+        '''
+        import asyncio
+        delay = self._take()
+        while delay is not None:
+            await asyncio.sleep(delay)
+            delay = self._take()
+
+
+class HostPauses(object):
+    """
+    Pauses the requests to a host, for example while the server is
+    throttling them.
+    """
+    def __init__(self):
+        self._pauses = {}
+        self._lock = threading.Lock()
+
+    def pause(self, host, seconds):
+        '''
+        Makes :meth:`wait` wait, for requests to *host*, until *seconds*
+        from now, and then spread the requests that were waiting over the
+        following ``PAUSE_JITTER * seconds`` seconds.
+        '''
+        with self._lock:
+            until = time.time() + seconds
+            if until > self._pauses.get(host, (0, 0))[0]:
+                self._pauses[host] = (until, seconds)
+
+    def _get_delay(self, host):
+        # Returns None if requests to host may be made, or the time to wait
+        with self._lock:
+            until, length = self._pauses.get(host, (0, 0))
+            delay = until - time.time()
+            if delay <= 0:
+                self._pauses.pop(host, None)
+                return None
+        return delay + random.uniform(0, length * PAUSE_JITTER)
+
+    def wait(self, host):
+        '''
+        Waits until requests to *host* may be made.
+        '''
+        delay = self._get_delay(host)
+        while delay is not None:
+            time.sleep(delay)
+            delay = self._get_delay(host)
+
+    async def wait_async(self, host):
+        '''
+        Coroutine counterpart of :meth:`wait`.
+        '''
+        import asyncio
+        delay = self._get_delay(host)
+        while delay is not None:
+            await asyncio.sleep(delay)
+            delay = self._get_delay(host)
+
+
+class RetryBudget(object):
+    """
+    Allows retries as long as they are at most *ratio* times the number
+    of requests, plus *min_per_second* retries per second (so that
+    processes making few requests can still retry them). Unused
+    allowance accumulates up to *max_balance* retries. A *ratio* of
+    :const:`None` allows any number of retries.
+    """
+    def __init__(self, ratio=None, min_per_second=1, max_balance=100):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = max_balance
+        self._balance = max_balance
+        self._last_refill = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount):
+        now = time.time()
+        self._balance = min(self.max_balance,
+                            self._balance + amount + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+    def deposit(self):
+        '''
+        Records a new request.
+        '''
+        if self.ratio is None:
+            return
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self):
+        '''
+        :returns: Whether a retry is allowed (in which case it is counted against the budget)
+        :rtype: bool
+        '''
+        if self.ratio is None:
+            return True
+        with self._lock:
+            self._refill(0)
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RouteClassLimits(object):
+    """
+    Rate limiter (:class:`TokenBucket`) and :class:`RetryBudget` of a
+    class of routes.
+    """
+    def __init__(self, rate=None, burst=None, retry_budget=None, min_retries_per_second=1):
+        self.bucket = TokenBucket(rate, burst)
+        self.retry_budget = RetryBudget(retry_budget, min_per_second=min_retries_per_second)
+
+
+_limits = {route_class: RouteClassLimits() for route_class in ROUTE_CLASSES}
+_host_pauses = HostPauses()
+
+
+def configure_rate_limits(route_class, rate=None, burst=None, retry_budget=None, min_retries_per_second=1):
+    '''
+    :param route_class: "api" or "storage"
+    :type route_class: string
+    :param rate: Maximum average number of requests per second, or None for no limit
+    :type rate: float
+    :param burst: Maximum number of requests made at once above the average rate (default: *rate*)
+    :type burst: int
+    :param retry_budget: Maximum number of retries per request, or None for no limit (other than the retry limit
+        of each request)
+    :type retry_budget: float
+    :param min_retries_per_second: Number of retries per second allowed beyond the retry budget
+    :type min_retries_per_second: float
+    :returns: The limits
+    :rtype: :class:`RouteClassLimits`
+
+    Replaces the limits of the requests of the given class. When the
+    retry budget is exhausted, requests fail instead of being retried.
+    '''
+    if route_class not in ROUTE_CLASSES:
+        raise ValueError('Expected route_class to be one of {}'.format(', '.join(ROUTE_CLASSES)))
+    _limits[route_class] = RouteClassLimits(rate, burst, retry_budget, min_retries_per_second)
+    return _limits[route_class]
+
+
+def get_rate_limits(route_class):
+    '''
+    :returns: The limits of the requests of the given class
+    :rtype: :class:`RouteClassLimits`
+    '''
+    return _limits[route_class]
+
+
+def get_host_pauses():
+    '''
+    :returns: The pauses of the requests to each host
+    :rtype: :class:`HostPauses`
+    '''
+    return _host_pauses
+
+
+for _route_class in ROUTE_CLASSES:
+    _rate = os.environ.get('DX_{}_RATE_LIMIT'.format(_route_class.upper()))
+    _retry_budget = os.environ.get('DX_{}_RETRY_BUDGET'.format(_route_class.upper()))
+    if _rate or _retry_budget:
+        configure_rate_limits(_route_class, rate=float(_rate) if _rate else None,
+                              retry_budget=float(_retry_budget) if _retry_budget else None)
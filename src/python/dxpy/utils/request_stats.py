@@ -0,0 +1,156 @@
+# Copyright (C) 2013-2016 DNAnexus, Inc.
+#
+# This file is part of dx-toolkit (DNAnexus platform client libraries).
+#
+#   Licensed under the Apache License, Version 2.0 (the "License"); you may not
+#   use this file except in compliance with the License. You may obtain a copy
+#   of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#   WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#   License for the specific language governing permissions and limitations
+#   under the License.
+
+"""
+Per-route statistics of the requests made by :func:`dxpy.DXHTTPRequest`.
+
+The statistics are not collected by default. Collection is enabled by
+calling :func:`enable_request_stats`, or by setting the environment
+variable ``DX_REQUEST_STATS`` to 1, in which case a summary is printed
+to stderr when the process exits.
+"""
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import atexit
+import bisect
+import copy
+import os
+import sys
+import threading
+
+import dxpy
+
+# Upper bounds of the latency histogram buckets, in seconds: 1 ms, 2 ms, ..., 131 s
+LATENCY_BUCKETS = [0.001 * 2 ** i for i in range(18)]
+
+
+class RequestStats(object):
+    """
+    Request listener (see :func:`dxpy.add_request_listener`) that
+    aggregates the requests that have ended by method and route: number
+    of requests, failures and retries, time slept before retries, bytes
+    sent and received, and a histogram of latencies.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def __call__(self, event):
+        if event.type != 'end':
+            return
+        key = '{} {}'.format(event.method, event.route)
+        with self._lock:
+            route = self._routes.get(key)
+            if route is None:
+                route = self._routes[key] = dict(requests=0, errors=0, retries=0, backoff=0.0, latency=0.0,
+                                                 bytes_sent=0, bytes_received=0,
+                                                 histogram=[0] * (len(LATENCY_BUCKETS) + 1))
+            route['requests'] += 1
+            route['errors'] += event.error is not None
+            route['retries'] += event.retries
+            route['backoff'] += event.backoff
+            route['latency'] += event.latency
+            route['bytes_sent'] += event.bytes_sent or 0
+            route['bytes_received'] += event.bytes_received or 0
+            route['histogram'][bisect.bisect_left(LATENCY_BUCKETS, event.latency)] += 1
+
+    def get(self):
+        '''
+        :returns: statistics by "METHOD route", e.g. "POST /file-xxxx/describe". The latency (total, in seconds) is
+            that of all the requests; "histogram" counts the requests in each bucket of :data:`LATENCY_BUCKETS`
+            (and, last, those slower than the largest bucket)
+        :rtype: dict of dicts
+        '''
+        with self._lock:
+            return copy.deepcopy(self._routes)
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def format(self, bar_width=40):
+        '''
+        :returns: summary of the statistics, with the routes that took the most time first
+        :rtype: string
+        '''
+        routes = sorted(self.get().items(), key=lambda item: item[1]['latency'], reverse=True)
+        lines = ['Requests by route, slowest in total first:']
+        for key, route in routes:
+            lines.append('{key}: {requests} requests, {errors} failed, {retries} retries ({backoff:.1f} s slept), '
+                         '{latency:.3f} s total, {bytes_sent:,} bytes sent, {bytes_received:,} bytes received'
+                         .format(key=key, **route))
+            histogram = route['histogram']
+            first = next(i for i, count in enumerate(histogram) if count)
+            last = max(i for i, count in enumerate(histogram) if count)
+            for i in range(first, last + 1):
+                label = ('<= {:g} ms'.format(LATENCY_BUCKETS[i] * 1000) if i < len(LATENCY_BUCKETS)
+                         else '>  {:g} ms'.format(LATENCY_BUCKETS[-1] * 1000))
+                bar = '#' * int(round(bar_width * histogram[i] / max(histogram)))
+                lines.append('    {:>14} |{:<{width}}| {}'.format(label, bar, histogram[i], width=bar_width))
+        return '\n'.join(lines)
+
+
+_request_stats = None
+_print_at_exit_registered = False
+
+
+def _print_request_stats():
+    if _request_stats is not None:
+        print(_request_stats.format(), file=sys.stderr)
+
+
+def enable_request_stats(print_at_exit=False):
+    '''
+    :param print_at_exit: If True, prints the summary of the statistics to stderr when the process exits
+    :type print_at_exit: bool
+    :returns: The statistics
+    :rtype: :class:`RequestStats`
+
+    Starts collecting the statistics of the requests made by
+    :func:`dxpy.DXHTTPRequest`, replacing any statistics collected so
+    far.
+    '''
+    global _request_stats, _print_at_exit_registered
+    disable_request_stats()
+    _request_stats = RequestStats()
+    dxpy.add_request_listener(_request_stats)
+    if print_at_exit and not _print_at_exit_registered:
+        atexit.register(_print_request_stats)
+        _print_at_exit_registered = True
+    return _request_stats
+
+
+def disable_request_stats():
+    '''
+    Stops collecting request statistics and discards them.
+    '''
+    global _request_stats
+    if _request_stats is not None:
+        dxpy.remove_request_listener(_request_stats)
+    _request_stats = None
+
+
+def get_request_stats():
+    '''
+    :returns: The request statistics, or :const:`None` if they are not being collected
+    :rtype: :class:`RequestStats`
+    '''
+    return _request_stats
+
+
+if os.environ.get('DX_REQUEST_STATS', '0') not in ('', '0'):
+    enable_request_stats(print_at_exit=True)
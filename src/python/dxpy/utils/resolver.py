@@ -599,8 +599,9 @@ def resolve_job_ref(job_id, name, describe={}):
                     raise ResolutionError('Found "' + name + '" as an output field name of ' + job_id + ', but it is an array of non-data objects')
                 ids = [link['$dnanexus_link'] for link in output_field]
                 try:
-                    results = [{"id": out_id,
-                                "describe": dxpy.DXHTTPRequest('/' + out_id + '/describe', describe)} for out_id in ids]
+                    # Queued together, so that they are described by as few API calls as possible
+                    futures = [dxpy.describe_async(out_id, **describe) for out_id in ids]
+                    results = [{"id": out_id, "describe": future.result()} for out_id, future in zip(ids, futures)]
                 except Exception as details:
                     raise ResolutionError(str(details))
             else:
@@ -619,8 +620,19 @@ def resolve_job_ref(job_id, name, describe={}):
     return results
 
 
+def _add_project_hint(describe, project):
+    if describe is True:
+        describe = {}
+    if 'project' not in describe:
+        if project != dxpy.WORKSPACE_ID:
+            describe['project'] = project
+        elif dxpy.WORKSPACE_ID is not None:
+            describe['project'] = dxpy.WORKSPACE_ID
+    return describe
+
+
 def _check_resolution_needed(path, project, folderpath, entity_name, expected_classes=None, describe=True,
-                             enclose_in_list=False):
+                             enclose_in_list=False, describe_future=None):
     """
     :param path: Path to the object that required resolution; propagated from
                  command-line
@@ -646,6 +658,10 @@ def _check_resolution_needed(path, project, folderpath, entity_name, expected_cl
                             list of one dictionary); it will only have an
                             effect if entity_name is a DX ID and is described
     :type enclose_in_list: boolean
+    :param describe_future: Future for the describe output of the entity, if
+                            it was already requested; if the future failed,
+                            the entity is described again
+    :type describe_future: :class:`concurrent.futures.Future` or None
     :returns: Whether or not the entity needs to be resolved with a more
               general resolution method, the project, the folderpath, and the
               entity name
@@ -690,17 +706,13 @@ def _check_resolution_needed(path, project, folderpath, entity_name, expected_cl
         if not found_valid_class:
             return False, None, None, None
 
-        if describe is True:
-            describe = {}
-
         # entity is an ID of a valid class, try to describe it
-        if 'project' not in describe:
-            if project != dxpy.WORKSPACE_ID:
-                describe['project'] = project
-            elif dxpy.WORKSPACE_ID is not None:
-                describe['project'] = dxpy.WORKSPACE_ID
+        describe = _add_project_hint(describe, project)
         try:
-            desc = dxpy.DXHTTPRequest('/' + entity_name + '/describe', describe)
+            if describe_future is not None and describe_future.exception() is None:
+                desc = describe_future.result()
+            else:
+                desc = dxpy.DXHTTPRequest('/' + entity_name + '/describe', describe)
             desc = dxpy.append_underlying_workflow_describe(desc)
         except Exception as details:
             if 'project' in describe:
@@ -982,11 +994,17 @@ def resolve_multiple_existing_paths(paths):
     done_objects = {}  # Return value
     to_resolve_in_batch_paths = []  # Paths to resolve
     to_resolve_in_batch_inputs = []  # Project, folderpath, and entity name
-    for path in paths:
-        project, folderpath, entity_name = resolve_path(path, expected='entity')
+    resolved_paths = [(path,) + resolve_path(path, expected='entity') for path in paths]
+    # Queue the describe calls for all data object IDs first, so that they
+    # are made with as few API calls as possible
+    describe_futures = {}
+    for path, project, folderpath, entity_name in resolved_paths:
+        if entity_name is not None and is_data_obj_id(entity_name):
+            describe_futures[path] = dxpy.describe_async(entity_name, **_add_project_hint(True, project))
+    for path, project, folderpath, entity_name in resolved_paths:
         try:
             must_resolve, project, folderpath, entity_name = _check_resolution_needed(
-                path, project, folderpath, entity_name)
+                path, project, folderpath, entity_name, describe_future=describe_futures.get(path))
         except:
             must_resolve = False
 
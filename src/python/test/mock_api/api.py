@@ -1,52 +1,127 @@
 #!/usr/bin/env python3
 # coding: utf-8
+"""
+Mock API server, serving a synthetic payload as the contents of one or
+more files, and accepting file uploads (whose data is discarded). Used
+by run.sh and by the transfer benchmarks in bench.py.
+
+The payload is generated by calling /system/setPayload, optionally with
+the input {"size": <bytes>, "numParts": <parts per file>, "numFiles":
+<files in the project>} (by default, one 512 MiB file in one part).
+"""
 
 from __future__ import print_function, unicode_literals
 
-import os, sys, random, hashlib, argparse, io, struct
-from flask import Flask, request, jsonify
+import os, sys, random, hashlib, argparse, io, struct, time
+from flask import Flask, Response, request, jsonify
 
 parser = argparse.ArgumentParser(description=__doc__)
 parser.add_argument("--host", help="Hostname to serve on", default=os.environ.get("DX_APISERVER_HOST", "localhost"))
 parser.add_argument("--port", help="TCP port to serve on", type=int, default=os.environ.get("DX_APISERVER_PORT", 5000))
+parser.add_argument("--latency", help="Seconds added to the response time of every request", type=float, default=0)
+parser.add_argument("--bandwidth", help="Maximum bytes/s sent in each file data response (0 for no limit)",
+                    type=float, default=0)
+parser.add_argument("--error-rate", help="Fraction of requests answered with 503 Service Unavailable", type=float,
+                    default=0)
+parser.add_argument("--retry-after", help="Value of the Retry-After header of 503 responses", type=int, default=0)
 args = parser.parse_args()
 
 app = Flask(__name__)
+app.payload = b""
 
 #random.seed(1)
 
+PROJECT_ID = "project-0123456789ABCDEF01234567"
+FIRST_FILE_ID = "file-0123456789ABCDEF01234567"
+FILE_UPLOAD_PARAMETERS = {
+    "minimumPartSize": 5 * 1024 * 1024,
+    "maximumPartSize": 5 * 1024 * 1024 * 1024,
+    "maximumNumParts": 10000,
+    "maximumFileSize": 5 * 1024 ** 4,
+    "emptyLastPartAllowed": True
+}
+# Size of the pieces in which file data is sent when the bandwidth is limited
+SEND_PIECE_SIZE = 64 * 1024
+
 file_desc = {
-    "id": "file-0123456789ABCDEF01234567",
+    "id": FIRST_FILE_ID,
     "class": "file",
     "name": "файл",
+    "folder": "/",
     "state": "closed"
 }
+# Describe outputs of the files serving the payload, and of the uploaded files, by ID
+files = {FIRST_FILE_ID: file_desc}
+uploads = {}
+
+
+@app.before_request
+def delay_or_fail():
+    if request.path == "/system/setPayload":
+        return None
+    if args.latency > 0:
+        time.sleep(args.latency)
+    if args.error_rate > 0 and random.random() < args.error_rate:
+        return Response("Service Unavailable (injected)", status=503,
+                        headers={"Retry-After": str(args.retry_after)})
+    return None
+
+
+def make_payload(size):
+    payload = io.BytesIO()
+    # Each MiB repeats one random 64-bit value
+    for i in range(0, size, 1024 * 1024):
+        payload.write(struct.pack(b"Q", random.getrandbits(64)) * (min(1024 * 1024, size - i) // 8))
+    return payload.getvalue()
+
+
+def make_parts(payload, num_parts):
+    part_size = max(-(-len(payload) // num_parts), 1)
+    parts = {}
+    for index, start in enumerate(range(0, len(payload), part_size)):
+        part = payload[start:start + part_size]
+        parts[str(index + 1)] = {"state": "complete", "md5": hashlib.md5(part).hexdigest(), "size": len(part)}
+    return parts
+
 
 @app.route("/system/setPayload", methods=["POST"])
 def set_payload():
-    payload = io.BytesIO()
-    # NB: In Python 3, use random.getrandbits().to_bytes((x.bit_length() // 8) + 1, byteorder='little')
-    for i in range(1024):
-        payload.write(struct.pack(b"L", random.getrandbits(64))*64*1024)
-    app.payload = payload.getvalue()
-    file_desc["parts"] = {
-        "1": {
-            "state": "complete",
-            "md5": hashlib.md5(app.payload).hexdigest(),
-            "size": len(app.payload)
-        }
-    }
-    file_desc["size"] = len(app.payload)
+    options = request.get_json(silent=True) or {}
+    app.payload = make_payload(options.get("size", 512 * 1024 * 1024))
+    parts = make_parts(app.payload, options.get("numParts", 1))
+    files.clear()
+    for i in range(options.get("numFiles", 1)):
+        dxid = FIRST_FILE_ID if i == 0 else "file-%024d" % i
+        files[dxid] = dict(file_desc, id=dxid, name=file_desc["name"] if i == 0 else "file%d" % i,
+                           parts=parts, size=len(app.payload), md5=hashlib.md5(app.payload).hexdigest())
+    file_desc.update(files[FIRST_FILE_ID])
     return jsonify(dict())
 
+
+def describe_file(dxid):
+    desc = uploads.get(dxid) or files.get(dxid, file_desc)
+    return dict(desc, project=PROJECT_ID)
+
+
 @app.route("/system/findDataObjects", methods=["POST"])
 def find_data_objects():
     results=[]
-    results.append(dict(project=request.json["scope"]["project"],
-                        id=file_desc["id"],
-                        describe=dict(file_desc, project=request.json["scope"]["project"])))
+    for dxid in sorted(files):
+        results.append(dict(project=request.json["scope"]["project"],
+                            id=dxid,
+                            describe=dict(describe_file(dxid), project=request.json["scope"]["project"])))
     return jsonify(dict(results=results, next=None))
 
+
+@app.route("/system/describeDataObjects", methods=["POST"])
+def describe_data_objects():
+    results = []
+    for obj in request.json["objects"]:
+        dxid = obj if isinstance(obj, str) else obj["id"]
+        results.append(dict(describe=describe_file(dxid)))
+    return jsonify(dict(results=results))
+
+
 @app.route("/<resource>/listFolder", methods=["POST"])
 def list_folder(resource):
     folders=[]
@@ -56,9 +131,9 @@ def list_folder(resource):
 @app.route("/<resource>/describe", methods=["POST"])
 def describe(resource):
     if resource.startswith("project-") or resource.startswith("container-"):
-        return jsonify(dict(name="¶", folders=["/"]))
+        return jsonify(dict(name="¶", folders=["/"], fileUploadParameters=FILE_UPLOAD_PARAMETERS))
     elif resource.startswith("file-"):
-        return jsonify(dict(file_desc, project="project-0123456789ABCDEF01234567"))
+        return jsonify(describe_file(resource))
     elif resource.startswith("job-"):
         return jsonify(dict(app="app-0123456789ABCDEF01234567"))
     else:
@@ -71,8 +146,60 @@ def download(id):
 
 @app.route("/F/D", methods=["GET"])
 def serve_download():
-    start, stop = (int(x) for x in request.headers["range"].split("=")[1].split("-"))
-    return app.payload[start:stop+1]
+    headers, status = {}, 200
+    if "range" in request.headers:
+        start, stop = (int(x) for x in request.headers["range"].split("=")[1].split("-"))
+        stop = min(stop, len(app.payload) - 1)
+        headers["Content-Range"] = "bytes %d-%d/%d" % (start, stop, len(app.payload))
+        status = 206
+    else:
+        start, stop = 0, len(app.payload) - 1
+    data = app.payload[start:stop+1]
+    if args.bandwidth <= 0:
+        return Response(data, status=status, headers=headers)
+
+    def send_limited():
+        time_started = time.time()
+        for offset in range(0, len(data), SEND_PIECE_SIZE):
+            # Do not get ahead of the bandwidth limit
+            delay = time_started + offset / args.bandwidth - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            yield data[offset:offset + SEND_PIECE_SIZE]
+    headers["Content-Length"] = str(len(data))
+    return Response(send_limited(), status=status, headers=headers)
+
+
+@app.route("/file/new", methods=["POST"])
+def file_new():
+    dxid = "file-%024d" % (len(uploads) + 1000000)
+    uploads[dxid] = dict(file_desc, id=dxid, name=request.json.get("name", dxid),
+                         folder=request.json.get("folder", "/"), state="open", parts={}, size=0)
+    uploads[dxid].pop("md5", None)
+    return jsonify(dict(id=dxid))
+
+@app.route("/file-<id>/upload", methods=["POST"])
+def upload(id):
+    index = request.json.get("index", 1)
+    uploads["file-" + id]["parts"][str(index)] = {"state": "pending", "size": request.json["size"],
+                                                  "md5": request.json["md5"]}
+    return jsonify(dict(url=request.url_root + "F/U/file-{}/{}".format(id, index), headers={}))
+
+@app.route("/F/U/<dxid>/<index>", methods=["PUT"])
+def serve_upload(dxid, index):
+    size = len(request.get_data())
+    part = uploads[dxid]["parts"][index]
+    if part["size"] != size:
+        return Response("Part size mismatch", status=400)
+    part["state"] = "complete"
+    return jsonify(dict())
+
+@app.route("/file-<id>/close", methods=["POST"])
+def close(id):
+    desc = uploads["file-" + id]
+    desc["state"] = "closed"
+    desc["size"] = sum(part["size"] for part in desc["parts"].values())
+    return jsonify(dict(id=desc["id"]))
 
 if __name__ == "__main__":
-    app.run(debug=True, use_reloader=False, host=args.host, port=args.port)
+    app.run(debug=True, use_reloader=False, host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Transfer throughput benchmarks, run offline against the mock API server
+(api.py).
+
+Each scenario is run once for every combination of --threads and
+--buffer-mb, in a process of its own using the dxpy of this source tree,
+and the results (throughput, p50 and p99 latency of the file data
+requests, peak RSS and CPU time) are written as JSON. With --baseline,
+the throughputs are compared to those of an earlier run with the same
+settings (file size, parts, latency, bandwidth and error rate), and the
+exit code is 1 if any scenario got slower by more than --tolerance.
+
+Example:
+
+    ./bench.py --size-mb 256 --threads 1 8 --buffer-mb 16 64 --latency 0.01 --output results.json
+    ./bench.py --size-mb 256 --threads 1 8 --buffer-mb 16 64 --latency 0.01 --baseline results.json
+"""
+
+from __future__ import print_function, unicode_literals
+
+import os, sys, argparse, json, subprocess, tempfile, shutil, threading, time
+from urllib.request import urlopen, Request
+
+SCENARIOS = ["download_dxfile", "dxfile_read", "upload_local_file", "download_folder", "dx_cat"]
+PROJECT_ID = "project-0123456789ABCDEF01234567"
+FILE_ID = "file-0123456789ABCDEF01234567"
+MOCK_API = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api.py")
+# The dxpy source tree that is benchmarked, rather than any installed copy
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+parser.add_argument("--threads", help="Numbers of HTTP threads to run each scenario with", nargs="+", type=int,
+                    default=[1, 4, 8])
+parser.add_argument("--buffer-mb", help="Buffer (chunk and part) sizes, in MiB, to run each scenario with",
+                    nargs="+", type=int, default=[16, 64])
+parser.add_argument("--size-mb", help="Size of each file, in MiB", type=int, default=256)
+parser.add_argument("--parts", help="Number of parts of each remote file", type=int, default=1)
+parser.add_argument("--folder-files", help="Number of files downloaded by download_folder", type=int, default=4)
+parser.add_argument("--port", type=int, default=5999)
+parser.add_argument("--latency", help="Seconds added by the server to every request", type=float, default=0)
+parser.add_argument("--bandwidth-mb", help="Bandwidth limit of each data response, in MiB/s", type=float, default=0)
+parser.add_argument("--error-rate", help="Fraction of requests answered with 503", type=float, default=0)
+parser.add_argument("--output", help="File to write the results to (default: stdout)")
+parser.add_argument("--baseline", help="Results of an earlier run to compare the throughputs to")
+parser.add_argument("--tolerance", help="Allowed relative decrease of throughput from the baseline", type=float,
+                    default=0.2)
+# Used by the benchmark to run a single scenario in a subprocess
+parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+parser.add_argument("--result-file", help=argparse.SUPPRESS)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+def set_http_threads(num_threads):
+    import dxpy
+    from dxpy.utils.adaptive_concurrency import AdaptiveConcurrency
+    dxpy.DXFile._http_threadpool_size = num_threads
+    dxpy.DXFile._http_threadpool = dxpy.utils.get_futures_threadpool(max_workers=num_threads)
+    dxpy.DXFile._http_concurrency = AdaptiveConcurrency(num_threads, num_threads)
+
+
+def record_latencies():
+    '''
+    Wraps the functions making file data requests (range reads and part
+    uploads), and returns the list to which their durations are added.
+    '''
+    import dxpy
+    latencies, lock = [], threading.Lock()
+
+    def timed(func):
+        def wrapper(*args, **kwargs):
+            time_started = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with lock:
+                    latencies.append(time.time() - time_started)
+        return wrapper
+    dxpy._dxhttp_read_range_into = timed(dxpy._dxhttp_read_range_into)
+    dxpy.DXHTTPRequest = timed(dxpy.DXHTTPRequest)
+    return latencies
+
+
+def run_download_dxfile(args, scratch_dir):
+    import dxpy
+    dxpy.download_dxfile(FILE_ID, os.path.join(scratch_dir, "download"), chunksize=args.buffer_mb[0] << 20)
+    return os.path.getsize(os.path.join(scratch_dir, "download"))
+
+
+def run_dxfile_read(args, scratch_dir):
+    import dxpy
+    num_bytes = 0
+    with dxpy.open_dxfile(FILE_ID, mode="rb", read_buffer_size=args.buffer_mb[0] << 20) as dxfile:
+        while True:
+            data = dxfile.read(args.buffer_mb[0] << 20)
+            if not data:
+                return num_bytes
+            num_bytes += len(data)
+
+
+def prepare_upload_local_file(args, scratch_dir):
+    with open(os.path.join(scratch_dir, "upload"), "wb") as fh:
+        for _ in range(args.size_mb):
+            fh.write(os.urandom(1 << 20))
+
+
+def run_upload_local_file(args, scratch_dir):
+    import dxpy
+    dxpy.upload_local_file(os.path.join(scratch_dir, "upload"), write_buffer_size=args.buffer_mb[0] << 20,
+                           wait_on_close=True)
+    return os.path.getsize(os.path.join(scratch_dir, "upload"))
+
+
+def run_download_folder(args, scratch_dir):
+    import dxpy
+    dxpy.download_folder(PROJECT_ID, os.path.join(scratch_dir, "folder"), chunksize=args.buffer_mb[0] << 20)
+    return sum(os.path.getsize(os.path.join(dirpath, filename))
+               for dirpath, _dirnames, filenames in os.walk(os.path.join(scratch_dir, "folder"))
+               for filename in filenames)
+
+
+def run_dx_cat(args, scratch_dir):
+    # dx cat has no thread or buffer options; it runs with the defaults
+    with open(os.path.join(scratch_dir, "cat"), "wb") as fh:
+        subprocess.check_call([sys.executable, "-m", "dxpy.scripts.dx", "cat", FILE_ID], stdout=fh)
+    return os.path.getsize(os.path.join(scratch_dir, "cat"))
+
+
+def run_worker(args):
+    scratch_dir = tempfile.mkdtemp()
+    try:
+        if args.worker == "upload_local_file":
+            prepare_upload_local_file(args, scratch_dir)
+        set_http_threads(args.threads[0])
+        latencies = record_latencies()
+        time_started = time.time()
+        num_bytes = globals()["run_" + args.worker](args, scratch_dir)
+        seconds = time.time() - time_started
+    finally:
+        shutil.rmtree(scratch_dir)
+    with open(args.result_file, "w") as fh:
+        json.dump({"bytes": num_bytes, "seconds": seconds, "requests": len(latencies),
+                   "latency_p50": percentile(latencies, 0.5), "latency_p99": percentile(latencies, 0.99)}, fh)
+
+
+def call_mock_api(args, route, data):
+    request = Request("http://localhost:{}/{}".format(args.port, route), data=json.dumps(data).encode(),
+                      headers={"Content-Type": "application/json"})
+    with urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def start_mock_api(args):
+    server = subprocess.Popen([sys.executable, MOCK_API, "--port", str(args.port), "--latency", str(args.latency),
+                               "--bandwidth", str(args.bandwidth_mb * (1 << 20)), "--error-rate",
+                               str(args.error_rate)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            call_mock_api(args, "system/setPayload", {"size": args.size_mb << 20, "numParts": args.parts,
+                                                      "numFiles": args.folder_files})
+            return server
+        except IOError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("The mock API server did not start")
+
+
+def run_scenario(args, scenario, num_threads, buffer_mb):
+    env = dict(os.environ,
+               DX_APISERVER_HOST="localhost",
+               DX_APISERVER_PORT=str(args.port),
+               DX_APISERVER_PROTOCOL="http",
+               DX_JOB_ID="job-0123456789ABCDEF01234567",
+               DX_PROJECT_CONTEXT_ID=PROJECT_ID,
+               DX_WORKSPACE_ID="container-0123456789ABCDEF01234567",
+               DX_CLI_WD="/",
+               PYTHONPATH=os.pathsep.join([SOURCE_DIR] + [path for path in [os.environ.get("PYTHONPATH")] if path]))
+    with tempfile.NamedTemporaryFile(suffix=".json") as result_file:
+        worker = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker", scenario,
+                                   "--threads", str(num_threads), "--buffer-mb", str(buffer_mb),
+                                   "--size-mb", str(args.size_mb), "--result-file", result_file.name], env=env)
+        # wait4 reports the peak RSS and CPU time of the worker (and of its own subprocesses)
+        _pid, status, rusage = os.wait4(worker.pid, 0)
+        worker.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        result = {"scenario": scenario, "threads": num_threads, "buffer_bytes": buffer_mb << 20,
+                  "returncode": worker.returncode, "max_rss_kib": rusage.ru_maxrss,
+                  "cpu_seconds": rusage.ru_utime + rusage.ru_stime}
+        if worker.returncode == 0:
+            with open(result_file.name) as fh:
+                result.update(json.load(fh))
+            result["throughput_mib_s"] = result["bytes"] / max(result["seconds"], 1e-6) / (1 << 20)
+    return result
+
+
+def get_settings(args):
+    return {"size_mb": args.size_mb, "parts": args.parts, "folder_files": args.folder_files,
+            "latency": args.latency, "bandwidth_mb": args.bandwidth_mb, "error_rate": args.error_rate}
+
+
+def check_baseline_settings(settings, baseline):
+    '''
+    Raises ValueError if the baseline was run with other settings (file
+    size, latency, bandwidth, error rate...), whose throughputs are not
+    comparable.
+    '''
+    baseline_settings = baseline.get("settings", {})
+    mismatches = ["{}={} (baseline: {})".format(key, value, baseline_settings.get(key))
+                  for key, value in sorted(settings.items()) if baseline_settings.get(key) != value]
+    if mismatches:
+        raise ValueError("The baseline was run with other settings: " + ", ".join(mismatches))
+
+
+def compare_to_baseline(results, baseline, tolerance, settings):
+    check_baseline_settings(settings, baseline)
+    baseline_results = {(r["scenario"], r["threads"], r["buffer_bytes"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline_results.get((result["scenario"], result["threads"], result["buffer_bytes"]))
+        if previous is None or "throughput_mib_s" not in previous:
+            continue
+        if result.get("throughput_mib_s", 0) < previous["throughput_mib_s"] * (1 - tolerance):
+            regressions.append("{scenario} (threads={threads}, buffer={buffer_bytes}): {new:.1f} MiB/s, "
+                               "was {old:.1f} MiB/s".format(new=result.get("throughput_mib_s", 0),
+                                                            old=previous["throughput_mib_s"], **result))
+    return regressions
+
+
+def main():
+    args = parser.parse_args()
+    if args.worker:
+        run_worker(args)
+        return
+
+    settings = get_settings(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        try:
+            check_baseline_settings(settings, baseline)
+        except ValueError as e:
+            parser.error(str(e))
+
+    server = start_mock_api(args)
+    results = []
+    try:
+        for scenario in args.scenarios:
+            combinations = [(1, 0)] if scenario == "dx_cat" else [(t, b) for t in args.threads for b in args.buffer_mb]
+            for num_threads, buffer_mb in combinations:
+                result = run_scenario(args, scenario, num_threads, buffer_mb)
+                print("{scenario} threads={threads} buffer={buffer_bytes}: {throughput} MiB/s".format(
+                    throughput="%.1f" % result["throughput_mib_s"] if "throughput_mib_s" in result else "failed",
+                    **result), file=sys.stderr)
+                results.append(result)
+    finally:
+        server.kill()
+
+    output = {"settings": settings, "results": results}
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(output, fh, indent=4)
+    else:
+        print(json.dumps(output, indent=4))
+
+    failed = [r for r in results if r["returncode"] != 0]
+    regressions = []
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.tolerance, settings)
+        for regression in regressions:
+            print("Regression: " + regression, file=sys.stderr)
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
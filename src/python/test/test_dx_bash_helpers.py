@@ -27,7 +27,10 @@ import pipes
 import pytest
 import shutil
 import tempfile
+import threading
+import time
 import unittest
+from unittest.mock import patch
 from dxpy.utils.completer import InstanceTypesCompleter
 from dxpy_testutil import (
     DXTestCase,
@@ -36,7 +39,7 @@ from dxpy_testutil import (
     override_environment,
 )
 from dxpy.exceptions import DXJobFailureError
-from dxpy.bindings.download_all_inputs import _get_num_parallel_threads
+from dxpy.bindings.download_all_inputs import _get_num_parallel_threads, _DownloadScheduler
 
 
 def run(command, **kwargs):
@@ -1000,6 +1003,45 @@ class TestDXBashHelperMethods(unittest.TestCase):
                 num_threads * 1200 <= inst.Memory_GB * 1024 or num_threads == 1
             )
 
+    def test_download_scheduler(self):
+        """Tests that the scheduler shares a fixed connection budget among files, largest first"""
+        mib = 1 << 20
+        sizes = [1 * mib, 40 * mib, 3 * mib, 0, 20 * mib, 5 * mib]
+        to_download = [{'src_file_id': 'file-%024d' % i, 'trg_fname': 'f%d' % i,
+                        'handler': dxpy.DXFile('file-%024d' % i, project='project-' + 'x' * 24)}
+                       for i in range(len(sizes))]
+        descs = [{'id': rec['src_file_id'], 'size': size, 'parts': {}} for rec, size in zip(to_download, sizes)]
+        lock, windows, finished, max_in_flight, started = threading.Lock(), {}, set(), [0], []
+
+        def download(dxfile, filename, chunksize=None, describe_output=None, max_active_tasks=None):
+            with lock:
+                started.append(describe_output['size'])
+            # Like response_iterator, reads the window again after writing each chunk
+            for _ in range(max(-(-describe_output['size'] // chunksize), 1)):
+                window = max_active_tasks.window
+                with lock:
+                    windows.setdefault(filename, []).append(window)
+                    active = {name: file_windows[-1] for name, file_windows in windows.items()
+                              if name not in finished}
+                    max_in_flight[0] = max(max_in_flight[0], sum(active.values()))
+                time.sleep(0.02)
+            with lock:
+                finished.add(filename)
+
+        scheduler = _DownloadScheduler(max_files=3, max_connections=16, max_buffer_bytes=24 * mib, chunksize=4 * mib)
+        self.assertEqual(scheduler.num_connections, 6)
+        with patch("dxpy.describe", return_value=descs), patch("dxpy.download_dxfile", side_effect=download):
+            scheduler.run(to_download, "/in")
+        self.assertEqual(started[:3], [40 * mib, 20 * mib, 5 * mib])
+        self.assertLessEqual(max_in_flight[0], 6)
+        self.assertEqual(windows["/in/f1"][0], 2)
+        self.assertEqual(windows["/in/f0"], [1])
+        # The connections of the files that are done go to the largest file, still running
+        self.assertEqual(windows["/in/f1"][-1], 6)
+        self.assertEqual(windows["/in/f1"], sorted(windows["/in/f1"]))
+        self.assertEqual(scheduler._free_connections, 6)
+        self.assertEqual(scheduler.bytes_downloaded, sum(sizes))
+
 
 if __name__ == "__main__":
     unittest.main()
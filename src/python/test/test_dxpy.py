@@ -345,6 +345,50 @@ class TestDXFileFunctions(unittest.TestCase):
         with self.assertRaises(DXFileError):
             dxpy.dxfile._get_write_buf_size(16 * MB, azure, 200001 * MB)
 
+    def test_get_complete_parts(self):
+        parts_desc = {
+            "1": {"state": "complete", "size": 10, "md5": "a"},
+            "2": {"state": "pending", "size": 10, "md5": "b"},
+            "3": {"state": "complete", "size": 10, "md5": "c"},
+            "4": {"state": "complete", "size": 3, "md5": "d"}
+        }
+        get_complete_parts = dxpy.bindings.dxfile_functions._get_complete_parts
+        self.assertEqual(get_complete_parts(parts_desc, 33, 10), {1, 3, 4})
+        # Parts whose size does not match the local file are sent again
+        self.assertEqual(get_complete_parts(parts_desc, 35, 10), {1, 3})
+        recorded_parts = {1: {"index": 1, "offset": 0, "size": 10, "md5": "a"},
+                          3: {"index": 3, "offset": 20, "size": 10, "md5": "x"}}
+        self.assertEqual(get_complete_parts(parts_desc, 33, 10, recorded_parts), {1})
+        self.assertEqual(get_complete_parts(None, 33, 10), set())
+
+    def test_upload_checkpoint(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            checkpoint = dxpy.bindings.dxfile_functions._UploadCheckpoint(os.path.join(tempdir, "foo.dxupload"))
+            self.assertEqual(checkpoint.load(100, 12345), (None, {}))
+
+            handler = dxpy.DXFile("file-" + "x" * 24, project="project-" + "y" * 24)
+            handler._write_bufsize = 40
+            checkpoint.start(handler, 100, 12345)
+            checkpoint.record_part(handler, 2, "b", 40)
+            checkpoint.record_part(handler, 1, "a", 40)
+            with open(checkpoint.path, "a") as fh:
+                fh.write('{"index": 3, "off')
+
+            header, parts = checkpoint.load(100, 12345)
+            self.assertEqual(header, {"id": "file-" + "x" * 24, "project": "project-" + "y" * 24, "size": 100,
+                                      "mtime": 12345, "partSize": 40})
+            self.assertEqual(parts, {1: {"index": 1, "offset": 0, "size": 40, "md5": "a"},
+                                     2: {"index": 2, "offset": 40, "size": 40, "md5": "b"}})
+            # The local file has been modified since
+            self.assertEqual(checkpoint.load(100, 12346), (None, {}))
+            self.assertEqual(checkpoint.load(101, 12345), (None, {}))
+
+            checkpoint.remove()
+            self.assertFalse(os.path.exists(checkpoint.path))
+        finally:
+            shutil.rmtree(tempdir)
+
     def test_job_detection(self):
         if platform.system() == 'Windows':
             import nt
@@ -469,6 +513,29 @@ class TestDXFile(testutil.DXTestCaseCompat):
         dxpy.download_dxfile(self.dxfile, filename=self.new_file.name)
         self.assertTrue(filecmp.cmp(self.foo_file.name, self.new_file.name))
 
+    def test_resume_upload(self):
+        MB = 1024 * 1024
+        with tempfile.NamedTemporaryFile(delete=False) as fh:
+            fh.write(os.urandom(12 * MB))
+        checkpoint_path = fh.name + dxpy.bindings.dxfile_functions.UPLOAD_CHECKPOINT_SUFFIX
+        try:
+            # Simulate an upload that was interrupted after its first part
+            dxfile = dxpy.new_dxfile(mode='a', write_buffer_size=5 * MB, expected_file_size=12 * MB)
+            dxfile._ensure_write_bufsize()
+            checkpoint = dxpy.bindings.dxfile_functions._UploadCheckpoint(checkpoint_path)
+            checkpoint.start(dxfile, 12 * MB, os.stat(fh.name).st_mtime_ns)
+            with open(fh.name, "rb") as local_file:
+                dxfile.upload_part(local_file.read(dxfile._write_bufsize), 1, report_part_fn=checkpoint.record_part)
+
+            resumed = dxpy.upload_local_file(fh.name, write_buffer_size=5 * MB, resume=True, wait_on_close=True)
+            self.assertEqual(resumed.get_id(), dxfile.get_id())
+            self.assertFalse(os.path.exists(checkpoint_path))
+
+            dxpy.download_dxfile(resumed.get_id(), self.new_file.name)
+            self.assertTrue(filecmp.cmp(fh.name, self.new_file.name))
+        finally:
+            os.remove(fh.name)
+
     @pytest.mark.TRACEABILITY_MATRIX
     @testutil.update_traceability_matrix(["DNA_API_DATA_OBJ_CANNOT_UPLOAD_TO_CLOSED_FILE"])
     def test_attempt_to_upload_to_closed_file(self):
@@ -2130,6 +2197,48 @@ class TestDXGlobalWorkflow(testutil.DXTestCaseBuildWorkflows):
         self.assertEqual(gwf_name, results[0]['describe']["name"])
 
 
+class TestFindPaging(unittest.TestCase):
+    def fake_find(self, num_results, fail_at_page=None):
+        calls = []
+
+        def find(query, **kwargs):
+            calls.append(dict(query))
+            if fail_at_page is not None and len(calls) == fail_at_page:
+                raise DXError("page failed")
+            start = query.get("starting", 0)
+            end = min(start + query["limit"], num_results)
+            return {"results": [{"id": "record-%024d" % i, "project": "project-" + "x" * 24}
+                                for i in range(start, end)],
+                    "next": end if end < num_results else None}
+        return find, calls
+
+    def test_prefetch_pages(self):
+        for prefetch_pages in [0, 1, 3]:
+            find, calls = self.fake_find(1000)
+            results = dxpy.search._find(find, {}, None, False, 10, prefetch_pages=prefetch_pages)
+            self.assertEqual([r["id"] for r in results], ["record-%024d" % i for i in range(1000)])
+            self.assertEqual([c["limit"] for c in calls], [10, 20, 40, 80, 160, 320, 640])
+
+            # Pages past the limit are not requested
+            find, calls = self.fake_find(1000)
+            results = list(dxpy.search._find(find, {"limit": 30}, 30, False, 10, prefetch_pages=prefetch_pages))
+            self.assertEqual(len(results), 30)
+            self.assertEqual(len(calls), 1)
+
+            find, calls = self.fake_find(1000, fail_at_page=3)
+            with self.assertRaises(DXError):
+                list(dxpy.search._find(find, {}, None, False, 10, prefetch_pages=prefetch_pages))
+
+    def test_prefetch_look_ahead(self):
+        find, calls = self.fake_find(100000)
+        results = dxpy.search._find(find, {}, None, False, 10, prefetch_pages=2)
+        next(results)
+        time.sleep(0.5)
+        # The page being consumed and up to 2 pages ahead of it (plus one waiting to be queued)
+        self.assertLessEqual(len(calls), 4)
+        results.close()
+
+
 class TestDXSearch(testutil.DXTestCaseCompat):
     def setUp(self):
         setUpTempProjects(self)
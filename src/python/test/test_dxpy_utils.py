@@ -19,14 +19,29 @@
 
 from __future__ import print_function, unicode_literals, division, absolute_import
 
-import unittest, time, json, re, os
+import unittest, time, json, re, os, sys, random, threading, hashlib, tempfile, shutil, asyncio, subprocess, argparse
+from io import StringIO
+from unittest.mock import patch
 import dateutil.parser
+import urllib3
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import dxpy
-from dxpy import AppError, AppInternalError, DXError, DXFile, DXRecord
+import dxpy.aio.api
+from dxpy import AppError, AppInternalError, DXError, DXFile, DXFileBlockCache, DXRecord
 from dxpy.utils import (exec_utils, genomic_utils, response_iterator, get_futures_threadpool, DXJSONEncoder,
                         normalize_timedelta, normalize_time_input, config, Nonce)
 from dxpy.utils.exec_utils import DXExecDependencyInstaller
+from dxpy.utils.adaptive_concurrency import AdaptiveConcurrency
+from dxpy.bindings.describe_batcher import DXDescribeBatcher
+from dxpy.utils.describe_cache import DescribeCache, enable_describe_cache, disable_describe_cache
+from dxpy.utils.file_cache import enable_file_cache, disable_file_cache
 from dxpy.utils.pretty_print import flatten_json_array
+from dxpy.utils import rate_limiter, resolver
+from dxpy.bindings.apollo import descriptor_cache
+from dxpy.bindings.apollo.vizclient import iter_paged_results
+from dxpy.cli.output_handling import write_expression_output
+from dxpy.cli import dataset_utilities
+from dxpy.cli.dataset_utilities import csv_from_json
 from dxpy.compat import USING_PYTHON2
 import dxpy_testutil as testutil
 from dxpy.system_requirements import SystemRequirementsDict
@@ -111,6 +126,1052 @@ class TestResponseIterator(unittest.TestCase):
         list(response_iterator(tasks(), get_futures_threadpool(8), do_first_task_sequentially=True))
 
 
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def run_round(self, concurrency, num_bytes, clock):
+        tickets = [concurrency.acquire() for _ in range(concurrency.window)]
+        clock[0] += 1
+        for ticket in tickets:
+            concurrency.release(ticket, num_bytes)
+
+    def test_window_adjustment(self):
+        clock = [0.0]
+        with patch("dxpy.utils.adaptive_concurrency.time.time", lambda: clock[0]):
+            concurrency = AdaptiveConcurrency(2, 6)
+            # Throughput grows with the window until the link is saturated
+            for expected_window in [3, 4, 5]:
+                self.run_round(concurrency, 100, clock)
+                self.assertEqual(concurrency.window, expected_window)
+            self.assertEqual(concurrency.throughput, 400)
+            self.run_round(concurrency, 400 // 5, clock)
+            self.assertEqual(concurrency.window, 5)
+            # Throughput collapses
+            self.run_round(concurrency, 10, clock)
+            self.assertEqual(concurrency.window, 4)
+
+            # Retries of requests not counted against the limit are ignored
+            dxpy._count_request_retry()
+            self.run_round(concurrency, 10, clock)
+            self.assertEqual(concurrency.window, 4)
+
+            # Retried requests halve the window once
+            tickets = [concurrency.acquire() for _ in range(4)]
+            concurrency.release(tickets[0], 10, retried=True)
+            self.assertEqual(concurrency.window, 2)
+            concurrency.release(tickets[1], 10, retried=True)
+            concurrency.release(tickets[2], 10, failed=True)
+            self.assertEqual(concurrency.window, 2)
+            concurrency.release(tickets[3], 10)
+            # New requests that fail halve it again, down to the minimum
+            ticket = concurrency.acquire()
+            concurrency.release(ticket, failed=True)
+            self.assertEqual(concurrency.window, 1)
+            ticket = concurrency.acquire()
+            concurrency.release(ticket, failed=True)
+            self.assertEqual(concurrency.window, 1)
+
+    def test_acquire_waits_for_window(self):
+        concurrency = AdaptiveConcurrency(1, 1)
+        ticket = concurrency.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            concurrency.release(concurrency.acquire(), 0)
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.2))
+        concurrency.release(ticket, 0)
+        self.assertTrue(acquired.wait(10))
+        thread.join()
+
+    def test_response_iterator_window(self):
+        class Limit(object):
+            window = 1
+
+        limit, active, max_active = Limit(), [0], [0]
+        lock = threading.Lock()
+
+        def task(i):
+            with lock:
+                active[0] += 1
+                max_active[0] = max(max_active[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return i
+
+        def tasks():
+            for i in range(6):
+                yield task, [i], {}
+
+        results = []
+        for res in response_iterator(tasks(), get_futures_threadpool(4), max_active_tasks=limit,
+                                     do_first_task_sequentially=False):
+            results.append(res)
+            limit.window = 3
+        self.assertEqual(results, list(range(6)))
+        self.assertEqual(max_active[0], 3)
+
+
+class _RangeRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the byte ranges of server.payload. The first server.truncate_responses
+    responses are cut short after half of the requested range has been sent. If
+    server.ignore_range is set, the whole payload is sent with status 200; if
+    server.content_encoding is set, it is sent as the Content-Encoding. A "size"
+    query parameter serves only the first size bytes of the payload.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        payload = self.server.payload
+        if "?size=" in self.path:
+            payload = payload[:int(self.path.split("?size=")[1])]
+        start, end = 0, len(payload) - 1
+        range_requested = "Range" in self.headers and not self.server.ignore_range
+        if range_requested:
+            start, end = (int(x) for x in self.headers["Range"].split("=")[1].split("-"))
+        body = payload[start:end + 1]
+        self.server.requested_ranges.append((start, end))
+        self.send_response(206 if range_requested else 200)
+        if range_requested:
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start, end, len(payload)))
+        if self.server.content_encoding:
+            self.send_header("Content-Encoding", self.server.content_encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.server.truncate_responses > 0:
+            self.server.truncate_responses -= 1
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _RangeServerTestCase(unittest.TestCase):
+    payload = bytes(bytearray(random.getrandbits(8) for _ in range(300000)))
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("localhost", 0), _RangeRequestHandler)
+        self.server.payload = self.payload
+        self.server.requested_ranges = []
+        self.server.truncate_responses = 0
+        self.server.ignore_range = False
+        self.server.content_encoding = None
+        self.url = "http://localhost:%d/F/D" % self.server.server_address[1]
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_dxfile(self, **kwargs):
+        dxfile = DXFile("file-" + "x"*24, mode="rb", **kwargs)
+        dxfile._file_length = len(self.payload)
+        dxfile._download_url, dxfile._download_url_headers = self.url, {}
+        dxfile._download_url_expires = time.time() + 3600
+        return dxfile
+
+
+class TestStreamingRangeReads(_RangeServerTestCase):
+    def test_read_range_into(self):
+        buf = bytearray(1000)
+        num_bytes = dxpy._dxhttp_read_range_into(self.url, {}, 100, 1099, 10, buf)
+        self.assertEqual(num_bytes, 1000)
+        self.assertEqual(bytes(buf), self.payload[100:1100])
+
+        # Reading into a slice of a larger buffer
+        buf = bytearray(2000)
+        dxpy._dxhttp_read_range_into(self.url, {}, 0, 999, 10, memoryview(buf)[500:1500])
+        self.assertEqual(bytes(buf[500:1500]), self.payload[:1000])
+        self.assertEqual(bytes(buf[:500]), b"\0" * 500)
+
+        with self.assertRaises(DXError):
+            dxpy._dxhttp_read_range_into(self.url, {}, 0, 999, 10, bytearray(10))
+
+    def test_read_range_into_resumes(self):
+        self.server.truncate_responses = 1
+        buf = bytearray(100000)
+        dxpy._dxhttp_read_range_into(self.url, {}, 1000, 100999, 10, buf)
+        self.assertEqual(bytes(buf), self.payload[1000:101000])
+        # Only the missing half of the range is requested again
+        self.assertEqual(self.server.requested_ranges, [(1000, 100999), (51000, 100999)])
+
+        self.server.truncate_responses = 3
+        with self.assertRaises(dxpy.exceptions.DXIncompleteReadsError):
+            dxpy._dxhttp_read_range_into(self.url, {}, 0, 999, 10, bytearray(1000), max_retries=1)
+
+    def test_read_range_into_checks_response(self):
+        # A server that ignores the Range header must not fill the buffer with the start of the file
+        self.server.ignore_range = True
+        buf = bytearray(1000)
+        with self.assertRaisesRegex(DXError, "Expected status 206"):
+            dxpy._dxhttp_read_range_into(self.url, {}, 1000, 1999, 10, buf)
+        self.assertEqual(bytes(buf), b"\0" * 1000)
+        # Without sub_range, the whole response must be the range
+        with self.assertRaisesRegex(DXError, "Content-Length"):
+            dxpy._dxhttp_read_range_into(self.url, {}, 0, 999, 10, buf, sub_range=False)
+        with self.assertRaisesRegex(DXError, "Expected status 206"):
+            dxpy._dxhttp_read_range_into(self.url, {}, 0, 999, 10, buf)
+        # The whole file is the range 0..length - 1, though
+        buf = bytearray(len(self.payload))
+        dxpy._dxhttp_read_range_into(self.url, {}, 0, len(self.payload) - 1, 10, buf)
+        self.assertEqual(bytes(buf), self.payload)
+        buf = bytearray(1000)
+
+        self.server.ignore_range = False
+        self.server.content_encoding = "gzip"
+        headers = {}
+        with self.assertRaisesRegex(DXError, "content encoding"):
+            dxpy._dxhttp_read_range_into(self.url, headers, 0, 999, 10, buf)
+        self.assertEqual(headers["Accept-Encoding"], "identity")
+
+    def test_read_range(self):
+        self.assertEqual(dxpy._dxhttp_read_range(self.url, {}, 10, 20009, 10), self.payload[10:20010])
+
+    def test_read_range_request_events(self):
+        events = []
+        dxpy.add_request_listener(events.append)
+        try:
+            dxpy._dxhttp_read_range_into(self.url, {}, 0, 99999, 10, bytearray(100000))
+            self.server.truncate_responses = 1
+            dxpy._dxhttp_read_range_into(self.url, {}, 0, 999, 10, bytearray(1000))
+        finally:
+            dxpy.remove_request_listener(events.append)
+        self.assertEqual([event.type for event in events], ["start", "end"] * 3)
+        # The end events are sent once the body has been read
+        end = events[1]
+        self.assertEqual((end.status, end.bytes_received, end.error), (206, 100000, None))
+        self.assertGreaterEqual(end.latency, end.time_to_first_byte)
+        self.assertEqual(events[3].bytes_received, 500)
+        self.assertIn("500 bytes of the body unread", events[3].error)
+        self.assertEqual((events[5].bytes_received, events[5].error), (500, None))
+
+    def test_dxfile_read_and_readinto(self):
+        dxfile = self.get_dxfile(read_buffer_size=64*1024)
+        self.assertEqual(dxfile.read(10), self.payload[:10])
+        buf = bytearray(100000)
+        self.assertEqual(dxfile.readinto(buf), 100000)
+        self.assertEqual(bytes(buf), self.payload[10:100010])
+        self.assertEqual(dxfile.tell(), 100010)
+        self.assertEqual(dxfile.read(5), self.payload[100010:100015])
+
+        dxfile.seek(5)
+        self.assertEqual(dxfile.read(20), self.payload[5:25])
+        dxfile.seek(len(self.payload) - 10)
+        self.assertEqual(dxfile.readinto(buf), 10)
+        self.assertEqual(bytes(buf[:10]), self.payload[-10:])
+        self.assertEqual(dxfile.readinto(buf), 0)
+
+        dxfile.seek(0)
+        self.assertEqual(dxfile.read(), self.payload)
+
+    def test_iter_lines(self):
+        lines = ["line %d \u00e9" % i + "x" * (i % 7) for i in range(3000)]
+        lines[100] = "long" * 5000
+        text = "\n".join(lines[:2000]) + "\r\n" + "\r\n".join(lines[2000:])
+        self.server.payload = text.encode("utf-8")
+
+        def open_text_file(mode):
+            dxfile = self.get_dxfile(read_buffer_size=1024)
+            dxfile._binary_mode = (mode == "rb")
+            dxfile._file_length = len(self.server.payload)
+            return dxfile
+
+        self.assertEqual(list(open_text_file("r")), lines)
+        self.assertEqual(list(open_text_file("rb")), [line.encode("utf-8") for line in lines])
+        batches = list(open_text_file("rb").iter_lines(batched=True, decode=True))
+        self.assertGreater(len(batches), 1)
+        self.assertEqual([line for batch in batches for line in batch], lines)
+
+    def test_read_at_from_threads(self):
+        dxfile = self.get_dxfile(read_buffer_size=8000)
+        dxfile.read(10)
+        regions = [(random.randrange(len(self.payload)), random.randrange(1, 30000)) for _ in range(50)]
+        results = {}
+        def read_region(region):
+            results[region] = dxfile.read_at(*region)
+        threads = [threading.Thread(target=read_region, args=(region,)) for region in regions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for offset, length in regions:
+            self.assertEqual(results[(offset, length)], self.payload[offset:offset + length])
+        # The cursor is not moved
+        self.assertEqual(dxfile.tell(), 10)
+        self.assertEqual(dxfile.read(10), self.payload[10:20])
+
+        buf = bytearray(100)
+        self.assertEqual(dxfile.readinto_at(len(self.payload) - 40, buf), 40)
+        self.assertEqual(bytes(buf[:40]), self.payload[-40:])
+        self.assertEqual(dxfile.readinto_at(len(self.payload) + 5, buf), 0)
+        with self.assertRaises(ValueError):
+            dxfile.read_at(-1, 10)
+
+        cache = DXFileBlockCache(block_size=10000)
+        dxfile = self.get_dxfile(block_cache=cache)
+        self.assertEqual(dxfile.read_at(19990, 30), self.payload[19990:20020])
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_block_cache_random_access(self):
+        cache = DXFileBlockCache(max_bytes=100000, block_size=10000)
+        dxfile = self.get_dxfile(block_cache=cache)
+        offsets = [150000, 5, 290000, 150100, 9995, 5]
+        for offset in offsets:
+            dxfile.seek(offset)
+            self.assertEqual(dxfile.read(10), self.payload[offset:offset + 10])
+        # Only the blocks that were read are requested, each once (the read
+        # at 9995 spans two blocks)
+        self.assertEqual(sorted(self.server.requested_ranges),
+                         [(0, 9999), (10000, 19999), (150000, 159999), (290000, 299999)])
+        self.assertEqual((cache.hits, cache.misses), (3, 4))
+
+        # A second handler of the same file shares the blocks
+        other = self.get_dxfile(block_cache=cache)
+        other.seek(150000)
+        buf = bytearray(20)
+        self.assertEqual(other.readinto(buf), 20)
+        self.assertEqual(bytes(buf), self.payload[150000:150020])
+        self.assertEqual(len(self.server.requested_ranges), 4)
+
+    def test_block_cache_sequential_read(self):
+        cache = DXFileBlockCache(max_bytes=50000, block_size=10000, max_readahead=4)
+        dxfile = self.get_dxfile(block_cache=cache)
+        self.assertEqual(dxfile.read(), self.payload)
+        dxfile.seek(0)
+        data = b"".join(iter(lambda: dxfile.read(7000), b""))
+        self.assertEqual(data, self.payload)
+        # Readahead requested each block once per pass, and evicted blocks
+        # were downloaded again on the second pass
+        self.assertEqual(len(self.server.requested_ranges), 60)
+        self.assertLessEqual(cache._num_bytes, 50000 + 4 * 10000)
+
+
+class TestConnectionPool(_RangeServerTestCase):
+    def test_pool_stats(self):
+        host = "localhost"
+        stats = dxpy.get_connection_pool_stats().get(host, {"connections_opened": 0, "connections_reused": 0})
+        for _ in range(3):
+            dxpy.DXHTTPRequest(self.url, "", method="GET", auth=None, prepend_srv=False, jsonify_data=False,
+                               headers={"Range": "bytes=0-9"}, decode_response_body=False)
+        new_stats = dxpy.get_connection_pool_stats()[host]
+        self.assertEqual(new_stats["connections_opened"] - stats["connections_opened"], 1)
+        self.assertEqual(new_stats["connections_reused"] - stats["connections_reused"], 2)
+        self.assertEqual(new_stats["tls_handshakes"], 0)
+
+        # Only the connection of a broken response is replaced
+        self.server.truncate_responses = 1
+        buf = bytearray(1000)
+        dxpy._dxhttp_read_range_into(self.url, {}, 0, 999, 10, buf)
+        self.assertEqual(dxpy.get_connection_pool_stats()[host]["connections_opened"] - new_stats["connections_opened"], 1)
+
+    @patch.object(dxpy, "API_SERVER_POOL_SIZE", 5)
+    @patch.object(dxpy, "STORAGE_POOL_SIZE", 7)
+    def test_pool_sizes(self):
+        pool_manager = dxpy._new_pool_manager(urllib3.PoolManager)
+        self.assertEqual(pool_manager.connection_from_url(self.url).pool.maxsize, 7)
+        self.assertEqual(pool_manager.connection_from_url(dxpy.APISERVER).pool.maxsize, 5)
+
+        # Through a proxy, plain HTTP requests to any host go to pools of the proxy
+        proxy_manager = dxpy._new_pool_manager(urllib3.ProxyManager, proxy_url="http://proxy.example:3128")
+        api_pool = proxy_manager.connection_from_url("http://" + dxpy.APISERVER_HOST + "/system/whoami")
+        storage_pool = proxy_manager.connection_from_url("http://storage.example.com/F/D")
+        self.assertEqual((api_pool.host, api_pool.pool.maxsize), ("proxy.example", 5))
+        self.assertEqual((storage_pool.host, storage_pool.pool.maxsize), ("proxy.example", 7))
+        self.assertEqual(proxy_manager.connection_from_url(dxpy.APISERVER).pool.maxsize, 5)
+
+
+class TestDownloadDXFiles(_RangeServerTestCase):
+    def describe(self, file_id, part_sizes):
+        parts, offset = {}, 0
+        for index, size in enumerate(part_sizes, 1):
+            parts[str(index)] = {"size": size, "md5": hashlib.md5(self.payload[offset:offset + size]).hexdigest()}
+            offset += size
+        return {"id": file_id, "size": offset, "parts": parts}
+
+    def test_download_dxfiles(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            downloads = [(None, self.describe("file-" + str(i) * 24, part_sizes), os.path.join(tempdir, str(i)))
+                         for i, part_sizes in enumerate([[len(self.payload)], [100000, 200000], [1000], [0]])]
+            sizes = {desc["id"]: desc["size"] for _project, desc, _filename in downloads}
+
+            def get_download_url(dxfile, *args, **kwargs):
+                return "{}?size={}".format(self.url, sizes[dxfile.get_id()]), {}
+
+            with patch.object(DXFile, "get_download_url", autospec=True, side_effect=get_download_url):
+                # Everything fits in one request
+                dxpy.download_dxfiles(downloads, chunksize=len(self.payload), parallel_files=2)
+                for _project, desc, filename in downloads:
+                    with open(filename, "rb") as fh:
+                        self.assertEqual(fh.read(), self.payload[:desc["size"]])
+                self.assertEqual(len(self.server.requested_ranges), 3)
+
+                # Large files are split into chunks
+                for _project, _desc, filename in downloads:
+                    os.remove(filename)
+                self.server.requested_ranges = []
+                dxpy.download_dxfiles(downloads, chunksize=64*1024, parallel_files=2)
+                for _project, desc, filename in downloads:
+                    with open(filename, "rb") as fh:
+                        self.assertEqual(fh.read(), self.payload[:desc["size"]])
+                self.assertEqual(len(self.server.requested_ranges), 5 + 2 + 4 + 1)
+
+                # With the file cache, small files are copied from it too
+                cache = enable_file_cache(os.path.join(tempdir, "cache"))
+                try:
+                    for _project, desc, _filename in downloads:
+                        desc["state"] = "closed"
+                    dxpy.download_dxfiles(downloads, chunksize=64*1024, parallel_files=2)
+                    for _project, desc, filename in downloads:
+                        self.assertIsNotNone(cache.lookup(desc))
+                        with open(filename, "rb") as fh:
+                            self.assertEqual(fh.read(), self.payload[:desc["size"]])
+                finally:
+                    disable_file_cache()
+
+            # When a small file fails, the running downloads are waited for and the pending ones cancelled
+            finished = []
+            def download_dxfile(dxid, *args, **kwargs):
+                time.sleep(0.2)
+                finished.append(dxid)
+            with patch("dxpy.bindings.dxfile_functions._get_small_dxfile", side_effect=DXError("failed")), \
+                 patch("dxpy.bindings.dxfile_functions.download_dxfile", side_effect=download_dxfile):
+                with self.assertRaisesRegex(DXError, "failed"):
+                    dxpy.download_dxfiles(downloads, chunksize=64*1024, parallel_files=1)
+                self.assertEqual(finished, [downloads[0][1]["id"]])
+                time.sleep(0.3)
+                self.assertEqual(finished, [downloads[0][1]["id"]])
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_download_dxfile_verification(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, "f")
+            desc = self.describe("file-" + "x" * 24, [100000, 200000])
+            with patch.object(DXFile, "get_download_url", side_effect=lambda *args, **kwargs: (self.url, {})):
+                # Resuming: the local copy of part 1 is verified and kept
+                with open(filename, "wb") as fh:
+                    fh.write(self.payload[:150000])
+                dxpy.download_dxfile(desc["id"], filename, chunksize=64*1024, describe_output=desc)
+                with open(filename, "rb") as fh:
+                    self.assertEqual(fh.read(), self.payload)
+                self.assertEqual(min(start for start, _end in self.server.requested_ranges), 100000)
+
+                # Parts spanning several chunks are hashed in the background; mismatches are still caught
+                desc["parts"]["1"]["md5"] = "0" * 32
+                os.remove(filename)
+                with self.assertRaises(dxpy.exceptions.DXChecksumMismatchError):
+                    dxpy.download_dxfile(desc["id"], filename, chunksize=64*1024, describe_output=desc)
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_file_cache(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            cache = enable_file_cache(os.path.join(tempdir, "cache"), max_bytes=2 * len(self.payload))
+            desc = dict(self.describe("file-" + "x" * 24, [100000, 200000]), state="closed")
+            with patch.object(DXFile, "get_download_url", side_effect=lambda *args, **kwargs: (self.url, {})):
+                for i in range(2):
+                    filename = os.path.join(tempdir, str(i))
+                    dxpy.download_dxfile(desc["id"], filename, chunksize=64*1024, describe_output=desc)
+                    with open(filename, "rb") as fh:
+                        self.assertEqual(fh.read(), self.payload)
+                num_requests = len(self.server.requested_ranges)
+
+                # Handlers read the cached copy, found with the describe output they need anyway
+                with patch.object(DXFile, "describe", side_effect=lambda *args, **kwargs: desc) as describe:
+                    with DXFile(desc["id"], mode="rb") as dxfile:
+                        dxfile.seek(1000)
+                        self.assertEqual(dxfile.read(10), self.payload[1000:1010])
+                        self.assertEqual(dxfile.read_at(5, 5), self.payload[5:10])
+                        dxfile.seek(0)
+                        self.assertEqual(dxfile.read(), self.payload)
+                        self.assertEqual(describe.call_count, 1)
+                    self.assertIsNone(dxfile._cached_copy)
+                self.assertEqual(len(self.server.requested_ranges), num_requests)
+
+                # The least recently used copies are evicted, with their lock files
+                other_descs = [dict(self.describe("file-%024d" % i, [len(self.payload)]), state="closed")
+                               for i in range(3)]
+                for other_desc in other_descs[:2]:
+                    dxpy.download_dxfile(other_desc["id"], os.path.join(tempdir, "other"), describe_output=other_desc)
+                self.assertIsNone(cache.lookup(desc))
+                self.assertFalse(os.path.exists(os.path.join(cache.directory, cache.key(desc) + ".lock")))
+                self.assertIsNotNone(cache.lookup(other_descs[1]))
+
+                # Copies locked by another process are not evicted
+                os.utime(cache.lookup(other_descs[0]), (0, 0))
+                with cache._lock(cache.key(other_descs[0])):
+                    dxpy.download_dxfile(other_descs[2]["id"], os.path.join(tempdir, "other"),
+                                         describe_output=other_descs[2])
+                self.assertIsNotNone(cache.lookup(other_descs[0]))
+                self.assertIsNone(cache.lookup(other_descs[1]))
+
+                # A copy evicted before it could be copied is downloaded again
+                os.remove(os.path.join(tempdir, "other"))
+                with patch("dxpy.bindings.dxfile_functions.cache_dxfile", return_value=os.path.join(tempdir, "gone")):
+                    dxpy.download_dxfile(other_descs[1]["id"], os.path.join(tempdir, "other"),
+                                         describe_output=other_descs[1])
+                with open(os.path.join(tempdir, "other"), "rb") as fh:
+                    self.assertEqual(fh.read(), self.payload)
+        finally:
+            disable_file_cache()
+            shutil.rmtree(tempdir)
+
+    def test_pipelined_md5(self):
+        from dxpy.bindings.dxfile import _PipelinedMD5
+        hasher = _PipelinedMD5()
+        for start in range(0, len(self.payload), 1000):
+            hasher.update(self.payload[start:start + 1000])
+        self.assertEqual(hasher.hexdigest(), hashlib.md5(self.payload).hexdigest())
+        self.assertEqual(_PipelinedMD5().hexdigest(), hashlib.md5(b"").hexdigest())
+
+
+class TestUploadLocalFiles(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filenames = []
+        for i in range(5):
+            filename = os.path.join(self.tempdir, "out%d.txt" % i)
+            with open(filename, "w") as fh:
+                fh.write("output %d" % i)
+            self.filenames.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_upload_local_files(self):
+        checkpoint_file = os.path.join(self.tempdir, "checkpoint")
+        project, other_project = "project-" + "x" * 24, "project-" + "y" * 24
+        upload_params = {"maximumNumParts": 10000}
+        uploaded, states, failing = [], {}, []
+
+        def upload_local_file(filename, wait_on_close=False, file_upload_params=None, **kwargs):
+            self.assertFalse(wait_on_close)
+            self.assertIs(file_upload_params, upload_params)
+            if filename in failing:
+                raise DXError("upload failed")
+            dxid = "file-%024d" % len(states)
+            uploaded.append((filename, kwargs))
+            states[dxid] = "closing"
+            return DXFile(dxid, project=kwargs["project"])
+
+        def system_describe_data_objects(describe_input, **kwargs):
+            results = [{"describe": {"id": entry["id"], "state": states[entry["id"]]}}
+                       for entry in describe_input["objects"]]
+            # Files close while they are being waited for
+            for dxid in states:
+                states[dxid] = "closed"
+            return {"results": results}
+
+        uploads = [(filename, {"folder": "/f%d" % i}) for i, filename in enumerate(self.filenames)]
+        with patch("dxpy.bindings.dxfile_functions.upload_local_file", side_effect=upload_local_file), \
+             patch("dxpy.api.system_describe_data_objects", side_effect=system_describe_data_objects) as describe, \
+             patch("dxpy.api.project_describe", return_value={"fileUploadParameters": upload_params}) as \
+                project_describe, \
+             patch("dxpy.bindings.dxfile_functions.sleep"):
+            handlers = dxpy.upload_local_files(uploads, wait_on_close=True, checkpoint_file=checkpoint_file,
+                                               parallel_files=3, tags=["out"], project=project)
+            self.assertEqual(sorted(kwargs["folder"] for _, kwargs in uploaded), ["/f%d" % i for i in range(5)])
+            self.assertTrue(all(kwargs["tags"] == ["out"] for _, kwargs in uploaded))
+            self.assertEqual(len(set(handler.get_id() for handler in handlers)), 5)
+            # Both polls described all the files at once
+            self.assertEqual(describe.call_count, 2)
+            # The upload parameters of the project were fetched once
+            self.assertEqual(project_describe.call_count, 1)
+            # The checkpoint of a complete upload is removed
+            self.assertFalse(os.path.exists(checkpoint_file))
+
+            # An interrupted upload leaves the completed files in the checkpoint
+            failing.append(self.filenames[2])
+            with self.assertRaises(DXError):
+                dxpy.upload_local_files(uploads, checkpoint_file=checkpoint_file, project=project)
+            self.assertTrue(os.path.exists(checkpoint_file))
+
+            # Files recorded for another project are uploaded again
+            del uploaded[:]
+            with self.assertRaises(DXError):
+                dxpy.upload_local_files(uploads, checkpoint_file=checkpoint_file, project=other_project)
+            self.assertEqual(len(uploaded), 4)
+
+            # Only the missing and the modified files are uploaded again
+            failing.remove(self.filenames[2])
+            with open(self.filenames[3], "a") as fh:
+                fh.write("more")
+            os.utime(self.filenames[3], (0, 0))
+            del uploaded[:]
+            handlers_again = dxpy.upload_local_files(uploads, checkpoint_file=checkpoint_file, project=other_project)
+            self.assertEqual(sorted(filename for filename, _ in uploaded), self.filenames[2:4])
+            self.assertTrue(all(handler.get_proj_id() == other_project for handler in handlers_again))
+            self.assertFalse(os.path.exists(checkpoint_file))
+
+
+class TestDescribeBatcher(unittest.TestCase):
+    @staticmethod
+    def _fake_describe_data_objects(calls):
+        def describe_data_objects(input_params, **kwargs):
+            calls.append(input_params)
+            results = []
+            for entry in input_params["objects"]:
+                if entry["id"].startswith("file-missing"):
+                    results.append({"statusCode": 404,
+                                    "error": {"type": "ResourceNotFound", "message": "not found"}})
+                else:
+                    results.append({"describe": {"id": entry["id"], "class": entry["id"].split("-")[0],
+                                                 "input": entry["describe"]}})
+            return {"results": results}
+        return describe_data_objects
+
+    def test_describe_many_is_chunked(self):
+        calls = []
+        ids = ["file-%04d" % i for i in range(2500)]
+        with patch("dxpy.api.system_describe_data_objects", side_effect=self._fake_describe_data_objects(calls)):
+            descs = dxpy.describe(ids, fields=["state"])
+        self.assertEqual([len(call["objects"]) for call in calls], [1000, 1000, 500])
+        self.assertEqual([desc["id"] for desc in descs], ids)
+        # The requested fields are returned in addition to the default fields
+        self.assertEqual(descs[0]["input"], {"fields": {"state": True}, "defaultFields": True})
+
+    def test_describe_many_does_not_start_a_thread(self):
+        calls = []
+        threads_before = threading.active_count()
+        with patch("dxpy.api.system_describe_data_objects", side_effect=self._fake_describe_data_objects(calls)):
+            descs = dxpy.describe(["file-0001", "file-0002"])
+            with self.assertRaises(dxpy.exceptions.ResourceNotFound):
+                dxpy.describe(["file-0003", "file-missing"])
+        self.assertEqual(threading.active_count(), threads_before)
+        self.assertEqual([desc["input"] for desc in descs], [True, True])
+        self.assertEqual(len(calls), 2)
+
+    def test_describe_async_coalesces_requests(self):
+        calls = []
+        batcher = DXDescribeBatcher(max_delay=0.2)
+        with patch("dxpy.api.system_describe_data_objects", side_effect=self._fake_describe_data_objects(calls)):
+            futures = []
+            threads = [threading.Thread(target=lambda i=i: futures.append(
+                batcher.describe_async("file-%04d" % i, project="project-1"))) for i in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            missing = batcher.describe_async("file-missing")
+            results = [future.result(timeout=10) for future in futures]
+            with self.assertRaises(dxpy.exceptions.ResourceNotFound):
+                missing.result(timeout=10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(result["id"] for result in results), ["file-%04d" % i for i in range(20)])
+        self.assertEqual(results[0]["input"], {"project": "project-1"})
+
+    def test_resolver_describes_ids_together(self):
+        calls = []
+        ids = ["file-%024d" % i for i in range(20)]
+        job_desc = {"project": "project-1", "state": "done",
+                    "output": {"files": [{"$dnanexus_link": file_id} for file_id in ids]}}
+        with patch("dxpy.api.system_describe_data_objects", side_effect=self._fake_describe_data_objects(calls)), \
+                patch("dxpy.api.job_describe", return_value=job_desc), \
+                patch("dxpy.bindings.dxdataobject_functions._describe_batcher", DXDescribeBatcher(max_delay=0.2)), \
+                patch("dxpy.DXHTTPRequest", side_effect=DXError("described one at a time")) as describe_one, \
+                patch.object(dxpy, "WORKSPACE_ID", "project-2"):
+            results = resolver.resolve_job_ref("job-" + "x" * 24, "files", describe={"fields": {"state": True}})
+            resolved = resolver.resolve_multiple_existing_paths(ids)
+            resolver.resolve_multiple_existing_paths(["file-missing" + "x" * 17])
+        self.assertEqual([len(call["objects"]) for call in calls], [20, 20, 1])
+        self.assertEqual([result["id"] for result in results], ids)
+        self.assertEqual(results[0]["describe"]["input"], {"project": "project-1", "fields": {"state": True}})
+        self.assertEqual([resolved[file_id]["name"]["describe"]["input"] for file_id in ids],
+                         [{"project": "project-2"}] * 20)
+        # Objects that could not be described in bulk are described again on their own
+        self.assertEqual(describe_one.call_count, 2)
+
+    def test_dx_wait_checks_states_together(self):
+        from dxpy.scripts import dx
+        calls = []
+        def describe_data_objects(input_params, **kwargs):
+            calls.append(input_params)
+            return {"results": [{"describe": {"id": entry["id"], "state": "closed"}}
+                                for entry in input_params["objects"]]}
+        ids = ["file-%024d" % i for i in range(20)]
+        with patch("dxpy.api.system_describe_data_objects", side_effect=describe_data_objects), \
+                patch("dxpy.bindings.dxdataobject_functions._describe_batcher", DXDescribeBatcher(max_delay=0.2)), \
+                patch("dxpy.DXHTTPRequest", side_effect=DXError("described one at a time")), \
+                patch("sys.stdout", new_callable=StringIO) as stdout:
+            dx.wait(argparse.Namespace(path=ids, from_file=False))
+        self.assertEqual([len(call["objects"]) for call in calls], [20])
+        self.assertEqual(stdout.getvalue().count("Done"), 20)
+
+
+class TestDescribeCache(unittest.TestCase):
+    def tearDown(self):
+        disable_describe_cache()
+
+    def test_lru_and_ttl(self):
+        cache = DescribeCache(max_entries=2, ttl=0.2)
+        for i in range(3):
+            cache.put("record-%d" % i, None, {}, {"id": "record-%d" % i, "state": "closed"})
+        cache.put("file-open", None, {}, {"id": "file-open", "state": "open"})
+        self.assertIsNone(cache.get("record-0", None, {}))
+        self.assertIsNone(cache.get("file-open", None, {}))
+        self.assertEqual(cache.get("record-1", None, {})["id"], "record-1")
+        self.assertIsNone(cache.get("record-1", "project-1", {}))
+        self.assertIsNone(cache.get("record-1", None, {"fields": {"name": True}}))
+        time.sleep(0.3)
+        self.assertIsNone(cache.get("record-1", None, {}))
+        self.assertEqual((cache.hits, cache.misses), (1, 5))
+
+    def test_describe_is_cached_and_invalidated(self):
+        enable_describe_cache()
+        describe_calls = []
+        def record_describe(dxid, input_params, **kwargs):
+            describe_calls.append(dxid)
+            return {"id": dxid, "state": "closed", "tags": list(describe_calls)}
+        record = DXRecord("record-" + "x" * 24, project="project-" + "y" * 24)
+        with patch.object(DXRecord, "_describe", staticmethod(record_describe)), \
+             patch.object(DXRecord, "_add_tags", staticmethod(lambda *args, **kwargs: {})):
+            first = record.describe()
+            first["tags"].append("changed by caller")
+            self.assertEqual(record.describe()["tags"], [record.get_id()])
+            self.assertEqual(len(describe_calls), 1)
+            record.add_tags(["new"])
+            record.describe()
+            self.assertEqual(len(describe_calls), 2)
+
+        # A description cached while the object is being changed is not used afterwards
+        server_tags = []
+        def describe_tags(dxid, input_params, **kwargs):
+            return {"id": dxid, "state": "closed", "tags": list(server_tags)}
+        def add_tags(dxid, input_params, **kwargs):
+            # Another thread describes the object before the change is made
+            record.describe()
+            server_tags.extend(input_params["tags"])
+        with patch.object(DXRecord, "_describe", staticmethod(describe_tags)), \
+             patch.object(DXRecord, "_add_tags", staticmethod(add_tags)):
+            record.add_tags(["newer"])
+            self.assertEqual(record.describe()["tags"], ["newer"])
+        self.assertEqual(dxpy.get_describe_cache_stats(), {"hits": 2, "misses": 3, "entries": 1})
+
+
+class _APIRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers API requests with the request input. The first server.unavailable
+    requests get a 503 response; "file-missing" routes get a ResourceNotFound error.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.server.unavailable > 0:
+            self.server.unavailable -= 1
+            status, content = 503, {"error": {"type": "ServiceUnavailable", "message": "try later"}}
+        elif self.path.startswith("/file-missing"):
+            status, content = 404, {"error": {"type": "ResourceNotFound", "message": "no such file"}}
+        else:
+            status, content = 200, {"path": self.path, "input": json.loads(body)}
+        data = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 503:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _APIServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("localhost", 0), _APIRequestHandler)
+        self.server.unavailable = 0
+        self.server_thread = threading.Thread(target=self.server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        self.apiserver = patch.object(dxpy, "APISERVER", "http://localhost:%d" % self.server.server_address[1])
+        self.apiserver.start()
+
+    def tearDown(self):
+        self.apiserver.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestAsyncAPIClient(_APIServerTestCase):
+    def run_requests(self, coroutine_fn):
+        async def run():
+            try:
+                return await coroutine_fn()
+            finally:
+                await dxpy.aio.close()
+        return asyncio.run(run())
+
+    def test_concurrent_requests(self):
+        file_ids = ["file-%024d" % i for i in range(200)]
+        async def describe_all():
+            return await asyncio.gather(*[dxpy.aio.api.file_describe(file_id, {"fields": {"size": True}}, auth=False)
+                                          for file_id in file_ids])
+        pool_stats_before = dxpy.get_connection_pool_stats().get("localhost", {})
+        results = self.run_requests(describe_all)
+        self.assertEqual([result["path"] for result in results], ["/%s/describe" % file_id for file_id in file_ids])
+        self.assertEqual(results[0]["input"], {"fields": {"size": True}})
+        pool_stats = dxpy.get_connection_pool_stats()["localhost"]
+        self.assertLessEqual(pool_stats["connections_opened"] - pool_stats_before.get("connections_opened", 0),
+                             dxpy.STORAGE_POOL_SIZE)
+
+    def test_retry_and_errors(self):
+        self.server.unavailable = 2
+        result = self.run_requests(lambda: dxpy.aio.api.system_whoami(auth=False))
+        self.assertEqual(result["path"], "/system/whoami")
+        self.assertEqual(self.server.unavailable, 0)
+        with self.assertRaises(dxpy.exceptions.ResourceNotFound):
+            self.run_requests(lambda: dxpy.aio.api.file_describe("file-missing", auth=False))
+
+    def test_request_events(self):
+        events = []
+        dxpy.add_request_listener(events.append)
+        try:
+            self.server.unavailable = 1
+            self.run_requests(lambda: dxpy.aio.api.file_describe("file-" + "x" * 24, auth=False))
+        finally:
+            dxpy.remove_request_listener(events.append)
+        self.assertEqual([event.type for event in events], ["start", "retry", "end"])
+        self.assertEqual((events[0].method, events[0].route), ("POST", "/file-xxxx/describe"))
+        self.assertEqual((events[1].status, events[2].status, events[2].retries), (503, 200, 1))
+        self.assertEqual(events[2].bytes_received, len(json.dumps({"path": "/file-" + "x" * 24 + "/describe",
+                                                                   "input": {}})))
+        self.assertGreaterEqual(events[2].latency, events[2].time_to_first_byte)
+
+    def test_shared_limits(self):
+        limits = rate_limiter.RouteClassLimits()
+        limits.retry_budget = rate_limiter.RetryBudget(ratio=0, min_per_second=0, max_balance=1)
+        pauses = rate_limiter.HostPauses()
+        with patch.dict(rate_limiter._limits, {"api": limits}), patch.object(rate_limiter, "_host_pauses", pauses):
+            pauses.pause(dxpy._url_host(dxpy.APISERVER), 0.2)
+            time_started = time.time()
+            self.server.unavailable = 1
+            self.run_requests(lambda: dxpy.aio.api.system_whoami(auth=False))
+            self.assertGreaterEqual(time.time() - time_started, 0.19)
+            self.server.unavailable = 1
+            with self.assertRaises(dxpy.exceptions.DXAPIError):
+                self.run_requests(lambda: dxpy.aio.api.system_whoami(auth=False))
+        self.assertEqual(self.server.unavailable, 0)
+
+    def test_https_proxy_requires_start_tls(self):
+        with patch.dict(os.environ, {"HTTPS_PROXY": "http://localhost:1"}), \
+                patch("dxpy.aio.hasattr", lambda obj, name: False, create=True):
+            with self.assertRaisesRegex(DXError, "Python 3.11"):
+                self.run_requests(lambda: dxpy.aio.DXHTTPRequest("https://localhost:1/x", {}, prepend_srv=False,
+                                                                 auth=False, max_retries=3))
+
+
+class TestRequestListeners(_APIServerTestCase):
+    def test_request_events(self):
+        events = []
+        dxpy.add_request_listener(events.append)
+        try:
+            self.server.unavailable = 1
+            dxpy.api.file_describe("file-" + "x" * 24, {"fields": {"size": True}}, auth=False)
+            with self.assertRaises(dxpy.exceptions.ResourceNotFound):
+                dxpy.api.file_describe("file-missing", auth=False)
+        finally:
+            dxpy.remove_request_listener(events.append)
+        dxpy.api.system_whoami(auth=False)
+
+        self.assertEqual([event.type for event in events], ["start", "retry", "end", "start", "end"])
+        start, retry, end = events[:3]
+        self.assertEqual((start.method, start.route), ("POST", "/file-xxxx/describe"))
+        self.assertEqual(start.bytes_sent, len(json.dumps({"fields": {"size": True}})))
+        self.assertEqual((retry.status, retry.retries), (503, 0))
+        self.assertEqual((end.status, end.retries, end.error), (200, 1, None))
+        self.assertEqual(end.bytes_received, len(json.dumps({"path": "/file-" + "x" * 24 + "/describe",
+                                                             "input": {"fields": {"size": True}}})))
+        self.assertGreater(end.time_to_first_byte, 0)
+        self.assertGreaterEqual(end.latency, end.time_to_first_byte)
+        self.assertEqual(events[4].status, 404)
+        self.assertIsNotNone(events[4].error)
+
+    def test_request_stats(self):
+        stats = dxpy.enable_request_stats()
+        try:
+            for _ in range(3):
+                dxpy.api.system_whoami(auth=False)
+            dxpy.api.file_describe("file-" + "x" * 24, auth=False)
+        finally:
+            dxpy.disable_request_stats()
+        routes = stats.get()
+        self.assertEqual(routes["POST /system/whoami"]["requests"], 3)
+        self.assertEqual(sum(routes["POST /system/whoami"]["histogram"]), 3)
+        self.assertEqual(routes["POST /file-xxxx/describe"]["requests"], 1)
+        self.assertIn("POST /system/whoami: 3 requests", stats.format())
+        self.assertIsNone(dxpy.get_request_stats())
+
+
+class TestRateLimiter(_APIServerTestCase):
+    def test_token_bucket(self):
+        bucket = rate_limiter.TokenBucket(rate=100, burst=5)
+        time_started = time.time()
+        for _ in range(25):
+            bucket.acquire()
+        # The first 5 requests are a burst, the following 20 wait for tokens
+        self.assertGreaterEqual(time.time() - time_started, 0.19)
+
+    def test_pause_spreads_waiting_requests(self):
+        pauses = rate_limiter.HostPauses()
+        pauses.pause("storage.example.com", 0.2)
+        resumed = []
+
+        def request():
+            pauses.wait("storage.example.com")
+            resumed.append(time.time())
+        time_started = time.time()
+        # Requests to other hosts are not held back
+        pauses.wait("other.example.com")
+        self.assertLess(time.time() - time_started, 0.1)
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(min(resumed) - time_started, 0.19)
+        self.assertLessEqual(max(resumed) - time_started, 0.2 * (1 + rate_limiter.PAUSE_JITTER) + 0.1)
+        self.assertGreater(len(set(resumed)), 1)
+
+    def test_pause_callable_resource(self):
+        # As used for part uploads: the URL is known only once the resource is called
+        def get_url_and_headers():
+            return dxpy.APISERVER + "/system/whoami", {}
+        pauses = rate_limiter.HostPauses()
+        with patch.object(rate_limiter, "_host_pauses", pauses):
+            pauses.pause(dxpy._url_host(dxpy.APISERVER), 0.2)
+            time_started = time.time()
+            result = dxpy.DXHTTPRequest(get_url_and_headers, {}, prepend_srv=False, auth=False)
+        self.assertEqual(result["path"], "/system/whoami")
+        self.assertGreaterEqual(time.time() - time_started, 0.19)
+
+    def test_retry_budget(self):
+        budget = rate_limiter.RetryBudget(ratio=0.5, min_per_second=0, max_balance=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+        limits = rate_limiter.RouteClassLimits()
+        limits.retry_budget = rate_limiter.RetryBudget(ratio=0, min_per_second=0, max_balance=1)
+        with patch.dict(rate_limiter._limits, {"api": limits}):
+            self.server.unavailable = 1
+            dxpy.api.system_whoami(auth=False)
+            self.server.unavailable = 1
+            with self.assertRaises(dxpy.exceptions.DXAPIError):
+                dxpy.api.system_whoami(auth=False)
+        self.assertEqual(self.server.unavailable, 0)
+
+    def test_configure_rate_limits(self):
+        try:
+            limits = rate_limiter.configure_rate_limits("storage", rate=10, retry_budget=0.1)
+            self.assertIs(rate_limiter.get_rate_limits("storage"), limits)
+            self.assertEqual((limits.bucket.rate, limits.bucket.burst, limits.retry_budget.ratio), (10, 10, 0.1))
+        finally:
+            rate_limiter.configure_rate_limits("storage")
+        with self.assertRaises(ValueError):
+            rate_limiter.configure_rate_limits("control")
+
+
+class TestGermlineQueries(unittest.TestCase):
+    fields_list = ["locus_id", "chromosome", "starting_position", "ref", "sample_id", "genotype_type"]
+    assay_filters = {"raw_filters": {"assay_filters": {"id": "assay-id", "name": "assay"}}, "project_context": "p"}
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.addCleanup(self.release.set)
+        self.queries, self.running, self.max_running, self.lock = [], 0, 0, threading.Lock()
+
+    def raw_api_call(self, resp, payload, sql_message=True):
+        query = payload.get("query")
+        if query is None:
+            # The lookup of the missing ref values, after the genotype table only queries
+            return {"results": [{"locus_id": "1_%d_A_T" % i, "ref": "A"} for i in range(3)]}
+        with self.lock:
+            self.queries.append(query)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if query == "fail":
+                # As raw_api_call does on an error
+                sys.exit(3)
+            if query == "block":
+                self.release.wait()
+            # The first queries are the slowest, so that they complete last
+            time.sleep(payload.get("delay", 0))
+            return {"results": [{"locus_id": "1_%d_A_T" % i, "chromosome": "1", "starting_position": i,
+                                 "ref": None if query.startswith("genotype_only") else "A", "sample_id": query,
+                                 "genotype_type": "ref"} for i in range(3)]}
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    def retrieve_samples(self, resp, assay_name, assay_id):
+        self.queries.append(("samples", assay_name, assay_id))
+        self.release.wait()
+        return ["s1", "s2"]
+
+    def retrieve(self, queries, query_genotype_table=True):
+        genotype_payload = dict(self.assay_filters, query="genotype", delay=0.3)
+        genotype_only_payloads = [dict(self.assay_filters, query=query, delay=0.2 - 0.05 * i)
+                                  for i, query in enumerate(queries)]
+        with patch.object(dataset_utilities, "raw_api_call", self.raw_api_call), \
+                patch.object(dataset_utilities, "retrieve_samples", self.retrieve_samples):
+            return dataset_utilities.retrieve_germline_genotypes(
+                {}, genotype_payload, genotype_only_payloads, self.fields_list,
+                query_genotype_table=query_genotype_table, samples_assay=("assay", "assay-id"),
+                loci_payload=dict(self.assay_filters, query="loci"))
+
+    def test_results_in_query_order(self):
+        queries = ["genotype_only_ref", "genotype_only_half", "genotype_only_nocall"]
+        with patch.object(dataset_utilities, "GERMLINE_QUERY_THREADS", 1):
+            sequential = self.retrieve(queries)
+        self.assertEqual(self.max_running, 1)
+        self.max_running = 0
+        concurrent = self.retrieve(queries)
+        self.assertGreater(self.max_running, 1)
+        self.assertEqual(concurrent, sequential)
+        partitions, samples, loci = concurrent
+        self.assertEqual([partition[0]["sample_id"] for partition in partitions], ["genotype"] + queries)
+        # The missing ref values of the genotype table only queries were looked up
+        self.assertEqual(set(row["ref"] for partition in partitions for row in partition), {"A"})
+        self.assertEqual((samples, [row["sample_id"] for row in loci]), (["s1", "s2"], ["loci"] * 3))
+
+    def test_failed_query(self):
+        # The failure reaches the caller while the other queries are still running, and the queries that have not
+        # started are cancelled: the worker of the failed query starts retrieving the samples, but the loci query,
+        # queued after it, never runs
+        self.release.clear()
+        # Waiting for the running queries would only end here
+        timer = threading.Timer(3, self.release.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        time_started = time.time()
+        with patch.object(dataset_utilities, "GERMLINE_QUERY_THREADS", 4), self.assertRaises(SystemExit):
+            self.retrieve(["fail", "block", "block", "block"], query_genotype_table=False)
+        self.assertLess(time.time() - time_started, 3)
+        self.assertEqual(self.running, 3)
+        self.release.set()
+        time.sleep(0.5)
+        self.assertNotIn("loci", self.queries)
+
+
 class TestDXUtils(unittest.TestCase):
     def test_dxjsonencoder(self):
         f = DXFile("file-" + "x"*24, project="project-" + "y"*24)
@@ -342,6 +1403,217 @@ class TestDXConfig(unittest.TestCase):
             os.environ.update(environ_backup)
             dxpy.config.__init__(suppress_warning=True)
 
+class TestImportTime(unittest.TestCase):
+    def get_imports(self, module):
+        # Returns the names of the modules imported by the module in a new
+        # interpreter
+        output = subprocess.check_output([sys.executable, "-X", "importtime", "-c", "import " + module],
+                                         stderr=subprocess.STDOUT, universal_newlines=True)
+        imported = set()
+        for line in output.splitlines():
+            match = re.match(r"import time:\s+\d+ \|\s+\d+ \| ( *)(\S+)$", line)
+            if match is None:
+                continue
+            if match.group(1):
+                imported.add(match.group(2))
+            elif match.group(2) == module:
+                return imported
+            else:
+                # Imported before the module (e.g. by site)
+                imported.clear()
+        self.fail("{} not found in the output of -X importtime".format(module))
+
+    def test_import_dxpy(self):
+        imported = self.get_imports("dxpy")
+        for module in "dxpy.bindings", "dxpy.api", "psutil", "dateutil", "certifi":
+            self.assertNotIn(module, imported)
+
+    def test_import_dx(self):
+        imported = self.get_imports("dxpy.scripts.dx")
+        for module in "dxpy.scripts.dx_build_app", "dxpy.workflow_builder", "dxpy.cli.dataset_utilities":
+            self.assertNotIn(module, imported)
+
+    def test_lazy_bindings(self):
+        from dxpy.bindings import dxfile
+        self.assertIs(dxpy.DXFile, dxfile.DXFile)
+        self.assertIs(dxpy.dxfile, dxfile)
+        self.assertIn("DXFile", dir(dxpy))
+        with self.assertRaises(AttributeError):
+            dxpy.no_such_binding
+
+    def test_star_import(self):
+        namespace = {}
+        exec("from dxpy import *", namespace)
+        # Everything "from .bindings import *" added to dxpy, as when the
+        # bindings were imported eagerly
+        self.assertLessEqual({name for name in vars(dxpy.bindings) if not name.startswith("_")}, set(namespace))
+        for name in ("DXFile", "download_dxfile", "api", "bindings", "copy", "math", "StringIO", "certifi",
+                     "INCOMPLETE_READS_NUM_SUBCHUNKS", "DXHTTPRequest", "DEFAULT_RETRIES"):
+            self.assertIn(name, namespace)
+        self.assertIs(namespace["DXFile"], dxpy.bindings.DXFile)
+        self.assertFalse([name for name in namespace if name.startswith("_") and name != "__builtins__"])
+
+    def test_append_underlying_workflow_describe(self):
+        desc = {"class": "globalworkflow",
+                "regionalOptions": {"aws:us-east-1": {"workflow": "workflow-" + "x" * 24, "resources": "project-1"}}}
+        # "dxpy" is not a global of the module unless a star import or an
+        # attribute lookup put it there
+        with patch.dict(vars(dxpy)), patch.object(dxpy.api, "workflow_describe",
+                                                  return_value={"id": "workflow-" + "x" * 24}) as workflow_describe:
+            vars(dxpy).pop("dxpy", None)
+            dxpy.append_underlying_workflow_describe(desc)
+        workflow_describe.assert_called_once_with("workflow-" + "x" * 24, input_params={"project": "project-1"})
+        self.assertEqual(desc["regionalOptions"]["aws:us-east-1"]["workflowDescribe"], {"id": "workflow-" + "x" * 24})
+
+class TestDatasetDescriptorCache(unittest.TestCase):
+    descriptor = {
+        "assays": [
+            {"name": "germline", "generalized_assay_model": "genetic_variant", "uuid": "u1", "reference": "GRCh38"},
+            {"name": "expression", "generalized_assay_model": "molecular_expression", "uuid": "u2"},
+            {"name": "germline2", "generalized_assay_model": "genetic_variant", "uuid": "u3"},
+        ],
+        "model": {"entities": {"patient": {"fields": {"id": {}, "age": {}}}, "sample": {"fields": {"id": {}}}}},
+    }
+
+    def setUp(self):
+        self.downloads = []
+
+        def download(file_id, project):
+            self.downloads.append(file_id)
+            return json.loads(json.dumps(self.descriptor))
+        patcher = patch("dxpy.bindings.apollo.descriptor_cache._download_descriptor", download)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+
+    def test_index(self):
+        index = descriptor_cache.build_descriptor_index(self.descriptor)
+        self.assertEqual([a["name"] for a in index["assays"]["genetic_variant"]], ["germline", "germline2"])
+        self.assertEqual(index["assays"]["genetic_variant"][1]["index"], 2)
+        self.assertEqual(index["assays"]["molecular_expression"][0],
+                         {"name": "expression", "index": 1, "uuid": "u2", "reference": None})
+        self.assertEqual(index["entities"], {"patient": ["id", "age"], "sample": ["id"]})
+
+    def test_memory_cache(self):
+        cache = descriptor_cache.DatasetDescriptorCache(max_entries=1)
+        self.assertEqual(cache.get("file-1"), self.descriptor)
+        self.assertIs(cache.get("file-1"), cache.get("file-1"))
+        self.assertEqual(cache.get_index("file-1")["assays"]["genetic_variant"][0]["uuid"], "u1")
+        self.assertEqual(self.downloads, ["file-1"])
+        cache.get("file-2")
+        cache.get("file-1")
+        self.assertEqual(self.downloads, ["file-1", "file-2", "file-1"])
+
+    def test_disk_cache(self):
+        cache = descriptor_cache.DatasetDescriptorCache(directory=self.temp_dir)
+        index = cache.get_index("file-1")
+        self.assertEqual(self.downloads, ["file-1"])
+        # A later process finds the index and the descriptor on disk
+        cache = descriptor_cache.DatasetDescriptorCache(directory=self.temp_dir)
+        self.assertEqual(cache.get_index("file-1"), index)
+        self.assertEqual(cache.get("file-1"), self.descriptor)
+        self.assertEqual(self.downloads, ["file-1"])
+        # Incomplete files are ignored
+        for name in os.listdir(self.temp_dir):
+            with open(os.path.join(self.temp_dir, name), "w") as fd:
+                fd.write("{")
+        cache = descriptor_cache.DatasetDescriptorCache(directory=self.temp_dir)
+        self.assertEqual(cache.get_index("file-1"), index)
+        self.assertEqual(self.downloads, ["file-1", "file-1"])
+        cache = descriptor_cache.DatasetDescriptorCache(directory=self.temp_dir)
+        self.assertEqual(cache.get_index("file-1"), index)
+        self.assertEqual(self.downloads, ["file-1", "file-1"])
+
+class TestPagedResults(unittest.TestCase):
+    rows = [{"sample_id": "s%02d" % i, "value": i} for i in range(25)]
+
+    def get_response(self, payload, ignore_limit=False, ignore_offset=False):
+        self.payloads.append(payload)
+        start = 0 if ignore_offset else payload["offset"]
+        return {"results": self.rows[start:] if ignore_limit else self.rows[start:start + payload["limit"]]}
+
+    def setUp(self):
+        self.payloads = []
+
+    def test_pages(self):
+        payload = {"fields": [{"sample_id": "expression$sample_id"}, {"value": "expression$value"}]}
+        self.assertEqual(list(iter_paged_results(self.get_response, payload, 10)), self.rows)
+        self.assertEqual([(p["offset"], p["limit"]) for p in self.payloads], [(0, 10), (10, 10), (20, 10)])
+        # Without an order_by, the rows are ordered by all the fields
+        self.assertEqual(self.payloads[0]["order_by"], [{"sample_id": "asc"}, {"value": "asc"}])
+        self.assertNotIn("limit", payload)
+
+        # A page size that divides the number of rows ends with an empty page
+        self.payloads = []
+        payload = {"fields": [], "order_by": [{"value": "desc"}]}
+        self.assertEqual(list(iter_paged_results(self.get_response, payload, 5)), self.rows)
+        self.assertEqual(len(self.payloads), 6)
+        self.assertEqual(self.payloads[0]["order_by"], [{"value": "desc"}])
+
+    def test_limit(self):
+        payload = {"fields": [], "order_by": [], "limit": 12}
+        self.assertEqual(list(iter_paged_results(self.get_response, payload, 5)), self.rows[:12])
+        self.assertEqual([(p["offset"], p["limit"]) for p in self.payloads], [(0, 5), (5, 5), (10, 2)])
+
+    def test_server_without_paging(self):
+        results = iter_paged_results(lambda payload: self.get_response(payload, ignore_limit=True),
+                                     {"fields": []}, 10)
+        self.assertEqual(list(results), self.rows)
+        self.assertEqual(len(self.payloads), 1)
+
+        def error_handler(message):
+            raise DXError(message)
+        results = iter_paged_results(lambda payload: self.get_response(payload, ignore_offset=True),
+                                     {"fields": []}, 10, error_handler=error_handler)
+        with self.assertRaisesRegex(DXError, "same page"):
+            list(results)
+
+    def test_write_rows_iterator(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        output = os.path.join(temp_dir, "out.csv")
+        write_expression_output(output, ",", False, iter(self.rows[:3]))
+        with open(output) as fd:
+            self.assertEqual(fd.read().splitlines(), ["sample_id,value", "s00,0", "s01,1", "s02,2"])
+
+        def error_handler(message):
+            raise DXError(message)
+        with self.assertRaisesRegex(DXError, "same column names"):
+            write_expression_output(os.path.join(temp_dir, "bad.csv"), ",", False,
+                                    iter([{"a": 1}, {"b": 2}]), error_handler=error_handler)
+        self.assertFalse(os.path.exists(os.path.join(temp_dir, "bad.csv")))
+
+    def test_failed_page_leaves_no_output(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        output = os.path.join(temp_dir, "out.csv")
+
+        def get_response(payload, failing_offset):
+            if payload["offset"] == failing_offset:
+                # As raw_api_call does on an error
+                sys.exit(3)
+            return self.get_response(payload)
+        for failing_offset in 0, 10:
+            rows = iter_paged_results(lambda payload: get_response(payload, failing_offset), {"fields": []}, 10)
+            with self.assertRaises(SystemExit):
+                csv_from_json(out_file_name=output, raw_results=rows, column_names=["sample_id", "value"])
+            self.assertEqual(os.listdir(temp_dir), [])
+
+        # An earlier output is only replaced once all the rows are written
+        with open(output, "w") as fd:
+            fd.write("earlier\n")
+        rows = iter_paged_results(lambda payload: get_response(payload, 10), {"fields": []}, 10)
+        with self.assertRaises(SystemExit):
+            csv_from_json(out_file_name=output, raw_results=rows, column_names=["sample_id", "value"])
+        self.assertEqual(os.listdir(temp_dir), ["out.csv"])
+        with open(output) as fd:
+            self.assertEqual(fd.read(), "earlier\n")
+        rows = iter_paged_results(lambda payload: get_response(payload, None), {"fields": []}, 10)
+        csv_from_json(out_file_name=output, raw_results=rows, column_names=["sample_id", "value"])
+        with open(output) as fd:
+            self.assertEqual(fd.read().splitlines(), ["sample_id,value"] + ["s%02d,%d" % (i, i) for i in range(25)])
+
 class TestPrettyPrint(unittest.TestCase):
     def test_flatten_json_array(self):
         json_string = (
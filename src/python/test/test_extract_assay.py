@@ -44,7 +44,10 @@ from dxpy.dx_extract_utils.filter_to_payload import (
 from dxpy.dx_extract_utils.germline_utils import (
     filter_results,
     _produce_loci_dict,
-    infer_genotype_type
+    infer_genotype_type,
+    iter_inferred_genotype_entries,
+    merge_germline_results,
+    sort_germline_variant,
 )
 from dxpy.cli.dataset_utilities import (
     DXDataset,
@@ -660,6 +663,93 @@ class TestDXExtractAssay(unittest.TestCase):
 
         output = infer_genotype_type(samples, loci, result_entries, type_to_infer)
         self.assertEqual(output, result_entries + expected_output)
+
+    def test_iter_inferred_genotype_entries(self):
+        samples = ["SAMPLE_3", "SAMPLE_1", "SAMPLE_2"]
+        loci = [
+            {"locus_id": "2_1042_G_CC", "chromosome": "2", "starting_position": 1042, "ref": "G"},
+            {"locus_id": "1_1076145_A_T", "chromosome": "1", "starting_position": 1076145, "ref": "A"},
+            {"locus_id": "1_1076145_C_T", "chromosome": "1", "starting_position": 1076145, "ref": "C"},
+        ]
+        result_entries = [
+            {"sample_id": "SAMPLE_2", "allele_id": "1_1076145_A_AT", "locus_id": "1_1076145_A_T",
+             "genotype_type": "het-alt"},
+            {"sample_id": "SAMPLE_3", "allele_id": "2_1042_G_CC", "locus_id": "2_1042_G_CC", "genotype_type": "hom"},
+            {"sample_id": "SAMPLE_4", "allele_id": "2_1042_G_CC", "locus_id": "2_1042_G_CC", "genotype_type": "hom"},
+        ]
+        expected_output = sorted(
+            infer_genotype_type(samples, loci, result_entries, "ref")[len(result_entries):], key=sort_germline_variant
+        )
+
+        output = iter_inferred_genotype_entries(samples, loci, iter(result_entries), "ref")
+
+        self.assertEqual(list(output), expected_output)
+        self.assertEqual([(entry["sample_id"], entry["locus_id"]) for entry in expected_output], [
+            ("SAMPLE_1", "1_1076145_A_T"),
+            ("SAMPLE_1", "1_1076145_C_T"),
+            ("SAMPLE_2", "1_1076145_C_T"),
+            ("SAMPLE_3", "1_1076145_A_T"),
+            ("SAMPLE_3", "1_1076145_C_T"),
+            ("SAMPLE_1", "2_1042_G_CC"),
+            ("SAMPLE_2", "2_1042_G_CC"),
+        ])
+
+    def test_iter_inferred_genotype_entries_duplicate_samples(self):
+        samples = ["SAMPLE_2", "SAMPLE_1", "SAMPLE_2"]
+        # Loci with the same key (locus_id entries sort by chromosome and position only)
+        loci = [
+            {"locus_id": "1_100_C_T", "chromosome": "1", "starting_position": 100, "ref": "C"},
+            {"locus_id": "1_100_A_G", "chromosome": "1", "starting_position": 100, "ref": "A"},
+            {"locus_id": "1_50_G_A", "chromosome": "1", "starting_position": 50, "ref": "G"},
+        ]
+        result_entries = [
+            {"sample_id": "SAMPLE_1", "allele_id": "1_100_A_G", "locus_id": "1_100_A_G", "genotype_type": "het"},
+        ]
+        expected_output = sorted(
+            infer_genotype_type(samples, loci, result_entries, "no-call")[len(result_entries):],
+            key=sort_germline_variant
+        )
+
+        output = iter_inferred_genotype_entries(samples, loci, iter(result_entries), "no-call")
+
+        self.assertEqual(list(output), expected_output)
+        self.assertEqual([(entry["sample_id"], entry["locus_id"]) for entry in expected_output], [
+            ("SAMPLE_1", "1_50_G_A"),
+            ("SAMPLE_2", "1_50_G_A"),
+            ("SAMPLE_2", "1_50_G_A"),
+            ("SAMPLE_1", "1_100_C_T"),
+            ("SAMPLE_2", "1_100_C_T"),
+            ("SAMPLE_2", "1_100_C_T"),
+            ("SAMPLE_2", "1_100_A_G"),
+            ("SAMPLE_2", "1_100_A_G"),
+        ])
+
+    def test_merge_germline_results(self):
+        # Partitions in the order of the locus_id strings, as returned by the server
+        partitions = [
+            [
+                {"allele_id": "10_100_A_T", "locus_id": "10_100_A_T", "sample_id": "SAMPLE_1"},
+                {"allele_id": "2_300_C_G", "locus_id": "2_300_C_G", "sample_id": "SAMPLE_2"},
+                {"allele_id": "X_50_G_A", "locus_id": "X_50_G_A", "sample_id": "SAMPLE_1"},
+            ],
+            [
+                {"allele_id": None, "locus_id": "1_20_A_T", "sample_id": "SAMPLE_3"},
+                {"allele_id": "2_300_C_G", "locus_id": "2_300_C_G", "sample_id": "SAMPLE_2", "genotype_type": "hom"},
+                {"allele_id": None, "locus_id": "Y_10_T_C", "sample_id": "SAMPLE_1"},
+            ],
+            [],
+        ]
+        expected_output = sorted([entry for partition in partitions for entry in partition],
+                                 key=sort_germline_variant)
+
+        output = list(merge_germline_results(partitions))
+
+        self.assertEqual(output, expected_output)
+        self.assertEqual([entry["locus_id"] for entry in output],
+                         ["1_20_A_T", "2_300_C_G", "2_300_C_G", "10_100_A_T", "X_50_G_A", "Y_10_T_C"])
+        # Entries with the same key keep the order of the partitions
+        self.assertNotIn("genotype_type", output[1])
+        self.assertEqual(output[2]["genotype_type"], "hom")
     ##########
     # Normal Command Lines
     ##########